@@ -4,13 +4,42 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import os
+from utils.migrations import migrate
+from utils.change_feed import start_change_feed, get_change_feed_stats
+from utils.db import get_pool_stats, get_cache_stats
+from utils.db_async import get_pool_stats as get_async_pool_stats
+from utils.query_metrics import register_metrics_endpoint
+from utils.materialize import start_lease_keeper
+from utils.databricks_connect import get_databricks_pool_stats
+
 from components.tabs.project_tab import create_project_tab
 from components.tabs.dataset_tab import create_dataset_tab
 from components.tabs.train_tab import create_train_tab
 from components.callbacks import register_callbacks
 from dash import dcc
+# Bring the metadata schema up to date before any callbacks query it
+if os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true":
+    migrate()
+
+# Renew the leases of this server's materialization jobs, and fail jobs whose
+# process is gone (e.g. left unfinished by a previous container)
+start_lease_keeper()
+
+# Keep an in-memory snapshot of projects/datasets/training current via LISTEN/NOTIFY
+start_change_feed()
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
+# Query latency histograms and slow-query log, plus pool/cache/change-feed counters, at /metrics
+register_metrics_endpoint(app.server, lambda: {
+    "metadata_db_pool": get_pool_stats(),
+    "metadata_db_async_pool": get_async_pool_stats(),
+    "metadata_db_cache": get_cache_stats(),
+    "metadata_change_feed": get_change_feed_stats(),
+    **{f"databricks_pool_{warehouse_id}": stats for warehouse_id, stats in get_databricks_pool_stats().items()},
+})
+
 
 
 # Create tabs
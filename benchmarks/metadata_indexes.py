@@ -0,0 +1,149 @@
+"""Benchmark of the hot-path metadata lookups before and after the index migrations.
+
+Seeds a scratch schema with 100k training rows, times the queries that
+utils/db.py runs on every Train/Datasets tab render, applies the remaining
+migrations and times them again. The scratch schema is dropped afterwards.
+
+Usage (from the repository root, with the DB_* variables set):
+
+    python -m benchmarks.metadata_indexes --training-rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from utils.db import get_db_connection
+from utils.migrations import apply_migrations
+
+# (label, SQL, params factory) for each hot-path lookup in utils/db.py
+HOT_PATH_QUERIES = [
+    (
+        "get_training_job",
+        "SELECT id, job_id, parameters FROM training WHERE project_id = %s AND dataset_id = %s;",
+        lambda s: (random.randint(1, s["projects"]), random.randint(1, s["datasets"])),
+    ),
+    (
+        "get_datasets_by_job_ids",
+        "SELECT DISTINCT ON (t.job_id) t.job_id, d.id AS dataset_id, d.name FROM training t"
+        " JOIN datasets d ON d.id = t.dataset_id WHERE t.job_id = ANY(%s::bigint[])"
+        " ORDER BY t.job_id, t.updated_at DESC;",
+        lambda s: ([random.randint(1, s["training"]) for _ in range(50)],),
+    ),
+    (
+        "get_datasets",
+        "SELECT id, name FROM datasets WHERE project_id = %s ORDER BY name, id;",
+        lambda s: (random.randint(1, s["projects"]),),
+    ),
+    (
+        "get_dataset_name_by_training_table",
+        "SELECT name FROM datasets WHERE training_table_name = %s;",
+        lambda s: (f"cat.sch.dataset_{random.randint(1, s['datasets'])}_training",),
+    ),
+]
+
+
+def seed(conn, projects, datasets, training):
+    """Fills the baseline tables with synthetic rows using set-based inserts."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO projects (name, description, catalog, schema, git_url, training_notebook)
+            SELECT 'project_' || g, 'bench', 'cat', 'sch', 'https://github.com/example/repo', 'train.py'
+            FROM generate_series(1, %s) g;
+            """,
+            (projects,)
+        )
+        cur.execute(
+            """
+            INSERT INTO datasets (project_id, name, source_type, evaluation_type, percentage,
+                                  materialized, training_table_name, eval_table_name, target)
+            SELECT 1 + (g %% %s), 'dataset_' || g, 'static_table', 'random', 0.2,
+                   TRUE, 'cat.sch.dataset_' || g || '_training', 'cat.sch.dataset_' || g || '_eval', 'label'
+            FROM generate_series(1, %s) g;
+            """,
+            (projects, datasets)
+        )
+        cur.execute(
+            """
+            INSERT INTO training (project_id, dataset_id, job_id, parameters)
+            SELECT 1 + (g %% %s), 1 + (g %% %s), g, '{}'::jsonb
+            FROM generate_series(1, %s) g;
+            """,
+            (projects, datasets, training)
+        )
+        cur.execute("ANALYZE projects; ANALYZE datasets; ANALYZE training;")
+    conn.commit()
+
+
+def time_queries(conn, sizes, iterations):
+    """Runs each hot-path query `iterations` times and returns latency stats in ms."""
+    results = {}
+    with conn.cursor() as cur:
+        for label, query, make_params in HOT_PATH_QUERIES:
+            timings = []
+            for _ in range(iterations):
+                params = make_params(sizes)
+                started = time.perf_counter()
+                cur.execute(query, params)
+                cur.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[label] = {
+                "p50": statistics.median(timings),
+                "p95": timings[int(len(timings) * 0.95) - 1],
+            }
+    conn.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--datasets", type=int, default=5000)
+    parser.add_argument("--training-rows", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema for inspection.")
+    args = parser.parse_args()
+
+    sizes = {"projects": args.projects, "datasets": args.datasets, "training": args.training_rows}
+    scratch_schema = f"bench_indexes_{os.getpid()}"
+
+    conn = get_db_connection()
+    if conn is None:
+        raise SystemExit("Failed to establish database connection")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE SCHEMA {scratch_schema};")
+            cur.execute(f"SET search_path TO {scratch_schema};")
+        conn.commit()
+
+        # Baseline tables only, i.e. the schema init_db.sql produces
+        apply_migrations(conn, target=1)
+        print(f"Seeding {sizes} into {scratch_schema}...")
+        seed(conn, **sizes)
+        before = time_queries(conn, sizes, args.iterations)
+
+        apply_migrations(conn)
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE datasets; ANALYZE training;")
+        conn.commit()
+        after = time_queries(conn, sizes, args.iterations)
+
+        print(f"\n{'query':<38}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}{'speedup':>10}")
+        for label, _, _ in HOT_PATH_QUERIES:
+            b, a = before[label], after[label]
+            speedup = b["p50"] / a["p50"] if a["p50"] else float("inf")
+            print(f"{label:<38}{b['p50']:>10.3f}ms{a['p50']:>10.3f}ms{b['p95']:>10.3f}ms{a['p95']:>10.3f}ms{speedup:>9.1f}x")
+    finally:
+        conn.rollback()
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {scratch_schema} CASCADE;")
+            conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark of the hash split plans against the legacy temp-table random split.
+
+Materializes the same source table with the legacy plan (temp copy plus
+``rand()``) and with each hash split strategy, reports wall time, row counts
+and the time saved, then drops every table it created.
+
+Usage (from the repository root, with the DATABRICKS_* variables set):
+
+    python -m benchmarks.random_split --source main.sales.orders --target-schema main.scratch --percentage 0.2
+
+With SQL_BACKEND=duckdb it runs offline, e.g. on Parquet files registered
+through DUCKDB_PARQUET_TABLES (see utils.duckdb_backend).
+"""
+import argparse
+import time
+
+from utils.databricks_connect import databricks_connection
+from utils.split_engine import (
+    SPLIT_STRATEGIES, drop_tables, get_table_row_count, legacy_random_split_statements,
+    materialize_random_split, run_statements
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", required=True, help="Fully qualified source table.")
+    parser.add_argument("--target-schema", required=True, help="catalog.schema for the scratch tables.")
+    parser.add_argument("--percentage", type=float, default=0.2)
+    parser.add_argument("--strategies", nargs="+", default=list(SPLIT_STRATEGIES), choices=SPLIT_STRATEGIES)
+    args = parser.parse_args()
+
+    with databricks_connection() as conn:
+        if conn is None:
+            raise SystemExit("Failed to connect to Databricks")
+        run_benchmark(conn, args)
+
+
+def run_benchmark(conn, args):
+    suffix = int(time.time())
+    base = f"{args.target_schema}.bench_split_{suffix}"
+    created = []
+    results = []
+    try:
+        training, evaluation = f"{base}_legacy_training", f"{base}_legacy_eval"
+        created += [training, evaluation, f"{base}_legacy_temp"]
+        statements = legacy_random_split_statements(
+            args.source, training, evaluation, args.percentage, f"{base}_legacy_temp"
+        )
+        started = time.perf_counter()
+        run_statements(conn, statements)
+        legacy_seconds = time.perf_counter() - started
+        results.append((
+            "legacy", legacy_seconds,
+            get_table_row_count(conn, training), get_table_row_count(conn, evaluation)
+        ))
+
+        for strategy in args.strategies:
+            training, evaluation = f"{base}_{strategy}_training", f"{base}_{strategy}_eval"
+            created += [training, evaluation]
+            split = materialize_random_split(
+                conn, args.source, training, evaluation, args.percentage, seed=suffix, strategy=strategy
+            )
+            results.append((strategy, split["elapsed_seconds"], split["training_rows"], split["eval_rows"]))
+
+        print(f"\n{'plan':<14}{'elapsed':>10}{'training rows':>16}{'eval rows':>14}{'saved':>10}")
+        for plan, seconds, training_rows, eval_rows in results:
+            saved = legacy_seconds - seconds
+            print(f"{plan:<14}{seconds:>9.1f}s{training_rows or 0:>16}{eval_rows or 0:>14}{saved:>9.1f}s")
+    finally:
+        drop_tables(conn, created)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark of fetch_rows (namedtuple records) against fetch_data (DataFrame).
+
+Runs the project and dataset listing queries both ways against the configured
+metadata database and reports the per-call cost, including the
+``.to_dict(orient='records')`` step callers used to do on every DataFrame.
+The listing cache is bypassed so every call hits Postgres.
+
+Usage (from the repository root, with the DB_* variables set):
+
+    python -m benchmarks.row_fetch --iterations 500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from utils.db import fetch_data, fetch_rows, get_pool_stats
+
+PROJECTS_QUERY = (
+    "SELECT id, name, description, catalog, schema, git_url, training_notebook FROM projects ORDER BY name ASC;"
+)
+DATASETS_QUERY = (
+    "SELECT id, name, source_type, eol_definition, feature_lookup_definition, source_table,"
+    " timestamp_col, evaluation_type, percentage, source_table_eval, split_time_column, materialized,"
+    " training_table_name, eval_table_name, target FROM datasets ORDER BY name ASC;"
+)
+
+
+def time_calls(fn, iterations):
+    """Returns the median and p95 wall time of ``fn()`` in microseconds."""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def pandas_import_ms():
+    """Measures a cold `import pandas` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import pandas; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(result.stdout.strip()) if result.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    # Warm the pool and the pandas import so neither is measured per call
+    fetch_rows("SELECT 1;")
+    fetch_data("SELECT 1;")
+
+    print(f"{'query':<12}{'rows':>8}{'DataFrame p50':>16}{'records p50':>14}{'saved/call':>13}{'speedup':>10}")
+    for label, query in (("projects", PROJECTS_QUERY), ("datasets", DATASETS_QUERY)):
+        row_count = len(fetch_rows(query))
+        df_p50, _ = time_calls(lambda: fetch_data(query).to_dict(orient="records"), args.iterations)
+        rows_p50, _ = time_calls(lambda: fetch_rows(query), args.iterations)
+        print(
+            f"{label:<12}{row_count:>8}{df_p50:>14.0f}us{rows_p50:>12.0f}us"
+            f"{df_p50 - rows_p50:>11.0f}us{df_p50 / rows_p50:>9.2f}x"
+        )
+
+    import_ms = pandas_import_ms()
+    if import_ms is not None:
+        print(f"\nCold `import pandas` avoided at startup: {import_ms:.0f}ms")
+    print(f"Pool: {get_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,33 @@ import dash
 from dash import Input, Output, State, ALL, ctx, no_update, html
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import time # Added for timestamp generation
 import os # <-- Add os import
 from utils.db import (
-    create_project, update_project, get_projects, get_datasets, create_dataset, 
+    create_project, update_project, get_projects_page, get_datasets, get_datasets_page, create_dataset,
     update_dataset, delete_project, delete_dataset,
-    get_training_job, create_training_job_record, update_training_job_id,
-    get_dataset_details, get_project_git_details, get_dataset_name_by_job_id
+    create_training_job_record, update_training_job_id, get_datasets_by_job_ids,
+    record_training_run, update_training_run_status, get_training_runs, get_materialization_job,
+    get_active_materialization_job
 )
-from utils.databricks_connect import get_databricks_connection, execute_sql # Renamed import
+from utils.db_async import load_training_context
+from utils.materialize import (
+    build_materialization_spec, build_stages, submit_materialization, qualify_table_name, FINISHED_STATUSES,
+    hold_materialization, submit_pending_materialization, discard_pending_materialization
+)
+from utils.cost_estimate import MATERIALIZE_COST_PREVIEW, estimate_materialization_cost
+from utils.profiling import profile_table, ProfileError
 # --- Add imports for training and JSON --- #
 import json
 from utils.training import create_training_job as create_databricks_job, run_training_job
+from utils.training import get_training_run_status, TERMINAL_RUN_STATUSES
 # --- Add MLflow import --- #
 from utils.mlflow_utils import get_experiment_runs # Ensure correct function is imported
 from utils.mlflow_utils import register_model_version # Added for model registration
 # --- End Add imports --- #
 
 # --- Import for fetching notebook files --- #
-from components.tabs.project_tab import fetch_notebook_files_from_github
+from components.tabs.project_tab import fetch_notebook_files_from_github, project_to_store_item
+from components.tabs.dataset_tab import dataset_to_store_item
 # --- End Import --- #
 
 # --- Helper function for datetime formatting (optional) --- #
@@ -34,38 +42,221 @@ def format_timestamp(ts):
         return dt_object.strftime("%Y-%m-%d %H:%M:%S")
     except TypeError:
         return str(ts) # Fallback if it's not a standard timestamp
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {secs:02d}s" if hours else f"{minutes}m {secs:02d}s"
+# --- End Helper --- #
+
+# --- Helper for materialization job progress --- #
+def format_stat(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+def format_bytes(size):
+    if size is None:
+        return "unknown"
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def cost_summary(estimate):
+    """One line summarizing a utils.cost_estimate estimate."""
+    rows = f", ~{estimate['rows']:,} rows" if estimate.get('rows') is not None else ""
+    summary = f"Estimated scan: {format_bytes(estimate.get('bytes'))}{rows}"
+    if estimate.get('needs_confirmation'):
+        limit = format_bytes(estimate['threshold'])
+        summary += f" (above the {limit} limit)" if estimate.get('bytes') is not None else f" (limit {limit})"
+    return summary
+
+def render_cost_estimate(estimate):
+    """Renders a cost estimate that needs confirmation, per statement."""
+    statements = [
+        html.Li(f"{s['label']}: {format_bytes(s['bytes'])}"
+                + (f", ~{s['rows']:,} rows" if s.get('rows') is not None else "")
+                + ("" if s['method'] in ("explain", "metadata") else f" ({s['method'].replace('_', ' ')})"))
+        for s in estimate['statements']
+    ]
+    return dbc.Alert([
+        html.Div(cost_summary(estimate)),
+        html.Ul(statements, className="mb-0"),
+        html.Div("Confirm to materialize this dataset anyway.", className="fw-bold")
+    ], color="warning")
+
+MATERIALIZATION_STATUS_COLORS = {'queued': 'secondary', 'running': 'info', 'succeeded': 'success', 'failed': 'danger'}
+
+def render_materialization_job(job):
+    """Renders a materialization job row (utils.db.get_materialization_job) as a status Alert."""
+    if not job:
+        return None
+    steps = [
+        html.Li(f"{step['label']}: {step['status']}"
+                + (f" ({format_duration(step['seconds'])})" if step.get('seconds') is not None else ""))
+        for step in job.get('statements') or []
+    ]
+    summary = f"Materialization job {job['id']}: {job['status']}"
+    result = job.get('result') or {}
+    if job['status'] == 'succeeded' and result.get('reused'):
+        summary += (f" - source and definition unchanged, reusing {result.get('training_table_name')}"
+                    f" / {result.get('eval_table_name')}")
+    elif job['status'] == 'succeeded':
+        summary += (f" - {format_stat(result.get('training_rows'))} training / {format_stat(result.get('eval_rows'))} eval rows"
+                    f" in {format_duration(result.get('elapsed_seconds'))}")
+        if result.get('snapshot_mode'):
+            versions = ", ".join(f"{table}@{version}" for table, version in result.get('source_versions', {}).items())
+            summary += f" ({result['snapshot_mode'].replace('_', ' ')} of {versions})"
+            # Pinned versions break once VACUUM removes their files from the source
+            retention = result.get('retention_hours')
+            summary += (f" - readable for at least {retention / 24:g} days after the source changes"
+                        if retention is not None else " - readable only until the source is VACUUMed")
+        if result.get('folds'):
+            folds = result['folds']
+            summary += f" ({folds['count']} {folds['strategy'].replace('_', ' ')} folds in {folds['column']})"
+        if result.get('incremental'):
+            summary += f" ({'appended' if result.get('watermark_from') else 'full load'} up to {result.get('watermark')})"
+    children = [html.Div(summary)]
+    estimate = (job.get('spec') or {}).get('cost_estimate')
+    if estimate and not result.get('reused'):
+        children.append(html.Div(cost_summary(estimate)))
+    children.append(html.Ul(steps, className="mb-0"))
+    class_ratios = result.get('class_ratios') if job['status'] == 'succeeded' else None
+    if class_ratios:
+        shares = ", ".join(f"{c['class']}: {c['eval_ratio']:.1%}" for c in class_ratios['classes'][:10])
+        children.append(html.Div(f"Eval share per {class_ratios['target']} class - {shares}"))
+    if job.get('error'):
+        children.append(html.Div(job['error'], className="fw-bold"))
+    return dbc.Alert(children, color=MATERIALIZATION_STATUS_COLORS.get(job['status'], 'secondary'))
+# --- End Helper --- #
+
+# --- Helper for table profiles --- #
+def render_table_profile(profile, cached):
+    """Renders a profile from utils.profiling.profile_table."""
+    source = "cached" if cached else f"computed in {profile['seconds']:.1f}s"
+    summary = (f"{profile['table']} (version {format_stat(profile.get('version'))}): "
+               f"{profile['sampled_rows']:,} rows sampled ({profile['sample_percent']:g}%), "
+               f"~{profile['estimated_rows']:,} rows in total - {source}")
+    children = [html.P(summary, className="mb-2")]
+    if profile.get('columns_truncated'):
+        children.append(dbc.Alert("Only the first columns were profiled.", color="warning"))
+    if profile.get('target_missing'):
+        children.append(dbc.Alert("The target column was not found in this table.", color="warning"))
+
+    children.append(dbc.Table([
+        html.Thead(html.Tr([html.Th(h) for h in ("Column", "Type", "Nulls", "Min", "Max", "Mean")])),
+        html.Tbody([
+            html.Tr([
+                html.Td(col['name']),
+                html.Td(col['type']),
+                html.Td(f"{col['null_rate']:.1%}" if col['null_rate'] is not None else "-"),
+                html.Td(format_stat(col['min'])),
+                html.Td(format_stat(col['max'])),
+                html.Td(format_stat(col['mean']))
+            ])
+            for col in profile['columns']
+        ])
+    ], bordered=True, hover=True, responsive=True, striped=True, size="sm"))
+
+    target = profile.get('target')
+    if target and target['histogram']:
+        largest = max(bucket['count'] for bucket in target['histogram']) or 1
+        children.append(html.H6(f"Target: {target['column']} ({target['kind']})"))
+        children.append(dbc.Table(html.Tbody([
+            html.Tr([
+                html.Td(format_stat(bucket['value']), style={"width": "20%"}),
+                html.Td(format_stat(bucket['count']), style={"width": "15%"}),
+                html.Td(dbc.Progress(value=100 * bucket['count'] / largest, style={"height": "0.75rem"}))
+            ])
+            for bucket in target['histogram']
+        ]), size="sm"))
+    return html.Div(children)
 # --- End Helper --- #
 
+# --- Helpers for linking MLflow runs to datasets --- #
+def get_run_tags(run):
+    """Returns the tags of an MLflow run dict as a {key: value} mapping."""
+    return {tag['key']: tag['value'] for tag in run.get('data', {}).get('tags', [])}
+
+def get_run_job_ids(runs):
+    """Collects the valid Databricks Job IDs tagged on a list of MLflow run dicts."""
+    job_ids = set()
+    for run in runs or []:
+        if not isinstance(run, dict):
+            continue
+        job_id_str = get_run_tags(run).get('mlflow.databricks.jobID')
+        if job_id_str:
+            try:
+                job_ids.add(int(job_id_str))
+            except ValueError:
+                pass # Invalid job ID format, reported per run in the table
+    return job_ids
+# --- End Helpers --- #
+
+# --- Helpers for the paged project/dataset lists --- #
+# A list's paging state is {'filter', 'cursors', 'next'}: cursors holds the keyset
+# cursor each visited page started after ([None] on the first page) and next the
+# cursor of the following page, or None on the last one.
+def move_page(page_state, direction=None):
+    """Returns a copy of a paging state moved to the 'next', 'prev' or 'first' page."""
+    state = dict(page_state or {})
+    state.setdefault('filter', '')
+    cursors = list(state.get('cursors') or [None])
+    if direction == 'next' and state.get('next'):
+        cursors.append(state['next'])
+    elif direction == 'prev' and len(cursors) > 1:
+        cursors.pop()
+    elif direction == 'first':
+        cursors = [None]
+    state['cursors'] = cursors
+    return state
+
+def load_page(fetch_page, page_state, *args):
+    """Fetches the page a paging state points at with get_projects_page or get_datasets_page.
+
+    Steps back a page if a delete emptied the current one.
+
+    Returns:
+        tuple: (records, updated paging state)
+    """
+    state = move_page(page_state)
+    while True:
+        records, next_cursor = fetch_page(*args, name_filter=state['filter'] or None, after=state['cursors'][-1])
+        if records or len(state['cursors']) == 1:
+            break
+        state['cursors'].pop()
+    state['next'] = next_cursor
+    return records, state
+
+def page_controls_state(page_state):
+    """Returns (prev disabled, next disabled, page label) for a paging state."""
+    state = move_page(page_state)
+    page = len(state['cursors'])
+    return page == 1, not state.get('next'), f"Page {page}"
+# --- End Helpers --- #
+
 def register_callbacks(app):
 
     @app.callback(
         Output('list-store', 'data', allow_duplicate=True),
+        Output('project-page-store', 'data', allow_duplicate=True),
         Input('url', 'pathname'),  # Trigger on page load
+        State('project-page-store', 'data'),
         prevent_initial_call=True
     )
-    def update_store_on_refresh(_):
+    def update_store_on_refresh(_, page_state):
         print("update_store_on_refresh")
-        df = get_projects()
-        items = []
-        if not df.empty:
-            try:
-                records = df.to_dict(orient='records')
-                # Validate and transform records
-                items = []
-                for rec in records:
-                    if isinstance(rec, dict) and 'id' in rec:
-                        items.append({
-                            'id': int(rec['id']),
-                            'text': str(rec.get('name', '')),
-                            'description': str(rec.get('description', '')),
-                            'catalog': str(rec.get('catalog', '')),
-                            'schema': str(rec.get('schema', '')),
-                            'git_url': str(rec.get('git_url', '')),
-                            'training_notebook': str(rec.get('training_notebook', ''))
-                        })
-            except Exception as e:
-                print(f"Error processing project records: {e}")
-                items = []
+        try:
+            records, page_state = load_page(get_projects_page, page_state)
+            items = [project_to_store_item(rec) for rec in records]
+        except Exception as e:
+            print(f"Error processing project records: {e}")
+            items = []
                 
         # Set active project to first item if available, otherwise None
         active_project_id = items[0]['id'] if items else None
@@ -73,7 +264,44 @@ def register_callbacks(app):
         print("Active project ID:", active_project_id)
         
         # Always return a dictionary with both items and active_project_id
-        return {'items': items, "active_project_id": active_project_id}
+        return {'items': items, "active_project_id": active_project_id}, page_state
+
+    @app.callback(
+        Output("list-store", "data", allow_duplicate=True),
+        Output("project-page-store", "data", allow_duplicate=True),
+        Input("project-filter", "value"),
+        Input("project-prev-page", "n_clicks"),
+        Input("project-next-page", "n_clicks"),
+        State("project-page-store", "data"),
+        State("list-store", "data"),
+        prevent_initial_call=True
+    )
+    def page_projects(name_filter, _prev_clicks, _next_clicks, page_state, store_data):
+        trigger = ctx.triggered_id
+        if trigger == "project-filter":
+            page_state = move_page(dict(page_state or {}, filter=(name_filter or '').strip()), 'first')
+        elif trigger == "project-prev-page":
+            page_state = move_page(page_state, 'prev')
+        elif trigger == "project-next-page":
+            page_state = move_page(page_state, 'next')
+        else:
+            raise PreventUpdate
+        records, page_state = load_page(get_projects_page, page_state)
+        items = [project_to_store_item(rec) for rec in records]
+        # Keep the selected project if it is on the new page
+        active_project_id = store_data.get('active_project_id') if isinstance(store_data, dict) else None
+        if active_project_id not in {item['id'] for item in items}:
+            active_project_id = items[0]['id'] if items else None
+        return {'items': items, "active_project_id": active_project_id}, page_state
+
+    @app.callback(
+        Output("project-prev-page", "disabled"),
+        Output("project-next-page", "disabled"),
+        Output("project-page-info", "children"),
+        Input("project-page-store", "data")
+    )
+    def update_project_page_controls(page_state):
+        return page_controls_state(page_state)
 
     @app.callback(
         Output("list-group", "children", allow_duplicate=True),
@@ -208,6 +436,7 @@ def register_callbacks(app):
     
     @app.callback(
         Output("list-store", "data", allow_duplicate=True),
+        Output("project-page-store", "data", allow_duplicate=True),
         Input("update-project-button", "n_clicks"),
         State("project-name", "value"),
         State("project-description", "value"),
@@ -217,39 +446,29 @@ def register_callbacks(app):
         State("project-notebook-dropdown", "value"),
         State("list-store", "data"),
         State({"type": "list-group-item", "index": ALL}, "active"),
+        State("project-page-store", "data"),
         prevent_initial_call=True
     )
     def update_project_callback(update_clicks, name, description, catalog, schema, git_url,
                               training_notebook_file,
-                              store_data, active_states):
+                              store_data, active_states, page_state):
         # choose index
         try:
             idx = active_states.index(True)
         except (ValueError, TypeError):
             idx = len(store_data.get('items', [])) - 1
         if idx < 0:
-            return no_update
+            return no_update, no_update
         project_item = store_data.get('items', [])[idx]
         project_id = project_item.get('id')
         updated = update_project(project_id, name, description, catalog, schema, git_url, training_notebook_file)
         if updated is None:
-            return no_update
-        # Refresh list
-        df = get_projects()
-        items = []
-        if not df.empty:
-            for rec in df.to_dict(orient='records'):
-                items.append({
-                    'id': int(rec.get('id')),
-                    'text': rec.get('name'),
-                    'description': rec.get('description'),
-                    'catalog': rec.get('catalog'),
-                    'schema': rec.get('schema'),
-                    'git_url': rec.get('git_url'),
-                    'training_notebook': rec.get('training_notebook')
-                })
+            return no_update, no_update
+        # Refresh the current page
+        records, page_state = load_page(get_projects_page, page_state)
+        items = [project_to_store_item(rec) for rec in records]
        
-        return {'items': items, "active_project_id": project_id}
+        return {'items': items, "active_project_id": project_id}, page_state
     
     def get_project_from_store(store_data, project_id):
         """
@@ -343,14 +562,19 @@ def register_callbacks(app):
 
     @app.callback(
         [Output("dataset-list-group", "children"),
-         Output("dataset-store", "data")],
+         Output("dataset-store", "data"),
+         Output("dataset-page-store", "data")],
         Input("tabs", "active_tab"),
         Input({"type": "list-group-item", "index": ALL}, "active"),
         Input("create-dataset-button", "n_clicks"),
         Input("update-dataset-button", "n_clicks"),
         Input("delete-dataset-button", "n_clicks"),
+        Input("dataset-filter", "value"),
+        Input("dataset-prev-page", "n_clicks"),
+        Input("dataset-next-page", "n_clicks"),
         State("list-store", "data"),
         State("dataset-store", "data"),
+        State("dataset-page-store", "data"),
         State({"type": "dataset-group-item", "index": ALL}, "active"),
         State({"type": "dataset-group-item", "index": ALL}, "id"),
         # Dataset form fields
@@ -371,8 +595,8 @@ def register_callbacks(app):
         prevent_initial_call=True
     )
     def manage_datasets(active_tab, proj_active, create_ds, update_ds,
-                        delete_ds,
-                        proj_store, ds_store, ds_active, ds_ids,
+                        delete_ds, ds_filter, _ds_prev, _ds_next,
+                        proj_store, ds_store, ds_page_state, ds_active, ds_ids,
                         name, source_type, eol_def, feat_lookup_def,
                         source_table, timestamp_col,
                         eval_type, percentage,
@@ -388,36 +612,26 @@ def register_callbacks(app):
         eol_list = _to_list(eol_def)
         feat_list = _to_list(feat_lookup_def)
         # source_table is VARCHAR in the DB; use the raw string rather than an array
-        # Load datasets when entering Display tab or changing project
-        if ((trigger == "tabs" or (isinstance(trigger, dict) and trigger.get("type") == "list-group-item"))
-            and active_tab == "tab-dataset"):
+        # Load the first page of datasets when entering Display tab or changing project,
+        # or the requested page when filtering or paging
+        entering = ((trigger == "tabs" or (isinstance(trigger, dict) and trigger.get("type") == "list-group-item"))
+                    and active_tab == "tab-dataset")
+        paging = trigger in ("dataset-filter", "dataset-prev-page", "dataset-next-page")
+        if entering or paging:
             try:
                 pidx = proj_active.index(True)
             except (ValueError, TypeError):
-                return no_update, no_update
+                return no_update, no_update, no_update
             proj = proj_store.get("items", [])[pidx]
             pid = proj.get("id")
-            df = get_datasets(pid)
-            items = []
-            if not df.empty:
-                for rec in df.to_dict(orient="records"):
-                    items.append({
-                    "id": int(rec.get("id")),
-                    "text": rec.get("name"),
-                    "source_type": rec.get("source_type"),
-                    "eol_definition": rec.get("eol_definition"),
-                    "feature_lookup_definition": rec.get("feature_lookup_definition"),
-                    "source_table": rec.get("source_table"),
-                    "timestamp_col": rec.get("timestamp_col"),
-                    "evaluation_type": rec.get("evaluation_type"),
-                    "percentage": rec.get("percentage"),
-                    "source_table_eval": rec.get("source_table_eval"),
-                    "split_time_column": rec.get("split_time_column"),
-                    "materialized": rec.get("materialized"),
-                    "training_table_name": rec.get("training_table_name"),
-                    "eval_table_name": rec.get("eval_table_name"),
-                    "target": rec.get("target")
-                })
+            if trigger == "dataset-prev-page":
+                ds_page_state = move_page(ds_page_state, 'prev')
+            elif trigger == "dataset-next-page":
+                ds_page_state = move_page(ds_page_state, 'next')
+            else:
+                ds_page_state = move_page(dict(ds_page_state or {}, filter=(ds_filter or '').strip()), 'first')
+            records, ds_page_state = load_page(get_datasets_page, ds_page_state, pid)
+            items = [dataset_to_store_item(rec) for rec in records]
             list_items = []
             for i, it in enumerate(items):
                 list_items.append(
@@ -436,13 +650,13 @@ def register_callbacks(app):
                         disabled=True
                     )
                 ]
-            return list_items, {"items": items}
+            return list_items, {"items": items}, ds_page_state
         # Create a new dataset: give a placeholder 'New' entry with defaults
         if trigger == "create-dataset-button" and create_ds:
             try:
                 pidx = proj_active.index(True)
             except (ValueError, TypeError):
-                return no_update, no_update
+                return no_update, no_update, no_update
             proj = proj_store.get("items", [])[pidx]
             pid = proj.get("id")
             # Insert with minimal defaults (DB and UI will show 'New')
@@ -464,7 +678,7 @@ def register_callbacks(app):
                 "" # <-- Add empty target for new dataset
             )
             if dsid is None:
-                return no_update, no_update
+                return no_update, no_update, no_update
             new_items = ds_store.get("items", []) + [{
                 "id": dsid,
                 "text": "New",
@@ -491,14 +705,14 @@ def register_callbacks(app):
                     active=False
                 ) for itm in new_items
             ]
-            return list_items, {"items": new_items}
+            return list_items, {"items": new_items}, no_update
         # Update existing dataset
         if trigger == "update-dataset-button" and update_ds:
             # Determine project index
             try:
                 pidx = proj_active.index(True)
             except (ValueError, TypeError):
-                return no_update, no_update
+                return no_update, no_update, no_update
             # Determine dataset index, fallback to the last item if none selected
             try:
                 didx = ds_active.index(True)
@@ -506,7 +720,7 @@ def register_callbacks(app):
                 items_prior = ds_store.get("items", [])
                 didx = len(items_prior) - 1
                 if didx < 0:
-                    return no_update, no_update
+                    return no_update, no_update, no_update
             proj = proj_store.get("items", [])[pidx]
             pid = proj.get("id")
             ds_it = ds_store.get("items", [])[didx]
@@ -530,29 +744,10 @@ def register_callbacks(app):
                 target
             )
             if upd is None:
-                return no_update, no_update
-            # Reload all datasets for this project from DB
-            df = get_datasets(pid)
-            items = []
-            if not df.empty:
-                for rec in df.to_dict(orient="records"):
-                    items.append({
-                        "id": int(rec.get("id")),
-                        "text": rec.get("name"),
-                        "source_type": rec.get("source_type"),
-                        "eol_definition": rec.get("eol_definition"),
-                        "feature_lookup_definition": rec.get("feature_lookup_definition"),
-                        "source_table": rec.get("source_table"),
-                        "timestamp_col": rec.get("timestamp_col"),
-                        "evaluation_type": rec.get("evaluation_type"),
-                        "percentage": rec.get("percentage"),
-                        "source_table_eval": rec.get("source_table_eval"),
-                        "split_time_column": rec.get("split_time_column"),
-                        "materialized": rec.get("materialized"),
-                        "training_table_name": rec.get("training_table_name"),
-                        "eval_table_name": rec.get("eval_table_name"),
-                        "target": rec.get("target")
-                    })
+                return no_update, no_update, no_update
+            # Reload the current page of datasets for this project from DB
+            records, ds_page_state = load_page(get_datasets_page, ds_page_state, pid)
+            items = [dataset_to_store_item(rec) for rec in records]
             list_items = [
                 dbc.ListGroupItem(
                     itm["text"],
@@ -561,7 +756,7 @@ def register_callbacks(app):
                     active=(itm["id"] == dsid)
                 ) for itm in items
             ]
-            return list_items, {"items": items}
+            return list_items, {"items": items}, ds_page_state
         # Delete the selected dataset
         if trigger == "delete-dataset-button" and delete_ds:
             print("Delete dataset triggered")
@@ -570,7 +765,7 @@ def register_callbacks(app):
                 pidx = proj_active.index(True)
             except (ValueError, TypeError):
                 print("No project selected for delete")
-                return no_update, no_update
+                return no_update, no_update, no_update
             proj = proj_store.get("items", [])[pidx]
             pid = proj.get("id")
             
@@ -580,7 +775,7 @@ def register_callbacks(app):
             except (ValueError, TypeError):
                 print("No dataset selected for delete")
                 # Optionally show a message to the user here
-                return no_update, no_update
+                return no_update, no_update, no_update
             
             ds_it = ds_store.get("items", [])[didx]
             dsid = ds_it.get("id")
@@ -591,31 +786,12 @@ def register_callbacks(app):
             if not success:
                 print(f"Failed to delete dataset {dsid}")
                 # Optionally show an error message
-                return no_update, no_update
+                return no_update, no_update, no_update
             
             print(f"Successfully deleted dataset {dsid}")
-            # Reload datasets for this project from DB
-            df = get_datasets(pid)
-            items = []
-            if not df.empty:
-                for rec in df.to_dict(orient="records"):
-                    items.append({
-                        "id": int(rec.get("id")),
-                        "text": rec.get("name"),
-                        "source_type": rec.get("source_type"),
-                        "eol_definition": rec.get("eol_definition"),
-                        "feature_lookup_definition": rec.get("feature_lookup_definition"),
-                        "source_table": rec.get("source_table"),
-                        "timestamp_col": rec.get("timestamp_col"),
-                        "evaluation_type": rec.get("evaluation_type"),
-                        "percentage": rec.get("percentage"),
-                        "source_table_eval": rec.get("source_table_eval"),
-                        "split_time_column": rec.get("split_time_column"),
-                        "materialized": rec.get("materialized"),
-                        "training_table_name": rec.get("training_table_name"),
-                        "eval_table_name": rec.get("eval_table_name"),
-                        "target": rec.get("target")
-                    })
+            # Reload the current page of datasets for this project from DB
+            records, ds_page_state = load_page(get_datasets_page, ds_page_state, pid)
+            items = [dataset_to_store_item(rec) for rec in records]
             list_items = []
             for i, itm in enumerate(items):
                  list_items.append(
@@ -639,8 +815,17 @@ def register_callbacks(app):
             # Clear the form fields as well after delete
             # TODO: This might be better handled by triggering the form population callback
             # For now, returning no_update for the form fields.
-            return list_items, {"items": items}
-        return no_update, no_update
+            return list_items, {"items": items}, ds_page_state
+        return no_update, no_update, no_update
+    @app.callback(
+        Output("dataset-prev-page", "disabled"),
+        Output("dataset-next-page", "disabled"),
+        Output("dataset-page-info", "children"),
+        Input("dataset-page-store", "data")
+    )
+    def update_dataset_page_controls(page_state):
+        return page_controls_state(page_state)
+
     # -- Dataset list item active-state callback --------------------------------
     @app.callback(
         Output({"type": "dataset-group-item", "index": ALL}, "active"),
@@ -689,6 +874,8 @@ def register_callbacks(app):
         Output("dataset-materialized", "value"),
         Output("materialize-dataset-button", "disabled"),
         Output("dataset-target", "value"),
+        Output("materialize-job-store", "data", allow_duplicate=True),
+        Output("materialize-poll-interval", "disabled", allow_duplicate=True),
         Input({"type": "dataset-group-item", "index": ALL}, "active"),
         Input("create-dataset-button", "n_clicks"),
         State("dataset-store", "data"),
@@ -714,7 +901,9 @@ def register_callbacks(app):
                 "",              # eval_table_name
                 [],                # materialized
                 False,             # materialize button disabled
-                ""               # <-- Clear target on create
+                "",              # <-- Clear target on create
+                no_update,       # materialize job store
+                no_update        # poll interval
             )
         # Selection: populate from store, set button disabled based on materialized state
         if isinstance(trig, dict) and trig.get('type') == 'dataset-group-item':
@@ -731,6 +920,8 @@ def register_callbacks(app):
             # EOL/feature strings
             eol_str = ', '.join(ds.get('eol_definition') or [])
             feat_str = ', '.join(ds.get('feature_lookup_definition') or [])
+            # One job per dataset at a time: while one is unfinished, follow it instead
+            active_job_id = get_active_materialization_job(ds.get('id'))
             return (
                 ds.get('text', ''),
                 ds.get('source_type', ''),
@@ -745,20 +936,26 @@ def register_callbacks(app):
                 ds.get('training_table_name', ''),
                 ds.get('eval_table_name', ''),
                 mat_checklist_value,
-                materialized_status,  # Set button disabled state
-                ds.get('target', '') # <-- Populate target on selection
+                # Re-materializing stays enabled once the dataset's job is done: dynamic tables pick up
+                # new rows incrementally, and an unchanged source reuses the existing tables (fingerprint cache)
+                active_job_id is not None,
+                ds.get('target', ''), # <-- Populate target on selection
+                {'job_id': active_job_id} if active_job_id is not None else no_update,
+                False if active_job_id is not None else no_update
             )
         # Other triggers: no update
         raise PreventUpdate
     
     @app.callback(
         Output("list-store", "data", allow_duplicate=True),
+        Output("project-page-store", "data", allow_duplicate=True),
         Input("delete-project-button", "n_clicks"),
         State("list-store", "data"),
         State({"type": "list-group-item", "index": ALL}, "active"),
+        State("project-page-store", "data"),
         prevent_initial_call=True
     )
-    def delete_project_callback(delete_clicks, store_data, active_states):
+    def delete_project_callback(delete_clicks, store_data, active_states, page_state):
         print("delete_project_callback")
         if not store_data or not active_states:
             raise PreventUpdate
@@ -771,24 +968,13 @@ def register_callbacks(app):
         # Delete project and its datasets
         success = delete_project(project_id)
         if not success:
-            return no_update
-        # Refresh list
-        df = get_projects()
-        items = []
-        if not df.empty:
-            for rec in df.to_dict(orient='records'):
-                items.append({
-                    'id': int(rec.get('id')),
-                    'text': rec.get('name'),
-                    'description': rec.get('description'),
-                    'catalog': rec.get('catalog'),
-                    'schema': rec.get('schema'),
-                    'git_url': rec.get('git_url'),
-                    'training_notebook': rec.get('training_notebook')
-                })
+            return no_update, no_update
+        # Refresh the current page
+        records, page_state = load_page(get_projects_page, page_state)
+        items = [project_to_store_item(rec) for rec in records]
         # Set active project to first item if available, otherwise None
         active_project_id = items[0]['id'] if items else None
-        return {'items': items, "active_project_id": active_project_id}
+        return {'items': items, "active_project_id": active_project_id}, page_state
     
     # -- Callback to control visibility of conditional form fields ---
     @app.callback(
@@ -824,7 +1010,7 @@ def register_callbacks(app):
             timestamp_col_style = {}
 
         # Show fields based on evaluation_type
-        if eval_type == "random":
+        if eval_type in ("random", "stratified"):
             percentage_style = {}
         elif eval_type == "table":
             eval_table_style = {}
@@ -850,12 +1036,15 @@ def register_callbacks(app):
         return None
 
     # -- Materialize Dataset Callback -----------------------------------------
+    # Submits a background job (utils.materialize) and returns immediately;
+    # poll_materialization_job follows its progress.
     @app.callback(
-        Output("dataset-store", "data", allow_duplicate=True),
-        Output("dataset-training-table-name", "value", allow_duplicate=True),
-        Output("dataset-eval-table-name", "value", allow_duplicate=True),
-        Output("dataset-materialized", "value", allow_duplicate=True),
-        # Consider adding an Output for user feedback (e.g., an Alert)
+        Output("materialize-job-store", "data"),
+        Output("materialize-poll-interval", "disabled"),
+        Output("materialize-status", "children"),
+        Output("materialize-pending-store", "data"),
+        Output("materialize-confirm", "style"),
+        Output("materialize-dataset-button", "disabled", allow_duplicate=True),
         Input("materialize-dataset-button", "n_clicks"),
         # Get necessary state: selected project/dataset, form values for logic
         State("list-store", "data"),
@@ -870,6 +1059,9 @@ def register_callbacks(app):
         State("dataset-split-time-column", "value"),
         State("dataset-timestamp-col", "value"),
         State("dataset-target", "value"),
+        State("dataset-table-snapshot-mode", "value"),
+        State("dataset-cv-folds", "value"),
+        State("dataset-fold-strategy", "value"),
         # Get dataset ID directly (needed for update_dataset)
         State({"type": "dataset-group-item", "index": ALL}, "id"),
         prevent_initial_call=True
@@ -877,13 +1069,11 @@ def register_callbacks(app):
     def materialize_dataset_callback(n_clicks, list_store, ds_store, proj_active, ds_active,
                                    source_table, source_type, eval_type, percentage,
                                    source_table_eval_input, split_time_input, timestamp_col,
-                                   target, ds_ids):
+                                   target, table_snapshot_mode, cv_folds, fold_strategy, ds_ids):
         if not n_clicks or n_clicks < 1:
             raise PreventUpdate
 
         print("Materialize button clicked")
-        conn_db = None # Databricks connection
-        sql_success = False
 
         # --- 1. Get Selected Project and Dataset --- 
         if not list_store or not ds_store or not proj_active or not ds_active:
@@ -891,12 +1081,10 @@ def register_callbacks(app):
              raise PreventUpdate
 
         try:
-            proj_idx = proj_active.index(True)
+            proj_active.index(True)
             ds_idx = ds_active.index(True)
         except ValueError:
-            print("No active project or dataset selected")
-            # TODO: Show user feedback (e.g., dbc.Alert)
-            raise PreventUpdate
+            return no_update, no_update, dbc.Alert("Select a project and a dataset to materialize.", color="warning"), no_update, no_update, no_update
             
         # Extract the ID of the selected dataset using its index
         selected_ds_id_obj = ds_ids[ds_idx]
@@ -912,181 +1100,157 @@ def register_callbacks(app):
         if not project or not dataset:
             print("Could not find project or dataset in store")
             raise PreventUpdate
-            
-        project_catalog = project.get('catalog')
-        project_schema = project.get('schema')
-        ds_id = dataset.get('id')
-        ds_name = dataset.get('text') # Use the stored name
-        
-        if not all([project_catalog, project_schema, source_table, ds_name]): # Added ds_name check
-            print("Missing required info: catalog, schema, source table, or dataset name")
-            # TODO: Show user feedback
-            raise PreventUpdate
 
-        # --- 2. Generate Table Names --- 
-        timestamp_suffix = int(time.time())
-        # Sanitize dataset name for use in table names
-        sanitized_ds_name = ds_name.replace(' ', '_')
-        
-        # Use sanitized dataset name as the base for generated tables
-        target_base = f"{project_catalog}.{project_schema}.{sanitized_ds_name}"
-        training_table_name = f"{target_base}_training_{timestamp_suffix}"
-        generated_eval_table_name = f"{target_base}_eval_{timestamp_suffix}"
-
-        # Determine qualified source table name (needed for SELECT)
-        source_parts = source_table.split('.')
-        if len(source_parts) == 1:
-            qualified_source_table = f"{project_catalog}.{project_schema}.{source_parts[0]}"
-        elif len(source_parts) == 2:
-            qualified_source_table = f"{project_catalog}.{source_parts[0]}.{source_parts[1]}"
-        else: # Assume already fully qualified
-            qualified_source_table = source_table
-            
-        print(f"Using Dataset Name: {ds_name} (Sanitized: {sanitized_ds_name})")
-        print(f"Source Table (Qualified): {qualified_source_table}")
-        print(f"Generated training table: {training_table_name}")
-        print(f"Generated eval table: {generated_eval_table_name}")
-
-        # --- 3. Execute Databricks SQL --- 
-        print("Attempting to connect to Databricks...")
-        conn_db = get_databricks_connection()
-        if conn_db is None:
-            print("Databricks connection failed")
-            # TODO: Show user feedback
-            raise PreventUpdate # Or return specific error state
-        
+        # --- 2. Build the Job (table names, statements) --- 
         try:
-            print(f"Generating SQL for eval_type: {eval_type}")
-            sql_train = ""
-            sql_eval = ""
-
-            if eval_type == "random":
-                if percentage is None or not (0 < percentage < 1):
-                    print("Invalid percentage for random split.")
-                    # TODO: User feedback
-                    raise PreventUpdate 
-                # Use random split approach
-                temp_table_name = f"{target_base}_temp_split_{timestamp_suffix}"
-                sql_create_temp = f"CREATE TABLE {temp_table_name} AS SELECT *, rand() as __rand_split FROM {qualified_source_table}"
-                sql_train = f"CREATE TABLE {training_table_name} AS SELECT * EXCEPT (__rand_split) FROM {temp_table_name} WHERE __rand_split >= {percentage}"
-                sql_eval = f"CREATE TABLE {generated_eval_table_name} AS SELECT * EXCEPT (__rand_split) FROM {temp_table_name} WHERE __rand_split < {percentage}"
-                sql_drop_temp = f"DROP TABLE IF EXISTS {temp_table_name}"
-                
-                print("Executing: Create Temp Table")
-                if not execute_sql(conn_db, sql_create_temp):
-                     raise Exception("Failed to create temporary split table")
-                print("Executing: Create Training Table")
-                if not execute_sql(conn_db, sql_train):
-                    raise Exception("Failed to create training table")
-                print("Executing: Create Eval Table")
-                if not execute_sql(conn_db, sql_eval):
-                    raise Exception("Failed to create eval table")
-                print("Executing: Drop Temp Table")
-                execute_sql(conn_db, sql_drop_temp) # Try to cleanup even if subsequent steps fail
-                sql_success = True # If all steps passed
-
-            elif eval_type == "table":
-                if not source_table_eval_input:
-                    print("Missing evaluation table name for 'table' split type.")
-                    # TODO: User feedback
-                    raise PreventUpdate
-                # Assume eval_table_input is qualified or in the same catalog/schema context
-                # Training table is the full source
-                sql_train = f"CREATE TABLE {training_table_name} AS SELECT * FROM {qualified_source_table}"
-                # Eval table is a copy of the user-provided table (use renamed state variable)
-                sql_eval = f"CREATE TABLE {generated_eval_table_name} AS SELECT * FROM {source_table_eval_input}"
-                
-                print("Executing: Create Training Table")
-                if not execute_sql(conn_db, sql_train):
-                     raise Exception("Failed to create training table")
-                print("Executing: Create Eval Table from Input")
-                if not execute_sql(conn_db, sql_eval):
-                     raise Exception("Failed to create eval table")
-                sql_success = True
-
-            elif eval_type == "timestamp":
-                if not timestamp_col or not split_time_input:
-                    print("Missing timestamp column or split timestamp for 'timestamp' split type.")
-                    # TODO: User feedback
-                    raise PreventUpdate
-                # Ensure split_time_input is appropriately quoted if it's a string timestamp
-                # Assuming it's a standard timestamp format recognized by Databricks SQL
-                sql_train = f"CREATE TABLE {training_table_name} AS SELECT * FROM {qualified_source_table} WHERE {timestamp_col} < '{split_time_input}'"
-                sql_eval = f"CREATE TABLE {generated_eval_table_name} AS SELECT * FROM {qualified_source_table} WHERE {timestamp_col} >= '{split_time_input}'"
-                
-                print("Executing: Create Training Table")
-                if not execute_sql(conn_db, sql_train):
-                     raise Exception("Failed to create training table")
-                print("Executing: Create Eval Table")
-                if not execute_sql(conn_db, sql_eval):
-                     raise Exception("Failed to create eval table")
-                sql_success = True
-
-            else:
-                print(f"Unknown evaluation type: {eval_type}")
-                raise PreventUpdate
-
-        except Exception as e:
-            print(f"Databricks SQL execution failed: {e}")
-            sql_success = False
-            # TODO: Show user feedback 
-            # Optional: Attempt cleanup like dropping partially created tables
-            # execute_sql(conn_db, f"DROP TABLE IF EXISTS {training_table_name}")
-            # execute_sql(conn_db, f"DROP TABLE IF EXISTS {generated_eval_table_name}")
-
-        finally:
-            if conn_db:
-                conn_db.close()
-                print("Databricks connection closed.")
-
-        if not sql_success:
-            print("Materialization failed due to SQL execution error.")
+            spec = build_materialization_spec(
+                dataset, project, source_table, source_type, eval_type, percentage,
+                source_table_eval_input, split_time_input, timestamp_col, target,
+                table_snapshot_mode=table_snapshot_mode, cv_folds=cv_folds, fold_strategy=fold_strategy
+            )
+        except ValueError as e:
+            return no_update, no_update, dbc.Alert(str(e), color="danger"), None, {"display": "none"}, no_update
+
+        print(f"Generated training table: {spec['training_table_name']}")
+        print(f"Generated eval table: {spec['eval_table_name']}")
+
+        # --- 3. Preview the cost (EXPLAIN COST) --- 
+        if MATERIALIZE_COST_PREVIEW:
+            spec['cost_estimate'] = estimate_materialization_cost(spec, build_stages(spec))
+            if spec['cost_estimate'] and spec['cost_estimate']['needs_confirmation']:
+                # Hold the spec on the server until the user confirms or cancels; the page keeps its job ID
+                pending_job_id = hold_materialization(spec)
+                if pending_job_id is None:
+                    return no_update, no_update, dbc.Alert("Could not record the materialization job.", color="danger"), None, {"display": "none"}, no_update
+                return no_update, no_update, render_cost_estimate(spec['cost_estimate']), {'job_id': pending_job_id}, {}, no_update
+
+        # --- 4. Submit --- 
+        return submit_materialization_and_render(spec)
+
+    def submit_materialization_and_render(spec=None, pending_job_id=None):
+        """Submits a spec, or a confirmed pending job; returns the outputs of the materialize callbacks."""
+        job_id = submit_materialization(spec) if pending_job_id is None else submit_pending_materialization(pending_job_id)
+        if job_id is None:
+            return no_update, no_update, dbc.Alert("Could not record the materialization job.", color="danger"), None, {"display": "none"}, no_update
+        # An unfinished job of the dataset is returned instead of a new one; either way, follow it
+        print(f"Following materialization job {job_id}")
+        # The button stays disabled until poll_materialization_job sees the job finish
+        return {'job_id': job_id}, False, render_materialization_job(get_materialization_job(job_id)), None, {"display": "none"}, True
+
+    # Runs (or drops) a materialization held back by the cost preview
+    @app.callback(
+        Output("materialize-job-store", "data", allow_duplicate=True),
+        Output("materialize-poll-interval", "disabled", allow_duplicate=True),
+        Output("materialize-status", "children", allow_duplicate=True),
+        Output("materialize-pending-store", "data", allow_duplicate=True),
+        Output("materialize-confirm", "style", allow_duplicate=True),
+        Output("materialize-dataset-button", "disabled", allow_duplicate=True),
+        Input("materialize-confirm-button", "n_clicks"),
+        Input("materialize-cancel-button", "n_clicks"),
+        State("materialize-pending-store", "data"),
+        prevent_initial_call=True
+    )
+    def confirm_materialization(confirm_clicks, cancel_clicks, pending):
+        pending_job_id = (pending or {}).get('job_id')
+        if not pending_job_id:
             raise PreventUpdate
-            
-        print("Databricks SQL execution successful")
-
-        # --- 4. Update Database Record --- 
-        print(f"Updating dataset ID: {ds_id} in database")
-        updated = update_dataset(
-            ds_id,
-            name=ds_name,
-            source_type=source_type,
-            eol_definition=dataset.get('eol_definition'),
-            feature_lookup_definition=dataset.get('feature_lookup_definition'),
-            source_table=source_table,
-            evaluation_type=eval_type,
-            percentage=percentage,
-            source_table_eval=source_table_eval_input,
-            split_time_column=split_time_input,
-            timestamp_col=timestamp_col,
-            materialized=True,
-            training_table_name=training_table_name,
-            eval_table_name=generated_eval_table_name,
-            target=target
-        )
+        if ctx.triggered_id == "materialize-cancel-button":
+            discard_pending_materialization(pending_job_id)
+            return no_update, no_update, dbc.Alert("Materialization cancelled.", color="secondary"), None, {"display": "none"}, no_update
+        return submit_materialization_and_render(pending_job_id=pending_job_id)
 
-        if updated is None:
-            print("Database update failed")
-            # TODO: Show user feedback
+    @app.callback(
+        Output("materialize-status", "children", allow_duplicate=True),
+        Output("materialize-poll-interval", "disabled", allow_duplicate=True),
+        Output("dataset-store", "data", allow_duplicate=True),
+        Output("dataset-training-table-name", "value", allow_duplicate=True),
+        Output("dataset-eval-table-name", "value", allow_duplicate=True),
+        Output("dataset-materialized", "value", allow_duplicate=True),
+        Output("materialize-dataset-button", "disabled", allow_duplicate=True),
+        Input("materialize-poll-interval", "n_intervals"),
+        State("materialize-job-store", "data"),
+        State("dataset-store", "data"),
+        State({"type": "dataset-group-item", "index": ALL}, "active"),
+        State({"type": "dataset-group-item", "index": ALL}, "id"),
+        prevent_initial_call=True
+    )
+    def poll_materialization_job(_, job_store, ds_store, ds_active, ds_ids):
+        job_id = (job_store or {}).get('job_id')
+        if not job_id:
+            return no_update, True, no_update, no_update, no_update, no_update, no_update
+        job = get_materialization_job(job_id)
+        if job is None:
             raise PreventUpdate
-            
-        print("Database update successful")
-
-        # --- 5. Update Store and Form --- 
-        # Find the dataset in the store and update it
+        status = render_materialization_job(job)
+        # Only touch the form if the job's dataset is still the selected one
+        try:
+            selected_id = ds_ids[ds_active.index(True)].get('index')
+        except (ValueError, AttributeError, IndexError, TypeError):
+            selected_id = None
+        selected = selected_id == job['dataset_id']
+        if job['status'] not in FINISHED_STATUSES:
+            return status, False, no_update, no_update, no_update, no_update, True if selected else no_update
+        if job['status'] != 'succeeded':
+            return status, True, no_update, no_update, no_update, no_update, False if selected else no_update
+
+        # --- Succeeded: update Store and Form --- 
+        spec = job['spec']
+        # Tables actually in use (a reused job keeps the previous ones)
+        result = job.get('result') or {}
+        training_table = result.get('training_table_name', spec['training_table_name'])
+        eval_table = result.get('eval_table_name', spec['eval_table_name'])
         updated_items = []
-        for item in ds_store.get('items', []):
-            if item.get('id') == ds_id:
+        for item in (ds_store or {}).get('items', []):
+            if item.get('id') == job['dataset_id']:
                 item['materialized'] = True
-                item['training_table_name'] = training_table_name
-                item['eval_table_name'] = generated_eval_table_name
-                item['target'] = target
+                item['training_table_name'] = training_table
+                item['eval_table_name'] = eval_table
+                item['target'] = spec['target']
             updated_items.append(item)
 
-        # Update form fields and checklist
+        if not selected:
+            return status, True, {'items': updated_items}, no_update, no_update, no_update, no_update
         new_materialized_value = [True] # Checklist expects a list
+        return (status, True, {'items': updated_items},
+                training_table, eval_table, new_materialized_value, False)
 
-        return ({'items': updated_items}, training_table_name, generated_eval_table_name, new_materialized_value)
+    # -- Table Profile Callback -----------------------------------------------
+    # Cached per table version in Postgres, so reopening a dataset is instant.
+    @app.callback(
+        Output("profile-output", "children"),
+        Input("profile-table-button", "n_clicks"),
+        Input("profile-refresh-button", "n_clicks"),
+        State("profile-table-choice", "value"),
+        State("dataset-source-table", "value"),
+        State("dataset-training-table-name", "value"),
+        State("dataset-eval-table-name", "value"),
+        State("dataset-target", "value"),
+        State("list-store", "data"),
+        prevent_initial_call=True
+    )
+    def profile_dataset_table(profile_clicks, refresh_clicks, choice, source_table,
+                              training_table, eval_table, target, list_store):
+        if not profile_clicks and not refresh_clicks:
+            raise PreventUpdate
+        if choice == "source":
+            project = get_project_from_store(list_store, (list_store or {}).get('active_project_id'))
+            first_source = (source_table or "").split(',')[0].strip()
+            if not project or not first_source:
+                return dbc.Alert("Select a project and enter a source table to profile.", color="warning")
+            table = qualify_table_name(first_source, project.get('catalog'), project.get('schema'))
+        else:
+            table = training_table if choice == "training" else eval_table
+            if not table:
+                return dbc.Alert("Materialize the dataset before profiling its tables.", color="warning")
+
+        try:
+            profile, cached = profile_table(
+                table, target=(target or "").strip() or None,
+                refresh=ctx.triggered_id == "profile-refresh-button"
+            )
+        except ProfileError as e:
+            return dbc.Alert(str(e), color="danger")
+        return render_table_profile(profile, cached)
     
     @app.callback(
         Output("train-status-output", "children"),
@@ -1129,8 +1293,11 @@ def register_callbacks(app):
         except json.JSONDecodeError as e:
             return dbc.Alert(f"Error parsing parameters JSON: {e}", color="danger")
 
-        # --- 3. Check Existing Training Job Record --- #
-        training_record = get_training_job(project_id, selected_ds_id)
+        # --- 3. Fetch Training Record, Dataset and Git Details Concurrently --- #
+        # get_training_job, get_dataset_details and get_project_git_details are independent
+        training_record, dataset_details, raw_git_details = load_training_context(project_id, selected_ds_id)
+
+        # --- Check Existing Training Job Record --- #
         db_job_id = None
         training_record_id = None
 
@@ -1142,12 +1309,9 @@ def register_callbacks(app):
             print("No existing training record found, will create one.")
 
         # --- 4. Get Job Details (Dataset Target, Git Info, etc.) --- #
-        dataset_details = get_dataset_details(selected_ds_id)
-        project_details = get_project_from_store(proj_store, project_id)
-        
-        # Get base git details (provider, branch, notebook_path from env/fallbacks in db.py)
+        # raw_git_details holds provider, branch, notebook_path from env/fallbacks in db.py
         # and potentially a DB-fetched or default git_url if not in project_details
-        raw_git_details = get_project_git_details(project_id)
+        project_details = get_project_from_store(proj_store, project_id)
 
         if not dataset_details or not project_details:
             return dbc.Alert("Error: Could not retrieve necessary project/dataset details.", color="danger")
@@ -1190,6 +1354,7 @@ def register_callbacks(app):
                 # --- 5a. Run Existing Job --- #
                 print(f"Running existing Databricks Job ID: {db_job_id}")
                 run_info = run_training_job(db_job_id)
+                record_training_run(project_id, selected_ds_id, db_job_id, run_info.run_id, json.dumps(parameters))
                 return dbc.Alert(f"Started existing job {db_job_id}. Run ID: {run_info.run_id}", color="info")
             else:
                 # --- 5b. Create New Job --- # 
@@ -1252,6 +1417,7 @@ def register_callbacks(app):
                 # --- 5d. Run New Job --- #
                 print(f"Running newly created Databricks Job ID: {new_job_id}")
                 run_info = run_training_job(new_job_id)
+                record_training_run(project_id, selected_ds_id, new_job_id, run_info.run_id, json.dumps(parameters))
                 return dbc.Alert(f"Created job {new_job_id} and started run. Run ID: {run_info.run_id}", color="success")
 
         except Exception as e:
@@ -1259,6 +1425,47 @@ def register_callbacks(app):
             print(f"Error during training job creation/run: {traceback.format_exc()}")
             return dbc.Alert(f"An error occurred: {e}", color="danger")
     
+    # --- Training history (served from Postgres; the jobs API is only called on Refresh Status) --- #
+    @app.callback(
+        Output("train-history-list", "children"),
+        Input("tabs", "active_tab"),
+        Input("train-dataset-dropdown", "value"),
+        Input("train-status-output", "children"), # Re-render after a submission
+        Input("train-history-refresh-button", "n_clicks"),
+        prevent_initial_call=True
+    )
+    def update_training_history(active_tab, dataset_id, _status, _refresh_clicks):
+        if active_tab != 'tab-train':
+            raise PreventUpdate
+        if not dataset_id:
+            return html.Tr(html.Td("Select a dataset to see its training history.", colSpan=6))
+
+        runs = get_training_runs(dataset_id)
+        if ctx.triggered_id == "train-history-refresh-button":
+            pending = [run for run in runs if run.run_id and run.status not in TERMINAL_RUN_STATUSES]
+            for run in pending:
+                try:
+                    state = get_training_run_status(run.run_id)
+                except Exception as e:
+                    print(f"Error fetching status for run {run.run_id}: {e}")
+                    continue
+                update_training_run_status(run.id, state['status'], state['finished_at'], state['duration_seconds'])
+            if pending:
+                runs = get_training_runs(dataset_id)
+
+        if not runs:
+            return html.Tr(html.Td("No training runs recorded for this dataset yet.", colSpan=6))
+        return [
+            html.Tr([
+                html.Td(run.submitted_at.strftime("%Y-%m-%d %H:%M:%S") if run.submitted_at else "N/A"),
+                html.Td(run.job_id),
+                html.Td(run.run_id if run.run_id is not None else "N/A"),
+                html.Td(run.status),
+                html.Td(format_duration(run.duration_seconds)),
+                html.Td(html.Code(json.dumps(run.parameters)) if run.parameters else "-")
+            ]) for run in runs
+        ]
+
     @app.callback(
         Output("train-mlflow-runs-list", "children"),
         Input("tabs", "active_tab"),
@@ -1291,24 +1498,32 @@ def register_callbacks(app):
         
         target_model_name = None
         dataset_name_for_model = None
+        # job_id -> {'dataset_id', 'name'}; all job IDs are resolved in one query
+        datasets_by_job_id = {}
+        resolved_job_ids = set()
+        dataset_lookup_failed = False
 
         if pre_error_msg:
             print(f"MLflow fetch error (pre-fetch for dataset name): {pre_error_msg}")
             # Proceed without target_model_name, table will show N/A for model columns
         elif pre_runs:
+            pre_job_ids = get_run_job_ids(pre_runs)
+            lookup = get_datasets_by_job_ids(pre_job_ids)
+            if lookup is None:
+                dataset_lookup_failed = True
+            else:
+                datasets_by_job_id.update(lookup)
+                resolved_job_ids |= pre_job_ids
+
             for pre_run in pre_runs:
-                pre_run_data = pre_run.get('data', {})
-                pre_tags = {tag['key']: tag['value'] for tag in pre_run_data.get('tags', [])}
-                job_id_str = pre_tags.get('mlflow.databricks.jobID')
-                if job_id_str:
-                    try:
-                        dataset_name_for_model = get_dataset_name_by_job_id(int(job_id_str))
-                        if dataset_name_for_model:
-                            break # Found a dataset name
-                    except ValueError:
-                        pass # Invalid job ID format
-                    except Exception as e:
-                        print(f"Error looking up dataset by job ID {job_id_str} for model naming: {e}")
+                job_id_str = get_run_tags(pre_run).get('mlflow.databricks.jobID')
+                try:
+                    dataset = datasets_by_job_id.get(int(job_id_str)) if job_id_str else None
+                except ValueError:
+                    dataset = None # Invalid job ID format
+                if dataset:
+                    dataset_name_for_model = dataset['name']
+                    break # Found a dataset name
             
             if dataset_name_for_model and catalog and schema:
                 sanitized_dataset_name = dataset_name_for_model.replace(" ", "_").replace("-", "_") # Basic sanitization
@@ -1332,6 +1547,15 @@ def register_callbacks(app):
         if not runs:
             return html.Tr(html.Td("No runs found for this experiment.", colSpan=7))
 
+        # Resolve any job IDs that only appeared after the pre-fetch, again in one query
+        unresolved_job_ids = get_run_job_ids(runs) - resolved_job_ids
+        if unresolved_job_ids and not dataset_lookup_failed:
+            lookup = get_datasets_by_job_ids(unresolved_job_ids)
+            if lookup is None:
+                dataset_lookup_failed = True
+            else:
+                datasets_by_job_id.update(lookup)
+
         table_rows = []
         host = os.getenv("DATABRICKS_HOST") 
         if host and not host.startswith('https://'):
@@ -1342,7 +1566,7 @@ def register_callbacks(app):
             run_data = run.get('data', {})
             run_id = run_info.get('run_id', 'N/A')
             
-            tags = {tag['key']: tag['value'] for tag in run_data.get('tags', [])}
+            tags = get_run_tags(run)
             job_id_str = tags.get('mlflow.databricks.jobID')
             job_run_id_str = tags.get('mlflow.databricks.jobRunID')
 
@@ -1376,13 +1600,15 @@ def register_callbacks(app):
             dataset_name_display = "N/A" 
             if job_id_str:
                 try:
-                    dataset_name_from_db = get_dataset_name_by_job_id(int(job_id_str))
-                    dataset_name_display = dataset_name_from_db if dataset_name_from_db else "Dataset Not Found"
+                    dataset = datasets_by_job_id.get(int(job_id_str))
+                    if dataset:
+                        dataset_name_display = dataset['name']
+                    elif dataset_lookup_failed:
+                        dataset_name_display = "DB Lookup Error"
+                    else:
+                        dataset_name_display = "Dataset Not Found"
                 except ValueError:
                     dataset_name_display = "Invalid Job ID Tag"
-                except Exception as e:
-                    print(f"Error looking up dataset by job ID {job_id_str}: {e}")
-                    dataset_name_display = "DB Lookup Error"
             else:
                  dataset_name_display = "Job ID Tag Missing"
                  
@@ -1440,18 +1666,13 @@ def register_callbacks(app):
             return [], None 
 
         print(f"Populating dataset dropdown for project ID: {project_id}")
-        df_datasets = get_datasets(project_id)
-        options = []
-        value = None
-        if not df_datasets.empty:
-            # Only include materialized datasets? Or all? Let's include all for now.
-            # Might want to filter: df_datasets = df_datasets[df_datasets['materialized'] == True]
-            options = [
-                {'label': row['name'], 'value': row['id']}
-                for index, row in df_datasets.iterrows()
-            ]
-            if options: # Set default value to the first dataset
-                value = options[0]['value']
+        # Only include materialized datasets? Or all? Let's include all for now.
+        # Might want to filter: [row for row in get_datasets(project_id) if row.materialized]
+        options = [
+            {'label': row.name, 'value': row.id}
+            for row in get_datasets(project_id)
+        ]
+        value = options[0]['value'] if options else None # Set default value to the first dataset
         
         return options, value
     # --- End Dropdown Population Callback --- #
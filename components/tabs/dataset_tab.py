@@ -1,5 +1,27 @@
 import dash_bootstrap_components as dbc
 from dash import html, dcc
+from utils.materialize import DEFAULT_TABLE_SNAPSHOT_MODE
+
+def dataset_to_store_item(rec):
+    """Converts a dataset record from utils.db.get_datasets into a dataset-store item."""
+    return {
+        "id": int(rec.id),
+        "text": rec.name,
+        "source_type": rec.source_type,
+        "eol_definition": rec.eol_definition,
+        "feature_lookup_definition": rec.feature_lookup_definition,
+        "source_table": rec.source_table,
+        "timestamp_col": rec.timestamp_col,
+        "evaluation_type": rec.evaluation_type,
+        # NUMERIC comes back as Decimal, which the store can't serialize
+        "percentage": float(rec.percentage) if rec.percentage is not None else None,
+        "source_table_eval": rec.source_table_eval,
+        "split_time_column": rec.split_time_column,
+        "materialized": rec.materialized,
+        "training_table_name": rec.training_table_name,
+        "eval_table_name": rec.eval_table_name,
+        "target": rec.target
+    }
 
 def create_dataset_tab():
     # Store for datasets of the selected project
@@ -13,7 +35,20 @@ def create_dataset_tab():
             disabled=True
         )
     ]
-    listgroup = dbc.ListGroup(list_items, id="dataset-list-group", className="mb-4")
+    listgroup = dbc.ListGroup(list_items, id="dataset-list-group")
+
+    # Name filter and page controls; the store only ever holds one page of datasets
+    page_store = dcc.Store(id='dataset-page-store', data={'filter': '', 'cursors': [None], 'next': None})
+    dataset_filter = dbc.Input(
+        type="search", id="dataset-filter", placeholder="Filter datasets by name", debounce=True, className="mb-2"
+    )
+    page_controls = html.Div([
+        dbc.Button("Previous", id="dataset-prev-page", color="secondary", outline=True, size="sm",
+                   className="me-2", disabled=True),
+        dbc.Button("Next", id="dataset-next-page", color="secondary", outline=True, size="sm",
+                   className="me-2", disabled=True),
+        html.Small("Page 1", id="dataset-page-info", className="text-muted")
+    ], className="mt-2 mb-4")
 
     # Form to create or update a dataset
     form = dbc.Form([
@@ -44,13 +79,13 @@ def create_dataset_tab():
         # eol_definition (only for feature_lookup)
         html.Div([
             dbc.Label("EOL Definition", html_for="dataset-eol-definition"),
-            dbc.Textarea(id="dataset-eol-definition", placeholder="Enter eol definition (comma-separated)"),
+            dbc.Textarea(id="dataset-eol-definition", placeholder="Spine table, then its key columns (e.g. main.ml.labels, customer_id)"),
         ], id="div-eol-definition", className="mb-3", style={"display": "none"}),
 
         # feature_lookup_definition (only for feature_lookup)
         html.Div([
             dbc.Label("Feature Lookup Definition", html_for="dataset-feature-lookup-definition"),
-            dbc.Textarea(id="dataset-feature-lookup-definition", placeholder="Enter feature lookup definition (comma-separated)"),
+            dbc.Textarea(id="dataset-feature-lookup-definition", placeholder="Feature tables, table@timestamp_column for time-varying ones (e.g. main.fs.daily@snapshot_date, main.fs.profile)"),
         ], id="div-feature-lookup-definition", className="mb-3", style={"display": "none"}),
 
         # source_table (for static/dynamic)
@@ -71,6 +106,7 @@ def create_dataset_tab():
             dbc.RadioItems(
                 options=[
                     {"label": "Random", "value": "random"},
+                    {"label": "Stratified", "value": "stratified"},
                     {"label": "Table", "value": "table"},
                     {"label": "Timestamp", "value": "timestamp"}
                 ],
@@ -90,6 +126,23 @@ def create_dataset_tab():
         html.Div([
             dbc.Label("Source Eval Table", html_for="dataset-source-table-eval"),
             dbc.Input(type="text", id="dataset-source-table-eval", placeholder="Enter source eval table name"),
+            # Tables taken as-is can be snapshotted in metadata time instead of copied
+            dbc.Label("Materialize As", html_for="dataset-table-snapshot-mode", className="mt-2"),
+            dbc.RadioItems(
+                options=[
+                    {"label": "Copy", "value": "copy"},
+                    {"label": "Shallow Clone", "value": "shallow_clone"},
+                    {"label": "Pinned View", "value": "view"}
+                ],
+                value=DEFAULT_TABLE_SNAPSHOT_MODE,
+                id="dataset-table-snapshot-mode",
+                inline=True
+            ),
+            dbc.FormText(
+                "Shallow clones and pinned views read the source's data files: once the source changes, "
+                "VACUUM can delete them after its retention period (7 days by default) and the snapshot "
+                "stops being readable. Copy to keep the dataset reproducible for longer."
+            ),
         ], id="div-eval-table-name", className="mb-3", style={"display": "none"}),
 
         # Split Time Column (only for timestamp)
@@ -98,6 +151,23 @@ def create_dataset_tab():
             dbc.Input(type="text", id="dataset-split-time-column", placeholder="Enter split time column"),
         ], id="div-split-time-column", className="mb-3", style={"display": "none"}),
 
+        # Cross-validation folds written to the training table's __fold column (empty: none)
+        html.Div([
+            dbc.Label("Cross-Validation Folds", html_for="dataset-cv-folds"),
+            dbc.Input(type="number", id="dataset-cv-folds", min=2, step=1, placeholder="None"),
+            dbc.RadioItems(
+                options=[
+                    {"label": "Hash", "value": "hash"},
+                    {"label": "Stratified", "value": "stratified"},
+                    {"label": "Time Series", "value": "time_series"}
+                ],
+                value="hash",
+                id="dataset-fold-strategy",
+                inline=True,
+                className="mt-2"
+            ),
+        ], className="mb-3"),
+
         # Training Table Name (auto-generated from dataset name)
         html.Div([
             dbc.Label("Training Table Name (Generated)", html_for="dataset-training-table-name"),
@@ -127,15 +197,50 @@ def create_dataset_tab():
             dbc.Button("Update Dataset", id="update-dataset-button", color="primary", className="me-2"),
             dbc.Button("Delete Dataset", id="delete-dataset-button", color="danger", className="me-2"),
             dbc.Button("Materialize Dataset", id="materialize-dataset-button", color="info")
-        ], className="mt-3")
+        ], className="mt-3"),
+
+        # Background materialization progress (polled while a job is active)
+        html.Div(id="materialize-status", className="mt-3"),
+        # Shown when the cost preview (utils.cost_estimate) needs the user's confirmation
+        html.Div([
+            dbc.Button("Materialize Anyway", id="materialize-confirm-button", color="warning", className="me-2"),
+            dbc.Button("Cancel", id="materialize-cancel-button", color="secondary")
+        ], id="materialize-confirm", className="mt-2", style={"display": "none"}),
+        dcc.Store(id="materialize-pending-store"),
+        dcc.Store(id="materialize-job-store"),
+        dcc.Interval(id="materialize-poll-interval", interval=2000, disabled=True)
     ])
 
-    # Layout: dataset list and form side by side
+    # Sampled profile of the source or a materialized table (utils.profiling)
+    profile_panel = html.Div([
+        html.Hr(),
+        html.H5("Profile"),
+        html.Div([
+            dbc.RadioItems(
+                options=[
+                    {"label": "Source Table", "value": "source"},
+                    {"label": "Training Table", "value": "training"},
+                    {"label": "Eval Table", "value": "eval"}
+                ],
+                value="source",
+                id="profile-table-choice",
+                inline=True,
+                className="d-inline-block me-3"
+            ),
+            dbc.Button("Profile Table", id="profile-table-button", color="secondary", size="sm", className="me-2"),
+            dbc.Button("Recompute", id="profile-refresh-button", color="secondary", outline=True, size="sm")
+        ], className="mb-2"),
+        dcc.Loading(id="loading-profile", type="default", children=html.Div(id="profile-output"))
+    ], className="mb-4")
+
+    # Layout: dataset list and form side by side, profile below
     content = [
         store,
+        page_store,
         dbc.Row([
-            dbc.Col(listgroup, width=6),
+            dbc.Col([dataset_filter, listgroup, page_controls], width=6),
             dbc.Col(form, width=6)
-        ])
+        ]),
+        profile_panel
     ]
     return dbc.Tab(content, label="Datasets", tab_id="tab-dataset")
\ No newline at end of file
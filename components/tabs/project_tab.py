@@ -3,7 +3,7 @@ from dash import html, dcc
 from dash.dependencies import Input, Output, State
 import requests
 import json
-from utils.db import get_projects
+from utils.db import get_projects_page
 
 # Helper function to fetch notebook files from GitHub
 def fetch_notebook_files_from_github(github_repo_url: str, folder_path: str = "notebooks") -> list[dict]:
@@ -91,28 +91,23 @@ def fetch_notebook_files_from_github(github_repo_url: str, folder_path: str = "n
     return files_options
 
 
+def project_to_store_item(rec):
+    """Converts a project record from utils.db.get_projects into a list-store item."""
+    return {
+        'id': int(rec.id),
+        'text': rec.name,
+        'description': rec.description,
+        'catalog': rec.catalog,
+        'schema': rec.schema,
+        'git_url': rec.git_url,
+        'training_notebook': rec.training_notebook
+    }
+
+
 def create_project_tab():
-    # Retrieve projects from the database
-
-
-   
-    df = get_projects()
-    # Convert to items for storage and display
-    items = []
-    if not df.empty:
-        records = df.to_dict(orient='records')
-        # Build list of projects with full details
-        items = [
-            {
-                'id': int(rec['id']),
-                'text': rec.get('name'),
-                'description': rec.get('description'),
-                'catalog': rec.get('catalog'),
-                'schema': rec.get('schema'),
-                'git_url': rec.get('git_url'),
-            }
-            for rec in records
-        ]
+    # Retrieve the first page of projects from the database with full details
+    records, next_cursor = get_projects_page()
+    items = [project_to_store_item(rec) for rec in records]
 
     active_project_id = items[0]['id'] if items else None# Store component to maintain the list of projects
     store = dcc.Store(id='list-store', data={'items': items, "active_project_id": active_project_id})
@@ -141,6 +136,20 @@ def create_project_tab():
 
     listgroup = dbc.ListGroup(list_items, id="list-group")
 
+    # Name filter and page controls; the list only ever holds one page of projects.
+    # cursors holds the keyset cursor each visited page started after.
+    page_store = dcc.Store(id='project-page-store', data={'filter': '', 'cursors': [None], 'next': next_cursor})
+    project_filter = dbc.Input(
+        type="search", id="project-filter", placeholder="Filter projects by name", debounce=True, className="mb-2"
+    )
+    page_controls = html.Div([
+        dbc.Button("Previous", id="project-prev-page", color="secondary", outline=True, size="sm",
+                   className="me-2", disabled=True),
+        dbc.Button("Next", id="project-next-page", color="secondary", outline=True, size="sm",
+                   className="me-2", disabled=next_cursor is None),
+        html.Small("Page 1", id="project-page-info", className="text-muted")
+    ], className="mt-2")
+
     # Form to create a new project
     create_form = dbc.Form([
         html.Div([
@@ -181,7 +190,7 @@ def create_project_tab():
     # Layout: project list and creation form side by side
     return dbc.Tab([
         dbc.Row([
-            dbc.Col(listgroup, width=8),
+            dbc.Col([page_store, project_filter, listgroup, page_controls], width=8),
             dbc.Col(create_form, width=4)
         ])
     ], label="Projects", tab_id="tab-project"), store
\ No newline at end of file
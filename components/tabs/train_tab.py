@@ -32,6 +32,29 @@ def create_train_tab():
                         children=html.Div(id="train-status-output")
                     ),
                     html.Hr(),
+                    html.Div([
+                        html.H5("Training History", className="d-inline me-3"),
+                        dbc.Button("Refresh Status", id="train-history-refresh-button", color="secondary",
+                                   outline=True, size="sm", n_clicks=0)
+                    ], className="mb-2"),
+                    dcc.Loading(
+                        id="loading-train-history",
+                        type="default",
+                        children=dbc.Table([
+                            html.Thead(html.Tr([
+                                html.Th("Submitted"),
+                                html.Th("Job ID"),
+                                html.Th("Run ID"),
+                                html.Th("Status"),
+                                html.Th("Duration"),
+                                html.Th("Parameters")
+                            ])),
+                            html.Tbody(id="train-history-list", children=[
+                                html.Tr(html.Td(children=["Select a dataset to see its training history."], colSpan=6))
+                            ])
+                        ], bordered=True, hover=True, responsive=True, striped=True, size="sm")
+                    ),
+                    html.Hr(),
                     html.H5("MLflow Runs"),
                     dcc.Loading(
                         id="loading-mlflow-runs",
@@ -6,7 +6,8 @@ source .env
 # Create the database if it doesn't exist
 psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d postgres -c "CREATE DATABASE $DB_NAME;"
 
-# Run the SQL script
-psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME -f init_db.sql
+# Apply the versioned migrations in sql/migrations (idempotent, non-destructive).
+# init_db.sql still drops and recreates everything if a full reset is needed.
+(cd "$(dirname "$0")/.." && python -m utils.migrations)
 
-echo "Database initialization complete!" 
\ No newline at end of file
+echo "Database initialization complete!" 
@@ -1,4 +1,10 @@
 -- Drop existing tables if they exist
+-- (full reset; run `python -m utils.migrations` afterwards to add indexes and later schema changes)
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS table_profiles;
+DROP TABLE IF EXISTS dataset_watermarks;
+DROP TABLE IF EXISTS materialization_jobs;
+DROP TABLE IF EXISTS training_runs;
 DROP TABLE IF EXISTS training;
 DROP TABLE IF EXISTS datasets;
 DROP TABLE IF EXISTS projects;
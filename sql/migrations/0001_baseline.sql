@@ -0,0 +1,49 @@
+-- Baseline schema: the projects, datasets and training tables from init_db.sql.
+-- Non-destructive, so it is safe to run against a database that init_db.sql already created.
+
+CREATE TABLE IF NOT EXISTS projects (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    catalog VARCHAR(255) NOT NULL,
+    schema VARCHAR(255) NOT NULL,
+    git_url VARCHAR(255) NOT NULL,
+    training_notebook VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS datasets (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER REFERENCES projects(id) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    source_type VARCHAR(64) NOT NULL CHECK (source_type IN ('static_table', 'dynamic_table', 'feature_lookup')),
+    eol_definition TEXT[] DEFAULT NULL,
+    feature_lookup_definition TEXT[] DEFAULT NULL,
+    source_table  VARCHAR(255) DEFAULT NULL,
+    timestamp_col VARCHAR(255) DEFAULT NULL,
+    evaluation_type VARCHAR(64) NOT NULL CHECK (evaluation_type IN ('random', 'table', 'timestamp')),
+    percentage NUMERIC DEFAULT NULL,
+    source_table_eval VARCHAR(255) DEFAULT NULL,
+    split_time_column VARCHAR(255) DEFAULT NULL,
+    materialized BOOLEAN NOT NULL DEFAULT FALSE,
+    training_table_name VARCHAR(255) DEFAULT NULL,
+    eval_table_name VARCHAR(255) DEFAULT NULL,
+    target VARCHAR(255) DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS training (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    dataset_id INTEGER NOT NULL,
+    job_id BIGINT, -- Databricks job run ID associated with this training
+    parameters JSONB, -- Parameters used for the training job
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+COMMENT ON COLUMN training.job_id IS 'Databricks job run ID associated with this training';
+COMMENT ON COLUMN training.parameters IS 'Parameters used for the training job';
@@ -0,0 +1,13 @@
+-- Secondary indexes for the lookups utils/db.py runs on every page render.
+
+-- get_dataset_name_by_job_id / get_datasets_by_job_ids
+CREATE INDEX IF NOT EXISTS idx_training_job_id ON training (job_id);
+
+-- get_training_job
+CREATE INDEX IF NOT EXISTS idx_training_project_dataset ON training (project_id, dataset_id);
+
+-- get_datasets (filters on project_id, orders by name)
+CREATE INDEX IF NOT EXISTS idx_datasets_project_name ON datasets (project_id, name);
+
+-- get_dataset_name_by_training_table
+CREATE INDEX IF NOT EXISTS idx_datasets_training_table_name ON datasets (training_table_name);
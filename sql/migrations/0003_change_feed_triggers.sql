@@ -0,0 +1,45 @@
+-- Publish every change to projects, datasets and training on the metadata_changes channel
+-- so app processes can keep an in-memory snapshot current (see utils/change_feed.py).
+
+CREATE OR REPLACE FUNCTION notify_metadata_change() RETURNS trigger AS $$
+DECLARE
+    changed RECORD;
+    payload JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+
+    payload := jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', changed.id,
+        'row', to_jsonb(changed)
+    );
+
+    -- NOTIFY payloads are capped at 8000 bytes; send only the key and let listeners re-read the row
+    IF octet_length(payload::text) > 7900 THEN
+        payload := payload - 'row';
+    END IF;
+
+    PERFORM pg_notify('metadata_changes', payload::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_notify_change ON projects;
+CREATE TRIGGER projects_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON projects
+    FOR EACH ROW EXECUTE FUNCTION notify_metadata_change();
+
+DROP TRIGGER IF EXISTS datasets_notify_change ON datasets;
+CREATE TRIGGER datasets_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON datasets
+    FOR EACH ROW EXECUTE FUNCTION notify_metadata_change();
+
+DROP TRIGGER IF EXISTS training_notify_change ON training;
+CREATE TRIGGER training_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON training
+    FOR EACH ROW EXECUTE FUNCTION notify_metadata_change();
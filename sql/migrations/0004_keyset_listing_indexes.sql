@@ -0,0 +1,7 @@
+-- Indexes matching the (name, id) keyset order of get_projects_page / get_datasets_page.
+
+CREATE INDEX IF NOT EXISTS idx_projects_name_id ON projects (name, id);
+
+-- Supersedes idx_datasets_project_name from 0002
+CREATE INDEX IF NOT EXISTS idx_datasets_project_name_id ON datasets (project_id, name, id);
+DROP INDEX IF EXISTS idx_datasets_project_name;
@@ -0,0 +1,24 @@
+-- Append-only history of training submissions: one row per run started from the Train tab.
+-- The training table keeps mapping (project, dataset) to its Databricks job; this records every run of it.
+
+CREATE TABLE IF NOT EXISTS training_runs (
+    id BIGSERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    dataset_id INTEGER NOT NULL,
+    job_id BIGINT NOT NULL,           -- Databricks job ID
+    run_id BIGINT,                    -- Databricks job run ID returned by run_now
+    parameters JSONB,                 -- Parameters submitted with the run
+    status VARCHAR(64) NOT NULL DEFAULT 'SUBMITTED',
+    submitted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    duration_seconds DOUBLE PRECISION,
+
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+-- Latest runs per dataset / per project
+CREATE INDEX IF NOT EXISTS idx_training_runs_dataset_submitted ON training_runs (dataset_id, submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_training_runs_project_submitted ON training_runs (project_id, submitted_at DESC, id DESC);
+-- Status refreshes look up unfinished runs by run ID
+CREATE INDEX IF NOT EXISTS idx_training_runs_run_id ON training_runs (run_id);
@@ -0,0 +1,26 @@
+-- Background materialization jobs submitted from the Datasets tab (utils/materialize.py).
+-- statements holds per-statement progress: [{label, sql, status, seconds}, ...]
+
+CREATE TABLE IF NOT EXISTS materialization_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    dataset_id INTEGER NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    spec JSONB NOT NULL,                      -- What was requested: source, split, target tables
+    statements JSONB NOT NULL DEFAULT '[]',
+    result JSONB,                             -- Row counts and timings on success
+    error TEXT,
+    worker VARCHAR(255),                      -- host:pid of the process running the job
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_materialization_jobs_dataset_created
+    ON materialization_jobs (dataset_id, created_at DESC);
+-- Unfinished jobs, checked on startup for runs interrupted by a restart
+CREATE INDEX IF NOT EXISTS idx_materialization_jobs_active
+    ON materialization_jobs (worker) WHERE status IN ('queued', 'running');
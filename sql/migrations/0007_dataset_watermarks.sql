@@ -0,0 +1,16 @@
+-- High-water marks of incrementally materialized dynamic_table datasets (utils/materialize.py).
+-- One row per dataset: the largest timestamp_col value already copied into its
+-- stable training/eval tables, and the split settings it was copied with
+-- (a change of settings forces a full reload).
+
+CREATE TABLE IF NOT EXISTS dataset_watermarks (
+    dataset_id INTEGER PRIMARY KEY,
+    timestamp_col VARCHAR(255) NOT NULL,
+    high_water_mark TEXT NOT NULL,            -- CAST(max(timestamp_col) AS STRING) on Databricks
+    settings JSONB NOT NULL,
+    training_table_name VARCHAR(255) NOT NULL,
+    eval_table_name VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (dataset_id) REFERENCES datasets(id) ON DELETE CASCADE
+);
@@ -0,0 +1,5 @@
+-- Fingerprint of the definition and source Delta versions a dataset's tables were
+-- materialized from (utils/materialize.py). A matching fingerprint lets a new
+-- materialization reuse the existing tables; NULL means "unknown, re-materialize".
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS materialization_fingerprint VARCHAR(64);
@@ -0,0 +1,14 @@
+-- Cached table profiles for the Datasets tab (utils/profiling.py).
+-- A Delta table's data only changes with its version, so a profile is computed
+-- once per (table, version, target column, sample size) and reused afterwards.
+
+CREATE TABLE IF NOT EXISTS table_profiles (
+    table_name VARCHAR(512) NOT NULL,
+    delta_version BIGINT NOT NULL,
+    target_column VARCHAR(255) NOT NULL DEFAULT '',   -- '' when profiled without a target
+    sample_percent NUMERIC NOT NULL,
+    profile JSONB NOT NULL,
+    computed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (table_name, delta_version, target_column, sample_percent)
+);
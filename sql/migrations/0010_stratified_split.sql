@@ -0,0 +1,9 @@
+-- Stratified random splits (utils/split_engine.py): a new evaluation type, and the
+-- class balance each stratified materialization actually produced.
+
+ALTER TABLE datasets DROP CONSTRAINT IF EXISTS datasets_evaluation_type_check;
+ALTER TABLE datasets ADD CONSTRAINT datasets_evaluation_type_check
+    CHECK (evaluation_type IN ('random', 'stratified', 'table', 'timestamp'));
+
+-- {"target": ..., "classes": [{"class", "training_rows", "eval_rows", "eval_ratio"}, ...]}
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS class_ratios JSONB;
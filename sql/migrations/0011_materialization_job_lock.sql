@@ -0,0 +1,20 @@
+-- At most one unfinished materialization job per dataset (utils/materialize.py).
+-- Two jobs running at once would race on the dataset row and orphan the loser's
+-- tables; a second submission now gets the unfinished job back instead.
+
+-- Keep only the newest unfinished job of each dataset before adding the index
+UPDATE materialization_jobs AS j
+SET status = 'failed',
+    error = 'Superseded: another job of this dataset was already unfinished',
+    finished_at = CURRENT_TIMESTAMP,
+    updated_at = CURRENT_TIMESTAMP
+WHERE j.status IN ('queued', 'running')
+  AND EXISTS (
+      SELECT 1 FROM materialization_jobs AS newer
+      WHERE newer.dataset_id = j.dataset_id
+        AND newer.status IN ('queued', 'running')
+        AND newer.id > j.id
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_materialization_jobs_one_active
+    ON materialization_jobs (dataset_id) WHERE status IN ('queued', 'running');
@@ -0,0 +1,7 @@
+-- Materializations held back by the cost preview (utils/cost_estimate.py) wait as
+-- 'pending' jobs until the user confirms them, so the spec never leaves the server.
+-- Pending jobs don't hold the one-unfinished-job-per-dataset lock (migration 0011).
+
+ALTER TABLE materialization_jobs DROP CONSTRAINT IF EXISTS materialization_jobs_status_check;
+ALTER TABLE materialization_jobs ADD CONSTRAINT materialization_jobs_status_check
+    CHECK (status IN ('pending', 'queued', 'running', 'succeeded', 'failed'));
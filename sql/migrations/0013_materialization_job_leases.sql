@@ -0,0 +1,7 @@
+-- Unfinished materialization jobs hold a lease: the process running them refreshes
+-- updated_at, and any process fails jobs whose lease expired (utils/materialize.py).
+-- This replaces the host:pid check, which missed jobs of a replaced container.
+
+DROP INDEX IF EXISTS idx_materialization_jobs_active;
+CREATE INDEX IF NOT EXISTS idx_materialization_jobs_lease
+    ON materialization_jobs (updated_at) WHERE status IN ('queued', 'running');
@@ -0,0 +1,29 @@
+-- A per-row version for the tables the change feed watches (utils/change_feed.py).
+-- Every UPDATE bumps it; it travels in NOTIFY payloads and RETURNING * rows, so the
+-- in-memory snapshot can ignore a row older than the one it already holds.
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE training ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.row_version := OLD.row_version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_bump_row_version ON projects;
+CREATE TRIGGER projects_bump_row_version
+    BEFORE UPDATE ON projects
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS datasets_bump_row_version ON datasets;
+CREATE TRIGGER datasets_bump_row_version
+    BEFORE UPDATE ON datasets
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS training_bump_row_version ON training;
+CREATE TRIGGER training_bump_row_version
+    BEFORE UPDATE ON training
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
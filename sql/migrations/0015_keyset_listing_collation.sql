@@ -0,0 +1,10 @@
+-- Rebuilds the 0004 keyset indexes in the "C" collation. get_projects_page and
+-- get_datasets_page now order and seek on name COLLATE "C" (codepoint order),
+-- the order utils.change_feed pages its in-memory snapshot in, so a page cursor
+-- resumes the same way whichever of the two served the previous page.
+
+DROP INDEX IF EXISTS idx_projects_name_id;
+CREATE INDEX IF NOT EXISTS idx_projects_name_id ON projects (name COLLATE "C", id);
+
+DROP INDEX IF EXISTS idx_datasets_project_name_id;
+CREATE INDEX IF NOT EXISTS idx_datasets_project_name_id ON datasets (project_id, name COLLATE "C", id);
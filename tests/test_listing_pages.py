@@ -0,0 +1,86 @@
+"""Paged listings served from SQL and from the change feed's snapshot agree.
+
+Needs the metadata Postgres (DB_* variables, migrated with
+``python -m utils.migrations``); skipped when it can't be reached.
+"""
+import uuid
+
+import pytest
+
+from utils.change_feed import MetadataSnapshot
+from utils.db import (
+    create_dataset, create_project, delete_dataset, delete_project, get_datasets_page, get_db_connection, get_projects_page,
+    set_snapshot
+)
+
+# Mixed case, punctuation and accents: orders differently under a locale collation than by codepoint
+NAME_SUFFIXES = ("beta", "Alpha", "alpha", "_z", "-x", "Zeta", "éclair", "eclair", "B2", "b10", " space", "~end")
+
+
+@pytest.fixture
+def token():
+    return f"pagetest{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def project_id(token):
+    conn = get_db_connection()
+    if conn is None:
+        pytest.skip("metadata Postgres not reachable")
+    conn.close()
+    ids = [create_project(f"{token} {suffix}", "d", "main", "pages", "g", "n") for suffix in NAME_SUFFIXES]
+    assert None not in ids
+    dataset_ids = [
+        create_dataset(ids[0], f"{token} {suffix}", "static_table", None, None, "t", "random",
+                       0.2, None, None, None, False, None, None, None)
+        for suffix in NAME_SUFFIXES
+    ]
+    assert None not in dataset_ids
+    yield ids[0]
+    for dataset_id in dataset_ids:
+        assert delete_dataset(dataset_id)
+    for project in ids:
+        assert delete_project(project)
+
+
+@pytest.fixture
+def snapshot(project_id):
+    """A live snapshot loaded after the test rows were written."""
+    snapshot = MetadataSnapshot()
+    conn = get_db_connection()
+    try:
+        snapshot.load(conn)
+    finally:
+        conn.close()
+    snapshot.set_live(True)
+    yield snapshot
+    set_snapshot(None)
+
+
+def page_through(fetch, sources, limit=3):
+    """Pages a listing to the end, switching between SQL and the snapshot on each page."""
+    names, after = [], None
+    for page_number in range(100):
+        set_snapshot(sources[page_number % len(sources)])
+        page, after = fetch(after, limit)
+        names.extend(record.name for record in page)
+        if after is None:
+            return names
+    raise AssertionError("listing did not end")
+
+
+@pytest.mark.parametrize("listing", ["projects", "datasets"])
+def test_sql_and_snapshot_pages_agree(token, project_id, snapshot, listing):
+    if listing == "projects":
+        def fetch(after, limit):
+            return get_projects_page(token, after, limit)
+    else:
+        def fetch(after, limit):
+            return get_datasets_page(project_id, token, after, limit)
+
+    expected = sorted(f"{token} {suffix}" for suffix in NAME_SUFFIXES)  # Codepoint order
+    assert page_through(fetch, [None]) == expected
+    assert page_through(fetch, [snapshot]) == expected
+    # A cursor handed out by one path resumes on the other without skipping or repeating rows
+    assert page_through(fetch, [None, snapshot]) == expected
+    assert page_through(fetch, [snapshot, None]) == expected
@@ -0,0 +1,306 @@
+"""Materialization plans run end to end on the local DuckDB backend (SQL_BACKEND=duckdb).
+
+Specs are built as the Datasets tab builds them, and their stages run with
+split_engine.run_stages as a job runs them; no warehouse or Postgres is
+needed. Run from the repository root:
+
+    python -m pytest -q tests
+"""
+import re
+
+import pytest
+
+from utils.databricks_connect import databricks_connection, execute_sql, fetch_sql
+from utils.materialize import (
+    build_materialization_spec, build_stages, fetch_high_water_mark, pin_fold_cut_points,
+    pin_snapshot_versions, source_versions, written_tables
+)
+from utils.split_engine import FOLD_COLUMN, fold_row_hash, get_class_ratios, run_stages
+
+SOURCE_ROWS = 2000
+DATASET_ID = 7
+CATALOG = "test"
+
+
+@pytest.fixture(scope="module")
+def conn():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("SQL_BACKEND", "duckdb")
+        with databricks_connection() as connection:
+            assert connection is not None
+            yield connection
+
+
+@pytest.fixture
+def project(conn, request):
+    """A schema of its own per test, holding the ``source`` table."""
+    schema = re.sub(r"\W+", "_", request.node.name.removeprefix("test_")).strip("_")
+    create_source(conn, f"{CATALOG}.{schema}.source", 0, SOURCE_ROWS)
+    return {"catalog": CATALOG, "schema": schema}
+
+
+def create_source(conn, table, start, stop):
+    """Rows with an ID, an imbalanced 3-class label (70/20/10%) and an hourly timestamp."""
+    rows = (
+        f"SELECT range AS id, CASE WHEN range % 10 < 7 THEN 'a' WHEN range % 10 < 9 THEN 'b' ELSE 'c' END AS label, "
+        f"TIMESTAMP '2024-01-01' + to_hours(range) AS ts FROM range({start}, {stop})"
+    )
+    exists = fetch_sql(conn, f"SELECT 1 FROM information_schema.tables WHERE table_catalog = '{table.split('.')[0]}' "
+                             f"AND table_schema = '{table.split('.')[1]}' AND table_name = '{table.split('.')[2]}'")
+    statement = f"INSERT INTO {table} {rows}" if exists else f"CREATE TABLE {table} AS {rows}"
+    assert execute_sql(conn, statement)
+
+
+def spec_for(project, eval_type, name="ds", percentage=0.2, source_table="source", source_table_eval=None,
+             split_time=None, timestamp_col="ts", target="label", **options):
+    return build_materialization_spec(
+        {"id": DATASET_ID, "text": name}, project, source_table, "static_table", eval_type, percentage,
+        source_table_eval, split_time, timestamp_col, target, **options
+    )
+
+
+def materialize(conn, spec):
+    """Runs a spec's plan as a job does (after pinning whatever the job pins) and returns its stages."""
+    if spec.get("fold_strategy") == "time_series" and spec.get("cv_folds"):
+        stages = pin_fold_cut_points(conn, spec)
+    elif spec["evaluation_type"] == "table" and spec["table_snapshot_mode"] != "copy":
+        stages = pin_snapshot_versions(spec, source_versions(conn, spec))
+    else:
+        stages = build_stages(spec)
+    run_stages(conn, stages, cleanup_tables=(spec["training_table_name"], spec["eval_table_name"]))
+    return stages
+
+
+def make_incremental(conn, spec, project):
+    """Turns a spec into the first (full load) run of an incremental dataset, as incremental_spec and pin_watermark do."""
+    base = f"{CATALOG}.{project['schema']}.incremental"
+    spec.update({
+        "incremental": True, "training_table_name": f"{base}_training", "eval_table_name": f"{base}_eval",
+        "watermark_from": None,
+        "watermark_to": fetch_high_water_mark(conn, spec["qualified_source_table"], spec["timestamp_col"]),
+    })
+
+
+def advance_watermark(conn, spec):
+    """Makes a spec the next run's: resume from the last mark, up to the current one."""
+    spec["watermark_from"] = spec["watermark_to"]
+    spec["watermark_to"] = fetch_high_water_mark(conn, spec["qualified_source_table"], spec["timestamp_col"])
+
+
+def count(conn, table, where="TRUE"):
+    return fetch_sql(conn, f"SELECT count(*) FROM {table} WHERE {where}")[0][0]
+
+
+def fold_sizes(conn, table, group=None):
+    columns = f"{group}, {FOLD_COLUMN}" if group else FOLD_COLUMN
+    return fetch_sql(conn, f"SELECT {columns}, count(*) AS n FROM {table} GROUP BY ALL ORDER BY ALL")
+
+
+def assert_disjoint_cover(conn, spec, source, total):
+    training, evaluation = spec["training_table_name"], spec["eval_table_name"]
+    assert count(conn, training) + count(conn, evaluation) == total
+    overlap = fetch_sql(conn, f"SELECT count(*) FROM {training} t JOIN {evaluation} e ON t.id = e.id")[0][0]
+    assert overlap == 0
+    missing = fetch_sql(conn, (
+        f"SELECT count(*) FROM {source} s WHERE s.id NOT IN (SELECT id FROM {training}) "
+        f"AND s.id NOT IN (SELECT id FROM {evaluation})"
+    ))[0][0]
+    assert missing == 0
+
+# --- Splits --- #
+
+@pytest.mark.parametrize("strategy", ["ctas", "multi_insert"])
+def test_random_split(conn, project, strategy):
+    spec = spec_for(project, "random")
+    spec["split_strategy"] = strategy
+    stages = materialize(conn, spec)
+
+    assert [label for stage in stages for label, _ in stage][-1] == ("split_insert" if strategy == "multi_insert" else "create_eval")
+    assert written_tables(spec, stages) == {spec["training_table_name"], spec["eval_table_name"]}
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS)
+    assert count(conn, spec["eval_table_name"]) / SOURCE_ROWS == pytest.approx(0.2, abs=0.03)
+
+
+def test_random_split_is_repeatable(conn, project):
+    first, second = spec_for(project, "random", name="first"), spec_for(project, "random", name="second")
+    materialize(conn, first)
+    materialize(conn, second)
+
+    differing = fetch_sql(conn, (
+        f"SELECT count(*) FROM (SELECT id FROM {first['eval_table_name']} "
+        f"EXCEPT SELECT id FROM {second['eval_table_name']})"
+    ))[0][0]
+    assert differing == 0
+
+
+def test_timestamp_split(conn, project):
+    spec = spec_for(project, "timestamp", split_time="2024-03-01")
+    materialize(conn, spec)
+
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS)
+    assert count(conn, spec["training_table_name"], "ts >= TIMESTAMP '2024-03-01'") == 0
+    assert count(conn, spec["eval_table_name"], "ts < TIMESTAMP '2024-03-01'") == 0
+
+
+def test_stratified_split(conn, project):
+    spec = spec_for(project, "stratified")
+    materialize(conn, spec)
+
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS)
+    ratios = get_class_ratios(conn, spec["training_table_name"], spec["eval_table_name"], "label")
+    assert [c["class"] for c in ratios["classes"]] == ["a", "b", "c"]
+    for c in ratios["classes"]:
+        assert c["eval_ratio"] == pytest.approx(0.2, abs=0.005)
+
+
+def test_stratified_split_keeps_a_row_of_each_class_on_both_sides(conn, project):
+    # Three rows of 'x': round(3 * 0.1) = 0, but eval still gets one and training keeps two
+    assert execute_sql(conn, f"INSERT INTO {CATALOG}.{project['schema']}.source VALUES (-1, 'x', TIMESTAMP '2023-12-31'), "
+                             f"(-2, 'x', TIMESTAMP '2023-12-31'), (-3, 'x', TIMESTAMP '2023-12-31'), (-4, 'y', TIMESTAMP '2023-12-31')")
+    spec = spec_for(project, "stratified", percentage=0.1)
+    materialize(conn, spec)
+
+    ratios = {c["class"]: c for c in get_class_ratios(conn, spec["training_table_name"], spec["eval_table_name"], "label")["classes"]}
+    assert (ratios["x"]["training_rows"], ratios["x"]["eval_rows"]) == (2, 1)
+    assert (ratios["y"]["training_rows"], ratios["y"]["eval_rows"]) == (1, 0)
+
+# --- Folds --- #
+
+@pytest.mark.parametrize("eval_type", ["random", "stratified"])
+def test_hash_folds_are_balanced(conn, project, eval_type):
+    spec = spec_for(project, eval_type, cv_folds=5, fold_strategy="hash")
+    materialize(conn, spec)
+
+    training_rows = count(conn, spec["training_table_name"])
+    sizes = dict(fold_sizes(conn, spec["training_table_name"]))
+    assert sorted(sizes) == [0, 1, 2, 3, 4]
+    assert sum(sizes.values()) == training_rows
+    for n in sizes.values():
+        assert n == pytest.approx(training_rows / 5, rel=0.15)
+    # Folds are drawn from the source columns alone, whichever plan writes the table
+    assert set(fetch_sql(conn, f"SELECT * FROM {spec['training_table_name']} LIMIT 1")[0].asDict()) == {"id", "label", "ts", FOLD_COLUMN}
+    mismatched = fetch_sql(conn, (
+        f"SELECT count(*) FROM {spec['training_table_name']} t JOIN ("
+        f"SELECT id, pmod({fold_row_hash(DATASET_ID)}, 5) AS expected FROM {spec['qualified_source_table']}) s "
+        f"ON t.id = s.id WHERE t.{FOLD_COLUMN} <> s.expected"
+    ))[0][0]
+    assert mismatched == 0
+
+
+def test_stratified_folds_deal_out_each_class(conn, project):
+    spec = spec_for(project, "random", cv_folds=4, fold_strategy="stratified")
+    materialize(conn, spec)
+
+    per_class = {}
+    for label, _, n in fold_sizes(conn, spec["training_table_name"], group="label"):
+        per_class.setdefault(label, []).append(n)
+    for label, sizes in per_class.items():
+        assert len(sizes) == 4
+        assert max(sizes) - min(sizes) <= 1, label
+
+
+def test_time_series_folds_are_balanced_and_ordered(conn, project):
+    spec = spec_for(project, "timestamp", split_time="2024-03-01", cv_folds=4, fold_strategy="time_series")
+    materialize(conn, spec)
+
+    assert len(spec["fold_cut_points"]) == 3
+    training_rows = count(conn, spec["training_table_name"])
+    bounds = fetch_sql(conn, (
+        f"SELECT {FOLD_COLUMN}, count(*) AS n, min(ts) AS first, max(ts) AS last "
+        f"FROM {spec['training_table_name']} GROUP BY 1 ORDER BY 1"
+    ))
+    assert [row[0] for row in bounds] == [0, 1, 2, 3]
+    for _, n, _, _ in bounds:
+        assert n == pytest.approx(training_rows / 4, rel=0.1)
+    for earlier, later in zip(bounds, bounds[1:]):
+        assert earlier[3] < later[2]  # Every row of a fold precedes the next fold
+
+# --- Feature Lookup --- #
+
+def test_feature_lookup_has_no_leakage(conn, project):
+    schema = f"{CATALOG}.{project['schema']}"
+    # Daily features per customer; feature_date repeats the timestamp so the tables can be checked
+    assert execute_sql(conn, (
+        f"CREATE TABLE {schema}.daily AS SELECT c AS customer_id, DATE '2024-01-01' + CAST(d AS INT) AS snapshot_date, "
+        f"DATE '2024-01-01' + CAST(d AS INT) AS feature_date, c * 100 + d AS spend FROM range(20) AS a(c), range(60) AS b(d)"
+    ))
+    assert execute_sql(conn, (
+        f"CREATE TABLE {schema}.profile AS SELECT range AS customer_id, 'segment_' || (range % 3) AS segment FROM range(20)"
+    ))
+    assert execute_sql(conn, (
+        f"CREATE TABLE {schema}.labels AS SELECT range % 20 AS customer_id, "
+        f"TIMESTAMP '2023-12-27 12:00:00' + to_days(CAST(range % 70 AS INT)) AS ts, range % 2 AS label FROM range(400)"
+    ))
+    spec = build_materialization_spec(
+        {"id": DATASET_ID, "text": "features", "eol_definition": ["labels", "customer_id"],
+         "feature_lookup_definition": ["daily@snapshot_date", "profile"]},
+        project, None, "feature_lookup", "random", 0.25, None, None, "ts", "label"
+    )
+    assert spec["split_strategy"] == "multi_insert"
+    materialize(conn, spec)
+
+    for table in (spec["training_table_name"], spec["eval_table_name"]):
+        assert count(conn, table, "feature_date > ts") == 0
+        # Each row has the latest feature row at or before its observation, or none if there is none yet
+        stale = fetch_sql(conn, (
+            f"SELECT count(*) FROM {table} t WHERE feature_date IS DISTINCT FROM ("
+            f"SELECT max(snapshot_date) FROM {schema}.daily d WHERE d.customer_id = t.customer_id AND d.snapshot_date <= t.ts)"
+        ))[0][0]
+        assert stale == 0
+        assert count(conn, table, "spend IS NOT NULL AND spend <> customer_id * 100 + date_diff('day', DATE '2024-01-01', feature_date)") == 0
+        assert count(conn, table, "segment IS NULL") == 0
+    assert count(conn, spec["training_table_name"]) + count(conn, spec["eval_table_name"]) == 400
+    assert count(conn, spec["training_table_name"], "feature_date IS NULL") > 0  # Observations before the first feature row
+
+# --- Incremental --- #
+
+def test_incremental_appends_only_new_rows(conn, project):
+    spec = spec_for(project, "random", name="incremental")
+    make_incremental(conn, spec, project)
+    assert [label for label, _ in materialize(conn, spec)[0]] == ["load_training", "load_eval"]
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS)
+
+    create_source(conn, spec["qualified_source_table"], SOURCE_ROWS, SOURCE_ROWS + 500)
+    advance_watermark(conn, spec)
+    stages = materialize(conn, spec)
+    assert [label for label, _ in stages[0]] == ["append_training", "append_eval"]
+    run_stages(conn, stages)  # A retried append replaces its rows instead of duplicating them
+
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS + 500)
+    # The appended rows are split exactly as a full load splits them
+    full = spec_for(project, "random", name="full")
+    materialize(conn, full)
+    differing = fetch_sql(conn, (
+        f"SELECT count(*) FROM (SELECT id FROM {spec['eval_table_name']} EXCEPT SELECT id FROM {full['eval_table_name']})"
+    ))[0][0]
+    assert differing == 0
+
+
+def test_incremental_timestamp_split_past_the_split_time_appends_eval_only(conn, project):
+    spec = spec_for(project, "timestamp", name="incremental", split_time="2024-02-01")
+    make_incremental(conn, spec, project)
+    materialize(conn, spec)
+    training_rows = count(conn, spec["training_table_name"])
+
+    create_source(conn, spec["qualified_source_table"], SOURCE_ROWS, SOURCE_ROWS + 100)
+    advance_watermark(conn, spec)
+    stages = materialize(conn, spec)
+    assert [label for label, _ in stages[0]] == ["append_eval"]
+    assert written_tables(spec, stages) == {spec["eval_table_name"]}
+
+    assert count(conn, spec["training_table_name"]) == training_rows
+    assert_disjoint_cover(conn, spec, spec["qualified_source_table"], SOURCE_ROWS + 100)
+
+# --- Snapshots --- #
+
+def test_shallow_clone_snapshots_both_sources(conn, project):
+    eval_source = f"{CATALOG}.{project['schema']}.eval_source"
+    create_source(conn, eval_source, 0, 300)
+    spec = spec_for(project, "table", source_table_eval=eval_source, table_snapshot_mode="shallow_clone")
+    stages = materialize(conn, spec)
+
+    assert [label for label, _ in stages[0]] == ["snapshot_training", "snapshot_eval"]
+    assert written_tables(spec, stages) == {spec["training_table_name"], spec["eval_table_name"]}
+    assert all(" VERSION AS OF 0" in statement for _, statement in stages[0])
+    assert count(conn, spec["training_table_name"]) == SOURCE_ROWS
+    assert count(conn, spec["eval_table_name"]) == 300
@@ -0,0 +1,66 @@
+"""Confirming a pending (cost-preview) job plans it from the metadata as it is then.
+
+Needs the metadata Postgres (DB_* variables, migrated with
+``python -m utils.migrations``); skipped when it can't be reached.
+"""
+import uuid
+
+import pytest
+
+import utils.materialize
+from utils.db import (
+    create_dataset, create_project, delete_dataset, delete_project, get_db_connection, get_materialization_job,
+    save_dataset_watermark
+)
+from utils.materialize import build_materialization_spec, hold_materialization, incremental_settings, submit_pending_materialization
+
+MARK = "2024-02-01 00:00:00"
+
+
+@pytest.fixture
+def dataset_id():
+    conn = get_db_connection()
+    if conn is None:
+        pytest.skip("metadata Postgres not reachable")
+    conn.close()
+    name = f"pendingtest{uuid.uuid4().hex[:8]}"
+    project_id = create_project(name, "d", "main", "pending", "g", "n")
+    assert project_id is not None
+    dataset_id = create_dataset(project_id, name, "dynamic_table", None, None, "source", "random",
+                                0.2, None, None, "ts", False, None, None, None)
+    assert dataset_id is not None
+    yield dataset_id
+    assert delete_dataset(dataset_id)  # Cascades to its jobs and watermark
+    assert delete_project(project_id)
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """The specs of the jobs started, instead of running them."""
+    specs = []
+    monkeypatch.setattr(utils.materialize, "_start_job", lambda job_id, spec, stages, steps: specs.append(spec))
+    return specs
+
+
+def test_confirmed_job_resumes_from_the_current_watermark(dataset_id, started):
+    spec = build_materialization_spec(
+        {"id": dataset_id, "text": "ds"}, {"catalog": "main", "schema": "pending"}, "source", "static_table",
+        "random", 0.2, None, None, "ts", "label"
+    )
+    spec.update({
+        "incremental": True, "training_table_name": "main.pending.ds_training", "eval_table_name": "main.pending.ds_eval",
+        "watermark_from": None, "watermark_to": None,
+    })
+    job_id = hold_materialization(spec)
+    assert job_id is not None
+    assert [step["label"] for step in get_materialization_job(job_id)["statements"]] == ["load_training", "load_eval"]
+
+    # Another run records a mark while the job awaits confirmation
+    assert save_dataset_watermark(dataset_id, "ts", MARK, incremental_settings(spec),
+                                  spec["training_table_name"], spec["eval_table_name"])
+
+    assert submit_pending_materialization(job_id) == job_id
+    assert [s["watermark_from"] for s in started] == [MARK]
+    job = get_materialization_job(job_id)
+    assert job["spec"]["watermark_from"] == MARK
+    assert [step["label"] for step in job["statements"]] == ["append_training", "append_eval"]
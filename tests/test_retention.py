@@ -0,0 +1,31 @@
+"""Retention planning (utils.retention.plan_retention); no database needed."""
+from utils.retention import plan_retention
+
+NOW = 1_800_000_000
+OLD = NOW - 30 * 86400
+
+
+def table(name, kind="training", epoch=OLD):
+    return {"table": f"main.sales.{name}_{kind}_{epoch}", "kind": kind, "base": f"main.sales.{name}",
+            "epoch": epoch, "is_view": False}
+
+
+def test_references_match_case_insensitively():
+    tables = [table("orders"), table("orders", "eval"), table("stale")]
+    references = {
+        f"Main.Sales.Orders_training_{OLD}": "dataset 1",
+        f"MAIN.SALES.ORDERS_EVAL_{OLD}": "source of dataset 2",
+    }
+    keep, drop = plan_retention(tables, references, keep_last=0, min_age_hours=24, now=NOW)
+
+    assert [t["table"] for t in keep] == [f"main.sales.orders_eval_{OLD}", f"main.sales.orders_training_{OLD}"]
+    assert keep[0]["reason"] == "referenced by source of dataset 2"
+    assert [t["table"] for t in drop] == [f"main.sales.stale_training_{OLD}"]
+
+
+def test_young_and_recent_generations_are_kept():
+    tables = [table("orders", epoch=OLD - 86400), table("orders"), table("orders", epoch=NOW - 3600)]
+    keep, drop = plan_retention(tables, {}, keep_last=1, min_age_hours=24, now=NOW)
+
+    assert [t["epoch"] for t in drop] == [OLD - 86400, OLD]
+    assert [t["reason"] for t in keep] == ["younger than 24h"]
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``get_or_load`` is read-through: on a miss it calls the loader and stores
+    the result. Each key carries a generation counter that ``invalidate`` bumps,
+    so a load that was already in flight when a write invalidated the key is
+    returned to its caller but never stored.
+
+    Args:
+        ttl (float): Seconds an entry stays valid. 0 disables caching.
+        max_entries (int): Least recently used entries are evicted past this size.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for ``key``, calling ``loader()`` on a miss.
+
+        Exceptions raised by the loader propagate and nothing is cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            generation = self._generations.get(key, 0)
+
+        value = loader()
+
+        if self.ttl > 0:
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, key):
+        """Drops ``key`` and discards any load of it that is still in flight."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = len(self._entries)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["ttl"] = self.ttl
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
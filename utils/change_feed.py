@@ -0,0 +1,395 @@
+import json
+import os
+import select
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from psycopg2.extras import RealDictCursor
+
+from utils.db import (
+    get_db_connection, set_snapshot, make_record_type, split_page, PROJECT_COLUMNS, DATASET_COLUMNS
+)
+
+# Channel and triggers created by sql/migrations/0003_change_feed_triggers.sql
+CHANGE_CHANNEL = "metadata_changes"
+CHANGE_TRIGGERS = ("projects_notify_change", "datasets_notify_change", "training_notify_change")
+WATCHED_TABLES = ("projects", "datasets", "training")
+
+CHANGE_FEED_ENABLED = os.getenv("METADATA_CHANGE_FEED", "true").lower() == "true"
+CHANGE_FEED_RETRY_INTERVAL = float(os.getenv("METADATA_CHANGE_FEED_RETRY_INTERVAL", "5"))
+# TCP keepalives on the listener connection, so a peer lost without a FIN (a failover,
+# a NAT idle timeout) is noticed and the feed reconnects instead of serving a frozen snapshot
+CHANGE_FEED_KEEPALIVES = {
+    "keepalives": 1,
+    "keepalives_idle": int(os.getenv("METADATA_CHANGE_FEED_KEEPALIVE_IDLE", "30")),
+    "keepalives_interval": int(os.getenv("METADATA_CHANGE_FEED_KEEPALIVE_INTERVAL", "10")),
+    "keepalives_count": int(os.getenv("METADATA_CHANGE_FEED_KEEPALIVE_COUNT", "3")),
+}
+
+# Sorts training rows without an updated_at before every timestamped one
+NO_TIMESTAMP = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _as_datetime(value):
+    """Timestamps arrive as datetimes from psycopg2 and ISO strings from NOTIFY payloads."""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _recency(training):
+    """Orders a job's training rows as utils.db does: updated_at DESC NULLS LAST, then id DESC."""
+    return (training['updated_at'] or NO_TIMESTAMP, training['id'])
+
+
+def _listing_key(record):
+    return (record.name, record.id)
+
+
+def _page(listing, name_filter, after, limit):
+    """Pages a (name, id)-sorted listing the way utils.db pages the SQL.
+
+    Python compares names by codepoint, as the SQL's COLLATE "C" does.
+    """
+    start = bisect_right(listing, tuple(after), key=_listing_key) if after else 0
+    needle = name_filter.lower() if name_filter else None
+    rows = []
+    for record in listing[start:]:
+        if needle is None or needle in record.name.lower():
+            rows.append(record)
+            if len(rows) > limit:
+                break
+    return split_page(rows, limit)
+
+
+class MetadataSnapshot:
+    """In-memory copy of the projects, datasets and training tables.
+
+    Loaded once when the listener connects and then kept current by applying
+    the rows carried in NOTIFY payloads (and this process's own committed
+    writes). Each row carries a row_version (migration 0014) and a row older
+    than the one held is ignored, as is any row of a deleted id, so changes
+    arriving out of order can't roll the snapshot back. Deleting a project or
+    dataset also drops the rows its foreign keys cascade to. utils.db serves get_projects,
+    get_datasets, get_training_job and get_datasets_by_job_ids from it while
+    it is live; listings are returned in the same shape and order as the SQL.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._live = False
+        self._project_type = make_record_type(PROJECT_COLUMNS)
+        self._dataset_type = make_record_type(DATASET_COLUMNS)
+        self._projects = {}          # id -> project record
+        self._datasets = {}          # id -> (project_id, dataset record)
+        self._training = {}          # id -> training row dict
+        self._versions = {}          # (table, id) -> row_version of the row held
+        self._deleted = set()        # (table, id) of deleted rows; ids are never reused
+        self._project_listing = None  # sorted tuple, rebuilt lazily after changes
+        self._dataset_listings = {}  # project_id -> sorted tuple
+        self._stats = {"loads": 0, "changes_applied": 0, "last_change_at": None}
+
+    # --- State --- #
+
+    def is_live(self):
+        return self._live
+
+    def set_live(self, live):
+        self._live = live
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "live": self._live,
+                "projects": len(self._projects),
+                "datasets": len(self._datasets),
+                "training": len(self._training),
+            })
+        return snapshot
+
+    # --- Updates --- #
+
+    def load(self, conn):
+        """Replaces the snapshot with a full read of the watched tables."""
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT * FROM projects;")
+            projects = cur.fetchall()
+            cur.execute("SELECT * FROM datasets;")
+            datasets = cur.fetchall()
+            cur.execute("SELECT id, project_id, dataset_id, job_id, parameters, updated_at, row_version FROM training;")
+            training = cur.fetchall()
+
+        with self._lock:
+            self._projects = {row['id']: self._to_project(row) for row in projects}
+            self._datasets = {row['id']: (row['project_id'], self._to_dataset(row)) for row in datasets}
+            self._training = {row['id']: self._to_training(row) for row in training}
+            self._versions = {
+                (table, row['id']): row.get('row_version')
+                for table, rows in (("projects", projects), ("datasets", datasets), ("training", training))
+                for row in rows
+            }
+            self._project_listing = None
+            self._dataset_listings = {}
+            self._stats["loads"] += 1
+
+    def apply(self, table, op, row):
+        """Applies one INSERT/UPDATE/DELETE of a full table row."""
+        row_id = row.get('id')
+        if row_id is None:
+            return
+        with self._lock:
+            key = (table, row_id)
+            if op == "DELETE":
+                self._deleted.add(key)
+                self._versions.pop(key, None)
+            elif key in self._deleted:
+                return  # A late copy of a row that has since been deleted
+            else:
+                held, version = self._versions.get(key), row.get('row_version')
+                if held is not None and version is not None and version < held:
+                    return  # Older than the row already applied
+                self._versions[key] = version
+            if table == "projects":
+                if op == "DELETE":
+                    self._projects.pop(row_id, None)
+                    # As ON DELETE CASCADE does, before the cascaded rows' own notifications arrive
+                    for dataset_id in [d for d, (pid, _) in self._datasets.items() if pid == row_id]:
+                        self._delete_dataset(dataset_id)
+                    self._delete_training(lambda t: t['project_id'] == row_id)
+                else:
+                    self._projects[row_id] = self._to_project(row)
+                self._project_listing = None
+            elif table == "datasets":
+                if op == "DELETE":
+                    self._delete_dataset(row_id)
+                else:
+                    previous = self._datasets.pop(row_id, None)
+                    if previous is not None:
+                        self._dataset_listings.pop(previous[0], None)
+                    self._datasets[row_id] = (row['project_id'], self._to_dataset(row))
+                    self._dataset_listings.pop(row['project_id'], None)
+            elif table == "training":
+                if op == "DELETE":
+                    self._training.pop(row_id, None)
+                else:
+                    self._training[row_id] = self._to_training(row)
+            else:
+                return
+            self._stats["changes_applied"] += 1
+            self._stats["last_change_at"] = time.time()
+
+    def _delete_dataset(self, dataset_id):
+        """Removes a dataset and its training rows; the caller holds the lock."""
+        self._deleted.add(("datasets", dataset_id))
+        self._versions.pop(("datasets", dataset_id), None)
+        previous = self._datasets.pop(dataset_id, None)
+        if previous is not None:
+            self._dataset_listings.pop(previous[0], None)
+        self._delete_training(lambda t: t['dataset_id'] == dataset_id)
+
+    def _delete_training(self, matches):
+        for training_id in [t['id'] for t in self._training.values() if matches(t)]:
+            self._deleted.add(("training", training_id))
+            self._versions.pop(("training", training_id), None)
+            del self._training[training_id]
+
+    def _to_project(self, row):
+        return self._project_type._make(row.get(col) for col in PROJECT_COLUMNS)
+
+    def _to_dataset(self, row):
+        return self._dataset_type._make(row.get(col) for col in DATASET_COLUMNS)
+
+    @staticmethod
+    def _to_training(row):
+        return {
+            'id': row['id'],
+            'project_id': row['project_id'],
+            'dataset_id': row['dataset_id'],
+            'job_id': row.get('job_id'),
+            'parameters': row.get('parameters'),
+            'updated_at': _as_datetime(row.get('updated_at')),
+        }
+
+    # --- Reads (same results as the corresponding utils.db queries) --- #
+
+    def get_projects(self):
+        with self._lock:
+            if self._project_listing is None:
+                self._project_listing = tuple(sorted(self._projects.values(), key=_listing_key))
+            return self._project_listing
+
+    def get_datasets(self, project_id):
+        project_id = int(project_id)
+        with self._lock:
+            listing = self._dataset_listings.get(project_id)
+            if listing is None:
+                listing = tuple(sorted(
+                    (ds for pid, ds in self._datasets.values() if pid == project_id),
+                    key=_listing_key
+                ))
+                self._dataset_listings[project_id] = listing
+            return listing
+
+    def get_projects_page(self, name_filter, after, limit):
+        return _page(self.get_projects(), name_filter, after, limit)
+
+    def get_datasets_page(self, project_id, name_filter, after, limit):
+        return _page(self.get_datasets(project_id), name_filter, after, limit)
+
+    def get_training_job(self, project_id, dataset_id):
+        with self._lock:
+            matches = [
+                t for t in self._training.values()
+                if t['project_id'] == int(project_id) and t['dataset_id'] == int(dataset_id)
+            ]
+        if not matches:
+            return None
+        record = min(matches, key=lambda t: t['id'])
+        return {'id': record['id'], 'job_id': record['job_id'], 'parameters': record['parameters']}
+
+    def get_datasets_by_job_ids(self, job_ids):
+        wanted = set(job_ids)
+        latest = {}
+        with self._lock:
+            for t in self._training.values():
+                job_id = t['job_id']
+                if job_id not in wanted or t['dataset_id'] not in self._datasets:
+                    continue
+                current = latest.get(job_id)
+                if current is None or _recency(t) > _recency(current):
+                    latest[job_id] = t
+            return {
+                job_id: {'dataset_id': t['dataset_id'], 'name': self._datasets[t['dataset_id']][1].name}
+                for job_id, t in latest.items()
+            }
+
+
+class ChangeFeedListener(threading.Thread):
+    """Background thread that LISTENs on the metadata channel and applies changes.
+
+    On every (re)connect it subscribes first and then reloads the snapshot, so
+    no change committed in between is missed. The connection has TCP keepalives
+    and is probed whenever the channel is quiet, so a dead peer forces a
+    reconnect. While disconnected the snapshot is marked not live and utils.db
+    falls back to querying Postgres.
+    """
+
+    def __init__(self, snapshot, poll_interval=5.0, retry_interval=CHANGE_FEED_RETRY_INTERVAL):
+        super().__init__(name="metadata-change-feed", daemon=True)
+        self.snapshot = snapshot
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = get_db_connection(**CHANGE_FEED_KEEPALIVES)
+                if conn is None:
+                    raise ConnectionError("could not connect to the metadata database")
+                conn.autocommit = True
+                if not self._triggers_installed(conn):
+                    raise RuntimeError("change feed triggers missing; apply migration 0003")
+                if not self._row_versions_installed(conn):
+                    raise RuntimeError("row_version columns missing; apply migration 0014")
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANGE_CHANNEL};")
+                self.snapshot.load(conn)
+                self.snapshot.set_live(True)
+                print("Metadata change feed live")
+                self._listen(conn)
+            except Exception as e:
+                print(f"Metadata change feed unavailable, falling back to queries: {e}")
+            finally:
+                self.snapshot.set_live(False)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop_event.wait(self.retry_interval)
+
+    def _listen(self, conn):
+        while not self._stop_event.is_set():
+            if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                # Quiet channel: check the connection is still there (raises if it isn't, and run() reconnects)
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                self._handle(conn, notify.payload)
+
+    def _handle(self, conn, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed change notification: {payload[:200]}")
+            return
+        table, op, row = change.get('table'), change.get('op'), change.get('row')
+        if table not in WATCHED_TABLES:
+            return
+        if row is None:
+            # Payload was too large to carry the row; read it back
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(f"SELECT * FROM {table} WHERE id = %s;", (change.get('id'),))
+                row = cur.fetchone()
+            if row is None:
+                op, row = "DELETE", {'id': change.get('id')}
+        self.snapshot.apply(table, op, row)
+
+    @staticmethod
+    def _triggers_installed(conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT count(DISTINCT tgname) FROM pg_trigger WHERE tgname = ANY(%s) AND NOT tgisinternal;",
+                (list(CHANGE_TRIGGERS),)
+            )
+            return cur.fetchone()[0] == len(CHANGE_TRIGGERS)
+
+    @staticmethod
+    def _row_versions_installed(conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT count(DISTINCT table_name) FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = ANY(%s) AND column_name = 'row_version';",
+                (list(WATCHED_TABLES),)
+            )
+            return cur.fetchone()[0] == len(WATCHED_TABLES)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_change_feed():
+    """Starts the process-wide change feed listener (once) and registers its snapshot.
+
+    Disabled with METADATA_CHANGE_FEED=false. Returns the listener or None.
+    """
+    global _listener
+    if not CHANGE_FEED_ENABLED:
+        return None
+    with _listener_lock:
+        if _listener is None:
+            snapshot = MetadataSnapshot()
+            set_snapshot(snapshot)
+            _listener = ChangeFeedListener(snapshot)
+            _listener.start()
+    return _listener
+
+
+def get_change_feed_stats():
+    """Returns snapshot size and change counters ({} if the feed isn't running)."""
+    return _listener.snapshot.stats() if _listener is not None else {}
@@ -0,0 +1,146 @@
+"""Cost preview of a materialization plan before it runs.
+
+The query part of every statement the plan would run is passed to
+``EXPLAIN COST``. The Statistics of the scanned relations (the leaves of the
+optimized logical plan) are summed into estimated bytes and rows read:
+
+    Filter (...), Statistics(sizeInBytes=1.2 GiB, rowCount=1.05E+7)
+    +- Relation main.sales.orders[...] parquet, Statistics(sizeInBytes=9.6 GiB, rowCount=8.40E+7)
+
+Metadata-only statements (shallow clones, views, ``LIMIT 0`` table
+definitions) read nothing and are not explained. When EXPLAIN fails or has
+no statistics for a statement, the size of each source table the statement
+mentions is used instead (DESCRIBE DETAIL); row counts are then unknown.
+
+Plans estimated above MATERIALIZE_CONFIRM_BYTES (admin-set; 0 disables it), or
+that can't be estimated at all, need the user's confirmation before they run.
+"""
+import logging
+import os
+import re
+
+from utils.databricks_connect import databricks_connection, fetch_sql
+from utils.materialize import source_tables
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZE_COST_PREVIEW = os.getenv("MATERIALIZE_COST_PREVIEW", "true").lower() == "true"
+MATERIALIZE_CONFIRM_BYTES = int(float(os.getenv("MATERIALIZE_CONFIRM_BYTES", str(100 * 1024 ** 3))))
+
+SIZE_UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+              "PiB": 1024 ** 5, "EiB": 1024 ** 6}
+# Spark prints Long.MaxValue (8.0 EiB) when a relation's size is unknown
+UNKNOWN_SIZE = 8 * 1024 ** 6
+STATISTICS = re.compile(
+    r"Statistics\(sizeInBytes=(?P<size>[\d.]+(?:E[+-]?\d+)?) ?(?P<unit>[KMGTPE]?i?B)(?:, rowCount=(?P<rows>[\d.]+(?:E[+-]?\d+)?))?"
+)
+PLAN_NODE = re.compile(r"^[\s:|+\-]*(?P<node>\w+)")
+OPTIMIZED_PLAN = re.compile(r"== Optimized Logical Plan ==\n(?P<plan>.*?)(?:\n== |\Z)", re.S)
+
+METADATA_ONLY = re.compile(r"^CREATE (?:OR REPLACE )?(?:VIEW \S+ AS |TABLE \S+ SHALLOW CLONE )", re.S)
+MULTI_INSERT = re.compile(r"^FROM (?P<source>.+?) INSERT INTO ", re.S)
+QUERY_PARTS = (
+    re.compile(r"^CREATE (?:OR REPLACE )?TABLE \S+ AS (?P<query>SELECT .*)$", re.S),
+    re.compile(r"^INSERT INTO \S+ (?:REPLACE WHERE .*? )?(?P<query>SELECT .*)$", re.S),
+)
+
+
+def scan_query(statement):
+    """Returns the query a statement reads its rows with, or None if it reads none."""
+    if METADATA_ONLY.match(statement) or statement.rstrip().endswith(" LIMIT 0"):
+        return None
+    match = MULTI_INSERT.match(statement)
+    if match:
+        return f"SELECT * FROM {match.group('source')}"  # Every insert reads the one FROM clause
+    for pattern in QUERY_PARTS:
+        match = pattern.match(statement)
+        if match:
+            return match.group("query")
+    return statement
+
+
+def parse_explain_cost(plan_text):
+    """Sums the statistics of the relations an EXPLAIN COST plan scans.
+
+    Returns:
+        dict: bytes and rows (None where a relation's statistic is unknown), or
+        None if the plan has no relation statistics.
+    """
+    match = OPTIMIZED_PLAN.search(plan_text)
+    total_bytes, total_rows, found = 0, 0, False
+    for line in (match.group("plan") if match else plan_text).splitlines():
+        node = PLAN_NODE.match(line)
+        stats = STATISTICS.search(line)
+        if not node or not stats or "Relation" not in node.group("node") or node.group("node") == "LocalRelation":
+            continue
+        found = True
+        size = float(stats.group("size")) * SIZE_UNITS[stats.group("unit")]
+        total_bytes = None if total_bytes is None or size >= UNKNOWN_SIZE else total_bytes + int(size)
+        rows = stats.group("rows")
+        total_rows = None if total_rows is None or rows is None else total_rows + int(float(rows))
+    return {"bytes": total_bytes, "rows": total_rows} if found else None
+
+
+def explain_cost(connection, query):
+    """Runs EXPLAIN COST on a query; returns parse_explain_cost's result, or None."""
+    rows = fetch_sql(connection, f"EXPLAIN COST {query}")
+    if not rows:
+        return None
+    return parse_explain_cost("\n".join(str(row[0]) for row in rows))
+
+
+def table_size(connection, table, cache):
+    """Returns a table's size in bytes from DESCRIBE DETAIL, or None."""
+    if table not in cache:
+        rows = fetch_sql(connection, f"DESCRIBE DETAIL {table}")
+        detail = rows[0].asDict() if rows else {}
+        cache[table] = int(detail["sizeInBytes"]) if detail.get("sizeInBytes") is not None else None
+    return cache[table]
+
+
+def estimate_stages_cost(connection, stages, tables=(), threshold=MATERIALIZE_CONFIRM_BYTES):
+    """Estimates what every statement of a plan reads.
+
+    Args:
+        tables (iterable): Source tables whose size stands in for statements EXPLAIN can't estimate.
+
+    Returns:
+        dict: bytes and rows (totals, None if any statement is unknown),
+        statements ([{label, bytes, rows, method}]), threshold and needs_confirmation.
+    """
+    sizes = {}
+    statements = []
+    for stage in stages:
+        for label, statement in stage:
+            query = scan_query(statement)
+            if query is None:
+                estimate, method = {"bytes": 0, "rows": 0}, "metadata"
+            else:
+                estimate, method = explain_cost(connection, query), "explain"
+                if estimate is None or estimate["bytes"] is None:
+                    read = [table_size(connection, table, sizes) for table in tables if table in statement]
+                    known = read and None not in read
+                    estimate = {"bytes": sum(read) if known else None, "rows": None}
+                    method = "table_stats" if known else "unknown"
+            statements.append({"label": label, **estimate, "method": method})
+
+    total_bytes = None if any(s["bytes"] is None for s in statements) else sum(s["bytes"] for s in statements)
+    total_rows = None if any(s["rows"] is None for s in statements) else sum(s["rows"] for s in statements)
+    return {
+        "bytes": total_bytes,
+        "rows": total_rows,
+        "statements": statements,
+        "threshold": threshold,
+        "needs_confirmation": threshold > 0 and (total_bytes is None or total_bytes > threshold),
+    }
+
+
+def estimate_materialization_cost(spec, stages, threshold=MATERIALIZE_CONFIRM_BYTES):
+    """Estimates a materialization plan on a pooled connection. Returns None if it can't connect."""
+    with databricks_connection() as conn:
+        if conn is None:
+            return None
+        estimate = estimate_stages_cost(conn, stages, source_tables(spec), threshold)
+    logger.info(f"Estimated materialization of dataset {spec['dataset_id']}: {estimate['bytes']} bytes, {estimate['rows']} rows")
+    return estimate
+
@@ -1,10 +1,33 @@
 import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from databricks import sql
 import logging
 
+from utils.db_pool import ConnectionPool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Session pool per SQL warehouse. Opening a session costs seconds, so sessions
+# are reused across materializations and previews and kept alive while idle.
+DATABRICKS_POOL_MAX_SIZE = int(os.getenv("DATABRICKS_POOL_MAX_SIZE", "8"))  # Concurrent sessions per warehouse
+DATABRICKS_POOL_TIMEOUT = float(os.getenv("DATABRICKS_POOL_TIMEOUT", "120"))
+DATABRICKS_POOL_MAX_IDLE = float(os.getenv("DATABRICKS_POOL_MAX_IDLE", "1800"))
+DATABRICKS_POOL_MAX_LIFETIME = float(os.getenv("DATABRICKS_POOL_MAX_LIFETIME", "14400"))
+DATABRICKS_POOL_PING_AFTER = float(os.getenv("DATABRICKS_POOL_PING_AFTER", "300"))
+# Idle sessions are pinged this often so the warehouse doesn't expire them (0 disables)
+DATABRICKS_KEEPALIVE_INTERVAL = float(os.getenv("DATABRICKS_KEEPALIVE_INTERVAL", "240"))
+
+# Arrow result reads (previews, profiles, validation checks) stop at whichever cap comes first
+ARROW_BATCH_ROWS = int(os.getenv("DATABRICKS_ARROW_BATCH_ROWS", "10000"))
+RESULT_MAX_ROWS = int(os.getenv("DATABRICKS_RESULT_MAX_ROWS", "100000"))
+RESULT_MAX_BYTES = int(os.getenv("DATABRICKS_RESULT_MAX_BYTES", str(256 * 1024 * 1024)))
+
 def get_databricks_connection():
     """Establishes a connection to the Databricks SQL warehouse.
 
@@ -42,6 +65,163 @@ def get_databricks_connection():
         logger.error(f"Failed to connect to Databricks SQL Warehouse: {e}")
         return None
 
+# --- SQL Backends --- #
+# Statements run on a Databricks SQL warehouse by default. SQL_BACKEND=duckdb runs
+# the same statements on a local DuckDB database instead (utils.duckdb_backend),
+# for offline tests and benchmarks and for single-node deployments.
+
+class SqlBackend(ABC):
+    """Where statements run.
+
+    ``connect()`` returns a connection that behaves like a databricks.sql one
+    (``cursor()`` usable as a context manager, with execute, fetchall,
+    fetchmany_arrow and cancel; ``close()``), or None if it can't connect.
+    """
+
+    name = None
+
+    @abstractmethod
+    def pool_key(self):
+        """Identifies the database; each key gets its own session pool."""
+
+    @abstractmethod
+    def connect(self):
+        """Opens a new connection, or returns None if it can't connect."""
+
+
+class DatabricksBackend(SqlBackend):
+    name = "databricks"
+
+    def pool_key(self):
+        return os.getenv("DATABRICKS_WAREHOUSE_ID")
+
+    def connect(self):
+        return get_databricks_connection()
+
+
+_backends = {}  # name -> SqlBackend
+
+
+def get_sql_backend():
+    """Returns the backend named by SQL_BACKEND ('databricks' or 'duckdb'), creating it on first use."""
+    name = os.getenv("SQL_BACKEND", "databricks")
+    backend = _backends.get(name)
+    if backend is None:
+        with _pools_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name == "databricks":
+                    backend = DatabricksBackend()
+                elif name == "duckdb":
+                    from utils.duckdb_backend import DuckDBBackend  # duckdb is only needed for this backend
+                    backend = DuckDBBackend()
+                else:
+                    raise ValueError(f"Unknown SQL_BACKEND '{name}', expected 'databricks' or 'duckdb'")
+                _backends[name] = backend
+    return backend
+
+# --- Connection Pool --- #
+
+class DatabricksConnectionPool(ConnectionPool):
+    """ConnectionPool for databricks.sql connections (no transactions to reset)."""
+
+    @staticmethod
+    def _is_closed(conn):
+        return not getattr(conn, "open", True)
+
+    @staticmethod
+    def _reset(conn):
+        return True
+
+    @staticmethod
+    def _ping(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+
+    @contextmanager
+    def connection(self):
+        """Yields a pooled connection and returns it afterwards (discarded if it was closed)."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+
+_pools = {}  # backend pool key (the warehouse ID for Databricks) -> DatabricksConnectionPool
+_pools_lock = threading.Lock()
+_keepalive_thread = None
+
+
+def get_databricks_pool():
+    """Returns the session pool of the configured warehouse (or SQL backend), creating it on first use."""
+    backend = get_sql_backend()
+    key = backend.pool_key()
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = DatabricksConnectionPool(
+                    backend.connect,
+                    min_size=0,
+                    max_size=DATABRICKS_POOL_MAX_SIZE,
+                    timeout=DATABRICKS_POOL_TIMEOUT,
+                    max_idle=DATABRICKS_POOL_MAX_IDLE,
+                    max_lifetime=DATABRICKS_POOL_MAX_LIFETIME,
+                    ping_after=DATABRICKS_POOL_PING_AFTER
+                )
+                _start_keepalive()
+    return pool
+
+
+def _start_keepalive():
+    global _keepalive_thread
+    if DATABRICKS_KEEPALIVE_INTERVAL <= 0 or _keepalive_thread is not None:
+        return
+
+    def keepalive():
+        while True:
+            time.sleep(DATABRICKS_KEEPALIVE_INTERVAL)
+            for pool in list(_pools.values()):
+                try:
+                    pool.ping_idle(DATABRICKS_KEEPALIVE_INTERVAL)
+                except Exception as e:
+                    logger.error(f"Databricks session keepalive failed: {e}")
+
+    _keepalive_thread = threading.Thread(target=keepalive, name="databricks-keepalive", daemon=True)
+    _keepalive_thread.start()
+
+
+@contextmanager
+def databricks_connection():
+    """Context manager yielding a pooled Databricks connection, or None if none could be opened.
+
+        with databricks_connection() as conn:
+            execute_sql(conn, ...)
+
+    The connection goes back to the pool afterwards; don't close it.
+    """
+    try:
+        pool = get_databricks_pool()
+        conn = pool.getconn()
+    except Exception as e:
+        logger.error(f"Could not get a Databricks connection: {e}")
+        yield None
+        return
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def get_databricks_pool_stats():
+    """Returns {warehouse ID (or backend pool key): pool utilization, wait time and keepalive statistics}."""
+    return {warehouse_id: pool.stats() for warehouse_id, pool in list(_pools.items())}
+
+# --- Execution --- #
+
 def execute_sql(connection, sql_query):
     """Executes a SQL query on the given Databricks connection.
 
@@ -68,6 +248,232 @@ def execute_sql(connection, sql_query):
         logger.error(f"Failed to execute SQL query '{sql_query}': {e}")
         return False
 
+def fetch_sql(connection, sql_query):
+    """Executes a query on the given Databricks connection and returns its rows.
+
+    Args:
+        connection (databricks.sql.client.Connection): The active Databricks connection.
+        sql_query (str): The SQL query string to execute.
+
+    Returns:
+        list: The result rows (databricks.sql Row objects), or None if execution failed.
+    """
+    if not connection:
+        logger.error("Cannot execute SQL: No valid Databricks connection.")
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            logger.info(f"Executing SQL: {sql_query}")
+            cursor.execute(sql_query)
+            return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"Failed to execute SQL query '{sql_query}': {e}")
+        return None
+
+# --- Arrow Results --- #
+# pyarrow comes with databricks-sql-connector[pyarrow]; it is imported lazily
+# so that modules which only execute statements don't need it.
+
+ArrowResult = namedtuple("ArrowResult", ["table", "truncated", "num_rows", "num_bytes"])
+
+
+class ArrowStream:
+    """Iterates over a query result as pyarrow.RecordBatch objects, within row and byte caps.
+
+    Batches come straight from ``cursor.fetchmany_arrow`` and are only sliced
+    (zero-copy) to fit the caps. Once iteration ends, ``truncated`` tells
+    whether a cap cut the result short, and ``schema`` is the result schema.
+    """
+
+    def __init__(self, cursor, batch_rows=ARROW_BATCH_ROWS, max_rows=RESULT_MAX_ROWS, max_bytes=RESULT_MAX_BYTES):
+        self._cursor = cursor
+        self.batch_rows = batch_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.schema = None
+        self.num_rows = 0
+        self.num_bytes = 0
+        self.truncated = False
+
+    def __iter__(self):
+        while self.num_rows < self.max_rows:
+            table = self._cursor.fetchmany_arrow(min(self.batch_rows, self.max_rows - self.num_rows))
+            if self.schema is None:
+                self.schema = table.schema
+            if table.num_rows == 0:
+                return
+            for batch in table.to_batches():
+                remaining = self.max_bytes - self.num_bytes
+                if batch.nbytes > remaining:
+                    # Keep the rows that fit (by average row size) and stop
+                    batch = batch.slice(0, int(remaining / (batch.nbytes / batch.num_rows)))
+                    self.truncated = True
+                if batch.num_rows:
+                    self.num_rows += batch.num_rows
+                    self.num_bytes += batch.nbytes
+                    yield batch
+                if self.truncated:
+                    return
+        # Row cap reached: the result was cut short only if another row exists
+        self.truncated = self._cursor.fetchmany_arrow(1).num_rows > 0
+
+
+@contextmanager
+def stream_arrow(connection, sql_query, batch_rows=ARROW_BATCH_ROWS, max_rows=RESULT_MAX_ROWS,
+                 max_bytes=RESULT_MAX_BYTES):
+    """Context manager running a query and yielding an ArrowStream over its result.
+
+        with stream_arrow(conn, "SELECT ...", max_rows=1000) as stream:
+            for batch in stream:
+                ...
+
+    Memory is bounded by one fetch (``batch_rows``) plus what the caller keeps.
+    Raises if the query fails.
+    """
+    with connection.cursor() as cursor:
+        logger.info(f"Executing SQL (Arrow): {sql_query}")
+        cursor.execute(sql_query)
+        yield ArrowStream(cursor, batch_rows, max_rows, max_bytes)
+
+
+def fetch_arrow(connection, sql_query, max_rows=RESULT_MAX_ROWS, max_bytes=RESULT_MAX_BYTES):
+    """Executes a query and returns its (capped) result as an ArrowResult, or None on failure.
+
+    ``table`` is a pyarrow.Table assembled from the fetched batches without
+    copying them; ``truncated`` is True if a cap cut the result short.
+    """
+    if not connection:
+        logger.error("Cannot execute SQL: No valid Databricks connection.")
+        return None
+
+    import pyarrow as pa
+
+    try:
+        with stream_arrow(connection, sql_query, max_rows=max_rows, max_bytes=max_bytes) as stream:
+            batches = list(stream)
+        table = pa.Table.from_batches(batches, schema=stream.schema)
+        return ArrowResult(table, stream.truncated, stream.num_rows, stream.num_bytes)
+    except Exception as e:
+        logger.error(f"Failed to fetch Arrow results for '{sql_query}': {e}")
+        return None
+
+
+def arrow_to_pandas(table, arrow_backed=False):
+    """Converts a pyarrow.Table to a DataFrame with as few copies as possible.
+
+    With ``arrow_backed`` the columns stay in Arrow memory (pd.ArrowDtype), so
+    nothing is copied. Otherwise columns are converted to NumPy one block each
+    and the table's buffers are released as they go, so ``table`` must not be
+    used afterwards.
+    """
+    import pandas as pd
+
+    if arrow_backed:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def arrow_column_to_numpy(table, column):
+    """Returns one column of a pyarrow.Table as a NumPy array.
+
+    Zero-copy for a single-chunk numeric column without nulls; otherwise the
+    chunks are combined and converted.
+    """
+    chunked = table.column(column)
+    array = chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+    return array.to_numpy(zero_copy_only=False)
+
+
+def execute_sql_concurrently(statements, cleanup_tables=(), on_progress=None, connection=None):
+    """Executes independent SQL statements at the same time, each on its own pooled connection.
+
+    Fails fast: as soon as one statement fails, statements still running are
+    cancelled, those not yet started are skipped, and ``cleanup_tables`` are
+    dropped so no partially created output is left behind.
+
+    Args:
+        statements (list): (label, sql_query) tuples that do not depend on each other.
+        cleanup_tables (iterable): Tables to DROP IF EXISTS when any statement fails.
+        on_progress (callable): Called as on_progress(label, status, seconds) with status
+            'running', 'succeeded', 'failed' or 'cancelled'.
+        connection (databricks.sql.client.Connection): A connection the caller already holds;
+            the first statement runs on it, so the stage takes one session fewer from the pool.
+
+    Returns:
+        bool: True if every statement succeeded, False otherwise.
+    """
+    failed = threading.Event()
+    lock = threading.Lock()
+    running = {}  # label -> cursor, so a failure can cancel the others
+
+    def report(label, status, seconds=None):
+        if on_progress:
+            on_progress(label, status, seconds)
+
+    def cancel_others(failed_label):
+        with lock:
+            others = [(label, cursor) for label, cursor in running.items() if label != failed_label]
+        for label, cursor in others:
+            try:
+                cursor.cancel()
+                logger.info(f"Cancelled '{label}' after '{failed_label}' failed.")
+            except Exception as e:
+                logger.error(f"Failed to cancel '{label}': {e}")
+
+    def run(label, sql_query, held_connection=None):
+        if failed.is_set():
+            report(label, "cancelled")
+            return False
+        with nullcontext(held_connection) if held_connection else databricks_connection() as conn:
+            return run_on(conn, label, sql_query)
+
+    def run_on(conn, label, sql_query):
+        if conn is None:
+            failed.set()
+            report(label, "failed")
+            cancel_others(label)
+            return False
+        started = time.perf_counter()
+        try:
+            with conn.cursor() as cursor:
+                with lock:
+                    running[label] = cursor
+                if failed.is_set():
+                    report(label, "cancelled")
+                    return False
+                report(label, "running")
+                logger.info(f"Executing SQL ({label}): {sql_query}")
+                cursor.execute(sql_query)
+            report(label, "succeeded", time.perf_counter() - started)
+            return True
+        except Exception as e:
+            if failed.is_set():
+                report(label, "cancelled", time.perf_counter() - started)
+            else:
+                failed.set()
+                logger.error(f"Failed to execute SQL query '{sql_query}': {e}")
+                report(label, "failed", time.perf_counter() - started)
+                cancel_others(label)
+            return False
+        finally:
+            with lock:
+                running.pop(label, None)
+
+    if not statements:
+        return True
+    held = [connection] + [None] * (len(statements) - 1)
+    with ThreadPoolExecutor(max_workers=len(statements), thread_name_prefix="databricks-sql") as pool:
+        results = list(pool.map(lambda statement, conn: run(*statement, conn), statements, held))
+
+    if all(results):
+        return True
+    if cleanup_tables:
+        with nullcontext(connection) if connection else databricks_connection() as conn:
+            for table in cleanup_tables:
+                execute_sql(conn, f"DROP TABLE IF EXISTS {table}")
+    return False
+
 # Example usage (optional - can be commented out or removed)
 # if __name__ == '__main__':
 #     conn = get_databricks_connection()
@@ -1,8 +1,16 @@
 import psycopg2
-import pandas as pd
+import json
 import os
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
 from dotenv import load_dotenv
-from psycopg2.extras import RealDictCursor
+from utils.db_pool import ConnectionPool
+from utils.cache import TTLCache
+from utils.query_metrics import (
+    TimedCursor, TimedRealDictCursor, named_query, record_connect, metrics as query_metrics
+)
 
 # Load database credentials from .env file
 load_dotenv(override=True)
@@ -14,6 +22,21 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
 
+# Connection pool sizing (shared by all Dash worker threads in this process)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+
+# Read-through cache for project/dataset listings (DB_CACHE_TTL=0 disables it)
+DB_CACHE_TTL = float(os.getenv("DB_CACHE_TTL", "30"))
+DB_CACHE_MAX_ENTRIES = int(os.getenv("DB_CACHE_MAX_ENTRIES", "256"))
+
+# Rows per page for get_projects_page / get_datasets_page
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+
 
 # DB_NAME = "ml_ops"
 # DB_USER = "bmac"
@@ -21,12 +44,13 @@ DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
 # DB_HOST = "instance-aca94a42-c1f9-40a6-9bb4-a46ae4f2e623.database.cloud.databricks.com"
 # DB_PORT = "5432"
 
-def get_db_connection():
+def get_db_connection(**options):
+    """Establishes a connection to the PostgreSQL database.
 
-    print("(************)")
-    print(DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_SSLMODE)
-    print("(************)")
-    """Establishes a connection to the PostgreSQL database."""
+    Cursors of the connection are timed into utils.query_metrics. ``options``
+    are extra libpq connection parameters (e.g. keepalives_idle).
+    """
+    started = time.perf_counter()
     try:
         conn = psycopg2.connect(
             dbname=DB_NAME,
@@ -34,122 +58,322 @@ def get_db_connection():
             password=DB_PASSWORD,
             host=DB_HOST,
             port=DB_PORT,
-            sslmode=DB_SSLMODE
+            sslmode=DB_SSLMODE,
+            cursor_factory=TimedCursor,
+            **options
         )
+        record_connect(time.perf_counter() - started)
         return conn
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        record_connect(time.perf_counter() - started, failed=True)
+        print(f"Error connecting to database {DB_NAME} on {DB_HOST}:{DB_PORT}: {e}")
         return None
 
+# --- Shared Queries (also used by utils.db_async) --- #
+
+# Columns of the records returned by get_projects / get_datasets
+PROJECT_COLUMNS = ("id", "name", "description", "catalog", "schema", "git_url", "training_notebook")
+# source_table_eval is the user-provided eval table, eval_table_name is the generated one
+DATASET_COLUMNS = (
+    "id", "name", "source_type", "eol_definition", "feature_lookup_definition", "source_table",
+    "timestamp_col", "evaluation_type", "percentage", "source_table_eval", "split_time_column", "materialized",
+    "training_table_name", "eval_table_name", "target"
+)
+
+PROJECTS_QUERY = f"SELECT {', '.join(PROJECT_COLUMNS)} FROM projects ORDER BY name COLLATE \"C\", id;"
+DATASETS_QUERY = f"SELECT {', '.join(DATASET_COLUMNS)} FROM datasets WHERE project_id = %s ORDER BY name COLLATE \"C\", id;"
+TRAINING_JOB_QUERY = "SELECT id, job_id, parameters FROM training WHERE project_id = %s AND dataset_id = %s;"
+DATASET_DETAILS_QUERY = (
+    "SELECT id, project_id, name, source_type, eol_definition, "
+    "feature_lookup_definition, source_table, timestamp_col, "
+    "evaluation_type, percentage, eval_table_name AS source_table_eval, split_time_column, "
+    "materialized, training_table_name, eval_table_name, target "
+    "FROM datasets WHERE id = %s;"
+)
+PROJECT_GIT_QUERY = "SELECT git_url, training_notebook FROM projects WHERE id = %s"
+
+# --- Connection Pool --- #
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db_connection,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    ping_after=DB_POOL_PING_AFTER
+                )
+    return _pool
+
+def db_connection():
+    """Context manager yielding a pooled connection.
+
+    Commits when the block exits cleanly, rolls back if it raises, and always
+    returns the connection to the pool:
+
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(...)
+    """
+    return get_pool().connection()
+
+def get_pool_stats():
+    """Returns connection pool utilization and checkout wait-time statistics."""
+    return get_pool().stats()
+
+@lru_cache(maxsize=128)
+def make_record_type(columns):
+    """Returns a namedtuple class for a tuple of result column names."""
+    return namedtuple("Record", columns, rename=True)
+
+def _query_rows(query, params=None):
+    """Runs a query and returns its rows as a tuple of namedtuple records,
+    raising on any database error."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            record = make_record_type(tuple(col.name for col in cur.description))
+            return tuple(record._make(row) for row in cur.fetchall())
+
+def fetch_rows(query, params=None):
+    """Fetches rows as lightweight namedtuple records (no pandas involved).
+
+    Fields are named after the result columns, e.g. ``row.id`` or ``row._asdict()``.
+    Returns an empty tuple if the query fails.
+    """
+    try:
+        return _query_rows(query, params=params)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+    return ()
+
 def fetch_data(query, params=None):
-    """Fetches data from the database using the provided query."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            df = pd.read_sql_query(query, conn, params=params)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            conn.close()
+    """Fetches data from the database using the provided query as a DataFrame.
+
+    Prefer fetch_rows for metadata queries; this is for callers that need pandas.
+    """
+    import pandas as pd  # Imported lazily so listing metadata doesn't load pandas
+    try:
+        with db_connection() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
     return pd.DataFrame()
 
+# --- Listing Cache --- #
+
+_listing_cache = TTLCache(ttl=DB_CACHE_TTL, max_entries=DB_CACHE_MAX_ENTRIES)
+
+def _projects_cache_key():
+    return ("projects",)
+
+def _datasets_cache_key(project_id):
+    return ("datasets", int(project_id))
+
+def _cached_listing(key, query, params=None):
+    """Reads a listing of records through the cache. Failed queries return an
+    empty tuple and are not cached. Records are immutable, so callers share them."""
+    try:
+        return _listing_cache.get_or_load(key, lambda: _query_rows(query, params=params))
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+    return ()
+
+def invalidate_projects_cache():
+    """Drops the cached project listing."""
+    _listing_cache.invalidate(_projects_cache_key())
+
+def invalidate_datasets_cache(project_id):
+    """Drops the cached dataset listing for one project."""
+    if project_id is not None:
+        _listing_cache.invalidate(_datasets_cache_key(project_id))
+
+def get_cache_stats():
+    """Returns hit/miss counters for the project/dataset listing cache."""
+    return _listing_cache.stats()
+
+def get_query_metrics():
+    """Returns per-query latency summaries, error counts and the slow-query log."""
+    return query_metrics.snapshot()
+
+# --- Change Feed Snapshot --- #
+# utils.change_feed registers an in-memory copy of projects/datasets/training that
+# LISTEN/NOTIFY keeps current. While it is live, reads are served from it.
+
+_snapshot = None
+
+def set_snapshot(snapshot):
+    """Registers (or with None, removes) the snapshot that reads are served from."""
+    global _snapshot
+    _snapshot = snapshot
+
+def _live_snapshot():
+    snapshot = _snapshot
+    return snapshot if snapshot is not None and snapshot.is_live() else None
+
+def _publish_local_change(table, op, row):
+    """Applies a committed write to the snapshot immediately, so this process
+    reads its own writes without waiting for the notification round trip.
+
+    ``row`` comes from RETURNING * and carries its row_version, so the snapshot
+    ignores it if the listener has already applied a newer version of the row."""
+    snapshot = _live_snapshot()
+    if snapshot is not None and row is not None:
+        snapshot.apply(table, op, dict(row))
+
+@named_query
 def get_projects():
-    """Fetches all projects from the database."""
-    return fetch_data(
-        "SELECT id, name, description, catalog, schema, git_url, training_notebook FROM projects ORDER BY name ASC;"
-    )
+    """Fetches all projects from the database as a tuple of records."""
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_projects()
+    return _cached_listing(_projects_cache_key(), PROJECTS_QUERY)
 
+@named_query
 def create_project(name, description, catalog, schema, git_url, training_notebook=None):
     """
     Inserts a new project into the database and returns the new project ID.
     """
     print(f"Attempting to create project with name: {name}, training_notebook: {training_notebook}")  # Debug log
-    conn = get_db_connection()
-    if conn is None:
-        print("Failed to establish database connection")  # Debug log
-        return None
     try:
-        cur = conn.cursor()
-        # Insert new project and return its ID
-        cur.execute(
-            """
-            INSERT INTO projects (name, description, catalog, schema, git_url, training_notebook)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (name, description, catalog, schema, git_url, training_notebook)
-        )
-        project_id = cur.fetchone()[0]
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Insert new project and return it
+                cur.execute(
+                    """
+                    INSERT INTO projects (name, description, catalog, schema, git_url, training_notebook)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING *;
+                    """,
+                    (name, description, catalog, schema, git_url, training_notebook)
+                )
+                row = cur.fetchone()
+        project_id = row['id']
+        invalidate_projects_cache()
+        _publish_local_change("projects", "INSERT", row)
         print(f"Successfully created project with ID: {project_id}")  # Debug log
-        conn.commit()
-        cur.close()
-        conn.close()
         return project_id
     except Exception as e:
         print(f"Error creating project: {e}")  # Debug log
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return None
 
+@named_query
 def update_project(project_id, name, description, catalog, schema, git_url, training_notebook=None):
     """
     Updates an existing project in the database and returns the project ID if successful.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return None
     try:
-        cur = conn.cursor()
-        # Update project record
-        cur.execute(
-            """
-            UPDATE projects
-            SET name = %s,
-                description = %s,
-                catalog = %s,
-                schema = %s,
-                git_url = %s,
-                training_notebook = %s
-            WHERE id = %s;
-            """,
-            (name, description, catalog, schema, git_url, training_notebook, project_id)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Update project record
+                cur.execute(
+                    """
+                    UPDATE projects
+                    SET name = %s,
+                        description = %s,
+                        catalog = %s,
+                        schema = %s,
+                        git_url = %s,
+                        training_notebook = %s
+                    WHERE id = %s
+                    RETURNING *;
+                    """,
+                    (name, description, catalog, schema, git_url, training_notebook, project_id)
+                )
+                row = cur.fetchone()
+        invalidate_projects_cache()
+        _publish_local_change("projects", "UPDATE", row)
         return project_id
     except Exception as e:
         print(f"Error updating project: {e}")
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return None
     
+@named_query
 def get_datasets(project_id):
-    """Fetches all datasets for a given project."""
+    """Fetches all datasets for a given project as a tuple of records."""
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_datasets(project_id)
+    return _cached_listing(_datasets_cache_key(project_id), DATASETS_QUERY, params=(project_id,))
 
-    
-    # Fetch all relevant dataset fields including target
-    # User-provided eval table is `eval_table_name`
-    # Generated eval table is also `eval_table_name` (formerly eval_table_name_generated)
-    return fetch_data(
-        "SELECT id, name, source_type, eol_definition, feature_lookup_definition, source_table,"
-        " timestamp_col, evaluation_type, percentage, eval_table_name, split_time_column, materialized,"
-        " training_table_name, eval_table_name, target"
-        # Note: eval_table_name appears twice intentionally to fetch both columns
-        # The second occurrence corresponds to the generated table name.
-        " FROM datasets WHERE project_id = %s ORDER BY name ASC;",
-        params=(project_id,)
-    )
+# --- Paged Listings --- #
+# Keyset pagination in (name, id) order: a page cursor is the [name, id] of the
+# last row already shown, so each page is one index range scan however deep it is.
+# Names compare in the "C" collation (codepoint order), as in the change feed's
+# snapshot (utils.change_feed), so a cursor from either resumes on the other.
+
+def name_filter_pattern(name_filter):
+    """Returns an ILIKE pattern matching names that contain ``name_filter`` literally."""
+    escaped = name_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def split_page(rows, limit):
+    """Splits ``limit + 1`` fetched rows into the page and the cursor of the next one."""
+    page = tuple(rows[:limit])
+    next_cursor = [page[-1].name, page[-1].id] if len(rows) > limit else None
+    return page, next_cursor
+
+def _query_page(table, columns, where, params, name_filter, after, limit):
+    where, params = list(where), list(params)
+    if name_filter:
+        where.append("name ILIKE %s")
+        params.append(name_filter_pattern(name_filter))
+    if after:
+        where.append('(name COLLATE "C", id) > (%s, %s)')
+        params.extend(after)
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    query = f"SELECT {', '.join(columns)} FROM {table}{where_sql} ORDER BY name COLLATE \"C\", id LIMIT %s;"
+    return split_page(_query_rows(query, tuple(params) + (limit + 1,)), limit)
+
+@named_query
+def get_projects_page(name_filter=None, after=None, limit=LIST_PAGE_SIZE):
+    """Fetches one page of projects in name order.
+
+    Args:
+        name_filter (str): Only projects whose name contains this (case-insensitive).
+        after (list): [name, id] cursor returned with the previous page, or None for the first.
+        limit (int): Maximum number of projects on the page.
+
+    Returns:
+        tuple: (tuple of records, next-page cursor or None on the last page)
+    """
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_projects_page(name_filter, after, limit)
+    try:
+        return _query_page("projects", PROJECT_COLUMNS, [], [], name_filter, after, limit)
+    except Exception as e:
+        print(f"Error fetching projects page: {e}")
+        return (), None
+
+@named_query
+def get_datasets_page(project_id, name_filter=None, after=None, limit=LIST_PAGE_SIZE):
+    """Fetches one page of a project's datasets in name order.
+
+    Takes the same filter/cursor arguments and returns the same
+    (records, next_cursor) pair as get_projects_page.
+    """
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_datasets_page(project_id, name_filter, after, limit)
+    try:
+        return _query_page(
+            "datasets", DATASET_COLUMNS, ["project_id = %s"], [project_id], name_filter, after, limit
+        )
+    except Exception as e:
+        print(f"Error fetching datasets page for project {project_id}: {e}")
+        return (), None
 
+@named_query
 def create_dataset(project_id, name, source_type,
                    eol_definition, feature_lookup_definition,
                    source_table, evaluation_type, percentage,
@@ -160,51 +384,44 @@ def create_dataset(project_id, name, source_type,
     """
     Inserts a new dataset for the given project and returns the new dataset ID.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return None
     try:
-        cur = conn.cursor()
-        # Insert new dataset and return its ID
-        # Use correct column names: eval_table_name for user-provided, eval_table_name for generated
-        cur.execute(
-            """
-            INSERT INTO datasets (
-                project_id, name, source_type, eol_definition,
-                feature_lookup_definition, source_table, evaluation_type,
-                percentage, source_table_eval, split_time_column, timestamp_col,
-                materialized, training_table_name, eval_table_name, target
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (
-                project_id, name, source_type, eol_definition,
-                feature_lookup_definition, source_table, evaluation_type,
-                percentage, 
-                source_table_eval,
-                split_time_column,
-                timestamp_col,
-                materialized, training_table_name, 
-                # Generated eval table name (using the specific parameter)
-                eval_table_name,
-                target
-            )
-        )
-        dataset_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Insert new dataset and return it
+                # Use correct column names: eval_table_name for user-provided, eval_table_name for generated
+                cur.execute(
+                    """
+                    INSERT INTO datasets (
+                        project_id, name, source_type, eol_definition,
+                        feature_lookup_definition, source_table, evaluation_type,
+                        percentage, source_table_eval, split_time_column, timestamp_col,
+                        materialized, training_table_name, eval_table_name, target
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING *;
+                    """,
+                    (
+                        project_id, name, source_type, eol_definition,
+                        feature_lookup_definition, source_table, evaluation_type,
+                        percentage, 
+                        source_table_eval,
+                        split_time_column,
+                        timestamp_col,
+                        materialized, training_table_name, 
+                        # Generated eval table name (using the specific parameter)
+                        eval_table_name,
+                        target
+                    )
+                )
+                row = cur.fetchone()
+        dataset_id = row['id']
+        invalidate_datasets_cache(project_id)
+        _publish_local_change("datasets", "INSERT", row)
         return dataset_id
     except Exception as e:
         print(f"Error creating dataset: {e}")
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return None
 
+@named_query
 def update_dataset(dataset_id, name, source_type,
                    eol_definition, feature_lookup_definition,
                    source_table, evaluation_type, percentage,
@@ -214,221 +431,635 @@ def update_dataset(dataset_id, name, source_type,
                    # Generated eval table name
                    eval_table_name, target):
     """Updates an existing dataset and returns the dataset ID if successful."""
-    conn = get_db_connection()
-    if conn is None:
-        return None
     try:
-        cur = conn.cursor()
-        # Update dataset record
-        # Use correct column names: eval_table_name for user-provided, eval_table_name for generated
-        cur.execute(
-            """
-            UPDATE datasets SET
-                name = %s,
-                source_type = %s,
-                eol_definition = %s,
-                feature_lookup_definition = %s,
-                source_table = %s,
-                evaluation_type = %s,
-                percentage = %s,
-                source_table_eval = %s,  -- User-provided eval table name
-                split_time_column = %s,
-                timestamp_col = %s,
-                materialized = %s,
-                training_table_name = %s,
-                eval_table_name = %s,  -- Generated eval table name
-                target = %s
-            WHERE id = %s;
-            """,
-            (
-                name, source_type, eol_definition,
-                feature_lookup_definition, source_table,
-                evaluation_type, percentage, 
-                # User-provided eval table name
-                source_table_eval,
-                split_time_column, timestamp_col,
-                materialized, training_table_name, 
-                # Generated eval table name (using the specific parameter)
-                eval_table_name,
-                target,
-                dataset_id
-            )
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Update dataset record
+                # Use correct column names: eval_table_name for user-provided, eval_table_name for generated
+                cur.execute(
+                    """
+                    UPDATE datasets SET
+                        name = %s,
+                        source_type = %s,
+                        eol_definition = %s,
+                        feature_lookup_definition = %s,
+                        source_table = %s,
+                        evaluation_type = %s,
+                        percentage = %s,
+                        source_table_eval = %s,  -- User-provided eval table name
+                        split_time_column = %s,
+                        timestamp_col = %s,
+                        materialized = %s,
+                        training_table_name = %s,
+                        eval_table_name = %s,  -- Generated eval table name
+                        target = %s
+                    WHERE id = %s
+                    RETURNING *;
+                    """,
+                    (
+                        name, source_type, eol_definition,
+                        feature_lookup_definition, source_table,
+                        evaluation_type, percentage, 
+                        # User-provided eval table name
+                        source_table_eval,
+                        split_time_column, timestamp_col,
+                        materialized, training_table_name, 
+                        # Generated eval table name (using the specific parameter)
+                        eval_table_name,
+                        target,
+                        dataset_id
+                    )
+                )
+                row = cur.fetchone()
+        # Only the owning project's listing is affected
+        invalidate_datasets_cache(row['project_id'] if row else None)
+        _publish_local_change("datasets", "UPDATE", row)
         return dataset_id
     except Exception as e:
         print(f"Error updating dataset: {e}")
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return None
 
+@named_query
 def delete_dataset(dataset_id):
     """Deletes a specific dataset from the database.
     Returns True if successful, False otherwise.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return False
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "DELETE FROM datasets WHERE id = %s;",
-            (dataset_id,)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                cur.execute(
+                    "DELETE FROM datasets WHERE id = %s RETURNING *;",
+                    (dataset_id,)
+                )
+                row = cur.fetchone()
+        invalidate_datasets_cache(row['project_id'] if row else None)
+        _publish_local_change("datasets", "DELETE", row)
         return True
     except Exception as e:
         print(f"Error deleting dataset {dataset_id}: {e}")
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return False
 
+@named_query
 def delete_project(project_id):
     """Deletes a project and its associated datasets from the database."""
-    conn = get_db_connection()
-    if conn is None:
-        return False
     try:
-        cur = conn.cursor()
-        # First, delete associated datasets (or handle FK constraints appropriately)
-        # Assuming ON DELETE CASCADE is set for datasets.project_id
-        # If not, you'd delete datasets first:
-        # cur.execute("DELETE FROM datasets WHERE project_id = %s;", (project_id,))
-
-        # Delete the project
-        cur.execute("DELETE FROM projects WHERE id = %s;", (project_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # First, delete associated datasets (or handle FK constraints appropriately)
+                # Assuming ON DELETE CASCADE is set for datasets.project_id
+                # If not, you'd delete datasets first:
+                # cur.execute("DELETE FROM datasets WHERE project_id = %s;", (project_id,))
+
+                # Delete the project
+                cur.execute("DELETE FROM projects WHERE id = %s RETURNING *;", (project_id,))
+                row = cur.fetchone()
+        invalidate_projects_cache()
+        invalidate_datasets_cache(project_id)
+        _publish_local_change("projects", "DELETE", row)
         return True
     except Exception as e:
         print(f"Error deleting project {project_id}: {e}")
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        finally:
-            conn.close()
         return False
 
 # --- Training Job Functions ---
 
+@named_query
 def get_training_job(project_id, dataset_id):
     """Fetches a training job record by project and dataset ID."""
-    query = "SELECT id, job_id, parameters FROM training WHERE project_id = %s AND dataset_id = %s;"
-    df = fetch_data(query, params=(project_id, dataset_id))
-    if not df.empty:
-        return df.iloc[0].to_dict() # Return the first row as a dictionary
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_training_job(project_id, dataset_id)
+    rows = fetch_rows(TRAINING_JOB_QUERY, params=(project_id, dataset_id))
+    if rows:
+        return rows[0]._asdict() # Return the first row as a dictionary
     return None
 
+@named_query
 def create_training_job_record(project_id, dataset_id, parameters):
     """Inserts a new training job record and returns its ID."""
-    conn = get_db_connection()
-    if conn is None:
-        return None
     try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO training (project_id, dataset_id, parameters)
-            VALUES (%s, %s, %s::jsonb)
-            RETURNING id;
-            """,
-            (project_id, dataset_id, parameters) # Assuming parameters is a JSON string
-        )
-        training_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
-        return training_id
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                cur.execute(
+                    """
+                    INSERT INTO training (project_id, dataset_id, parameters)
+                    VALUES (%s, %s, %s::jsonb)
+                    RETURNING *;
+                    """,
+                    (project_id, dataset_id, parameters) # Assuming parameters is a JSON string
+                )
+                row = cur.fetchone()
+        _publish_local_change("training", "INSERT", row)
+        return row['id']
     except Exception as e:
         print(f"Error creating training job record: {e}")
-        try: conn.rollback()
-        except Exception: pass
-        finally: conn.close()
         return None
 
+@named_query
 def update_training_job_id(training_id, job_id):
     """Updates the job_id for a specific training record."""
-    conn = get_db_connection()
-    if conn is None:
-        return False
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE training SET job_id = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s;",
-            (job_id, training_id)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                cur.execute(
+                    "UPDATE training SET job_id = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s RETURNING *;",
+                    (job_id, training_id)
+                )
+                row = cur.fetchone()
+        _publish_local_change("training", "UPDATE", row)
         return True
     except Exception as e:
         print(f"Error updating training job_id for ID {training_id}: {e}")
-        try: conn.rollback()
-        except Exception: pass
-        finally: conn.close()
         return False
 
+# --- Training Run History ---
+# training_runs is append-only: one row per submitted Databricks job run
+
+TRAINING_RUN_COLUMNS = (
+    "id", "project_id", "dataset_id", "job_id", "run_id", "parameters",
+    "status", "submitted_at", "finished_at", "duration_seconds"
+)
+TRAINING_RUNS_LIMIT = int(os.getenv("TRAINING_RUNS_LIMIT", "20"))
+
+@named_query
+def record_training_run(project_id, dataset_id, job_id, run_id, parameters):
+    """Appends a submitted run to the training history and returns its ID."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO training_runs (project_id, dataset_id, job_id, run_id, parameters)
+                    VALUES (%s, %s, %s, %s, %s::jsonb)
+                    RETURNING id;
+                    """,
+                    (project_id, dataset_id, job_id, run_id, parameters) # parameters is a JSON string
+                )
+                return cur.fetchone()[0]
+    except Exception as e:
+        print(f"Error recording training run {run_id} of job {job_id}: {e}")
+        return None
+
+@named_query
+def update_training_run_status(training_run_id, status, finished_at=None, duration_seconds=None):
+    """Stores the latest known status of a run. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE training_runs
+                    SET status = %s,
+                        finished_at = COALESCE(%s, finished_at),
+                        duration_seconds = COALESCE(%s, duration_seconds)
+                    WHERE id = %s;
+                    """,
+                    (status, finished_at, duration_seconds, training_run_id)
+                )
+        return True
+    except Exception as e:
+        print(f"Error updating status of training run {training_run_id}: {e}")
+        return False
+
+@named_query
+def get_training_runs(dataset_id, limit=TRAINING_RUNS_LIMIT):
+    """Fetches the latest runs of a dataset, newest first, as a tuple of records."""
+    return fetch_rows(
+        f"SELECT {', '.join(TRAINING_RUN_COLUMNS)} FROM training_runs "
+        "WHERE dataset_id = %s ORDER BY submitted_at DESC, id DESC LIMIT %s;",
+        params=(dataset_id, limit)
+    )
+
+# --- Materialization Jobs ---
+# Written by utils.materialize as background jobs progress; polled by the Datasets tab
+
+MATERIALIZATION_JOB_COLUMNS = (
+    "id", "dataset_id", "status", "spec", "statements", "result", "error", "worker",
+    "created_at", "started_at", "finished_at", "updated_at"
+)
+
+@named_query
+def create_materialization_job(dataset_id, spec, statements, worker):
+    """Inserts a queued materialization job and returns its ID.
+
+    Returns None on error, or if the dataset already has a queued or running
+    job (one unfinished job per dataset, see migration 0011).
+    """
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO materialization_jobs (dataset_id, spec, statements, worker)
+                    VALUES (%s, %s::jsonb, %s::jsonb, %s)
+                    ON CONFLICT (dataset_id) WHERE status IN ('queued', 'running') DO NOTHING
+                    RETURNING id;
+                    """,
+                    (dataset_id, json.dumps(spec), json.dumps(statements), worker)
+                )
+                row = cur.fetchone()
+                return row[0] if row else None
+    except Exception as e:
+        print(f"Error creating materialization job for dataset {dataset_id}: {e}")
+        return None
+
+@named_query
+def create_pending_materialization_job(dataset_id, spec, statements, worker):
+    """Inserts a job awaiting the user's confirmation and returns its ID, or None.
+
+    A dataset keeps only its latest pending job; older ones are discarded.
+    """
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM materialization_jobs WHERE dataset_id = %s AND status = 'pending';",
+                    (dataset_id,)
+                )
+                cur.execute(
+                    """
+                    INSERT INTO materialization_jobs (dataset_id, status, spec, statements, worker)
+                    VALUES (%s, 'pending', %s::jsonb, %s::jsonb, %s)
+                    RETURNING id;
+                    """,
+                    (dataset_id, json.dumps(spec), json.dumps(statements), worker)
+                )
+                return cur.fetchone()[0]
+    except Exception as e:
+        print(f"Error creating pending materialization job for dataset {dataset_id}: {e}")
+        return None
+
+@named_query
+def queue_pending_materialization_job(job_id, worker):
+    """Moves a pending job to 'queued' on ``worker``; returns its spec, or None.
+
+    None also if the job isn't pending or its dataset already has an unfinished job.
+    """
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE materialization_jobs
+                    SET status = 'queued', worker = %s, created_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s AND status = 'pending'
+                    RETURNING spec;
+                    """,
+                    (worker, job_id)
+                )
+                row = cur.fetchone()
+                return row[0] if row else None
+    except psycopg2.IntegrityError:  # Another job of the dataset is unfinished (migration 0011)
+        return None
+    except Exception as e:
+        print(f"Error queuing materialization job {job_id}: {e}")
+        return None
+
+@named_query
+def delete_pending_materialization_job(job_id):
+    """Discards a job still awaiting confirmation. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM materialization_jobs WHERE id = %s AND status = 'pending';", (job_id,))
+        return True
+    except Exception as e:
+        print(f"Error discarding materialization job {job_id}: {e}")
+        return False
+
+@named_query
+def get_active_materialization_job(dataset_id):
+    """Fetches the ID of a dataset's queued or running materialization job, or None."""
+    rows = fetch_rows(
+        "SELECT id FROM materialization_jobs WHERE dataset_id = %s AND status IN ('queued', 'running');",
+        params=(dataset_id,)
+    )
+    return rows[0].id if rows else None
+
+@named_query
+def update_materialization_job(job_id, status=None, spec=None, statements=None, result=None, error=None):
+    """Records a job's progress. Moving to 'running' stamps started_at, and to
+    'succeeded' or 'failed' stamps finished_at.
+
+    Only an unfinished (queued or running) job is updated, so a worker whose
+    lease expired can't overwrite the 'failed' the lease sweep set. Returns
+    True if the job was updated, False if it had finished or on error."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE materialization_jobs
+                    SET status = COALESCE(%(status)s, status),
+                        spec = COALESCE(%(spec)s::jsonb, spec),
+                        statements = COALESCE(%(statements)s::jsonb, statements),
+                        result = COALESCE(%(result)s::jsonb, result),
+                        error = COALESCE(%(error)s, error),
+                        started_at = CASE WHEN %(status)s = 'running' THEN CURRENT_TIMESTAMP ELSE started_at END,
+                        finished_at = CASE WHEN %(status)s IN ('succeeded', 'failed')
+                                           THEN CURRENT_TIMESTAMP ELSE finished_at END,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %(job_id)s AND status IN ('queued', 'running');
+                    """,
+                    {
+                        "status": status,
+                        "spec": json.dumps(spec) if spec is not None else None,
+                        "statements": json.dumps(statements) if statements is not None else None,
+                        "result": json.dumps(result) if result is not None else None,
+                        "error": error,
+                        "job_id": job_id,
+                    }
+                )
+                return cur.rowcount == 1
+    except Exception as e:
+        print(f"Error updating materialization job {job_id}: {e}")
+        return False
+
+@named_query
+def get_materialization_job(job_id):
+    """Fetches a materialization job as a dict, or None."""
+    rows = fetch_rows(
+        f"SELECT {', '.join(MATERIALIZATION_JOB_COLUMNS)} FROM materialization_jobs WHERE id = %s;",
+        params=(job_id,)
+    )
+    return rows[0]._asdict() if rows else None
+
+@named_query
+def renew_materialization_job_leases(job_ids):
+    """Refreshes updated_at of the given unfinished jobs, so their leases don't expire. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE materialization_jobs SET updated_at = CURRENT_TIMESTAMP "
+                    "WHERE id = ANY(%s) AND status IN ('queued', 'running');",
+                    (list(job_ids),)
+                )
+        return True
+    except Exception as e:
+        print(f"Error renewing materialization job leases: {e}")
+        return False
+
+@named_query
+def fail_expired_materialization_jobs(lease_seconds, error):
+    """Fails queued/running jobs not updated for ``lease_seconds``. Returns their IDs."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE materialization_jobs
+                    SET status = 'failed', error = %s,
+                        finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE status IN ('queued', 'running')
+                      AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                    RETURNING id;
+                    """,
+                    (error, lease_seconds)
+                )
+                return [row[0] for row in cur.fetchall()]
+    except Exception as e:
+        print(f"Error failing expired materialization jobs: {e}")
+        return []
+
+# --- Materialization Results ---
+# datasets.materialization_fingerprint and class_ratios, maintained by utils.materialize
+
+@named_query
+def get_dataset_materialization(dataset_id):
+    """Fetches a dataset's materialized tables and fingerprint as a dict, or None."""
+    rows = fetch_rows(
+        "SELECT materialized, training_table_name, eval_table_name, materialization_fingerprint "
+        "FROM datasets WHERE id = %s;",
+        params=(dataset_id,)
+    )
+    return rows[0]._asdict() if rows else None
+
+@named_query
+def set_dataset_fingerprint(dataset_id, fingerprint):
+    """Stores (or with None, clears) a dataset's materialization fingerprint. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE datasets SET materialization_fingerprint = %s WHERE id = %s;",
+                    (fingerprint, dataset_id)
+                )
+        return True
+    except Exception as e:
+        print(f"Error storing fingerprint of dataset {dataset_id}: {e}")
+        return False
+
+@named_query
+def set_dataset_class_ratios(dataset_id, class_ratios):
+    """Records the per-class split a stratified materialization produced. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE datasets SET class_ratios = %s::jsonb WHERE id = %s;",
+                    (json.dumps(class_ratios) if class_ratios is not None else None, dataset_id)
+                )
+        return True
+    except Exception as e:
+        print(f"Error storing class ratios of dataset {dataset_id}: {e}")
+        return False
+
+# --- Dataset Watermarks ---
+# High-water marks of incrementally materialized dynamic_table datasets (utils.materialize)
+
+DATASET_WATERMARK_COLUMNS = (
+    "dataset_id", "timestamp_col", "high_water_mark", "settings",
+    "training_table_name", "eval_table_name", "updated_at"
+)
+
+@named_query
+def get_dataset_watermark(dataset_id):
+    """Fetches a dataset's high-water mark as a dict, or None if it has none."""
+    rows = fetch_rows(
+        f"SELECT {', '.join(DATASET_WATERMARK_COLUMNS)} FROM dataset_watermarks WHERE dataset_id = %s;",
+        params=(dataset_id,)
+    )
+    return rows[0]._asdict() if rows else None
+
+@named_query
+def save_dataset_watermark(dataset_id, timestamp_col, high_water_mark, settings,
+                           training_table_name, eval_table_name, previous_high_water_mark=None):
+    """Moves a dataset's high-water mark from ``previous_high_water_mark`` (None: no mark) to ``high_water_mark``.
+
+    A compare-and-set: if the stored mark is no longer the one the run
+    started from (another run moved or recorded it), nothing is written.
+    Returns True if the mark was saved, False otherwise.
+    """
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                if previous_high_water_mark is None:
+                    cur.execute(
+                        """
+                        INSERT INTO dataset_watermarks (dataset_id, timestamp_col, high_water_mark, settings,
+                                                        training_table_name, eval_table_name)
+                        VALUES (%s, %s, %s, %s::jsonb, %s, %s)
+                        ON CONFLICT (dataset_id) DO NOTHING;
+                        """,
+                        (dataset_id, timestamp_col, high_water_mark, json.dumps(settings),
+                         training_table_name, eval_table_name)
+                    )
+                else:
+                    cur.execute(
+                        """
+                        UPDATE dataset_watermarks
+                        SET timestamp_col = %s,
+                            high_water_mark = %s,
+                            settings = %s::jsonb,
+                            training_table_name = %s,
+                            eval_table_name = %s,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE dataset_id = %s AND high_water_mark IS NOT DISTINCT FROM %s;
+                        """,
+                        (timestamp_col, high_water_mark, json.dumps(settings), training_table_name,
+                         eval_table_name, dataset_id, previous_high_water_mark)
+                    )
+                saved = cur.rowcount == 1
+        if not saved:
+            print(f"High-water mark of dataset {dataset_id} is no longer {previous_high_water_mark}; not saved")
+        return saved
+    except Exception as e:
+        print(f"Error saving watermark of dataset {dataset_id}: {e}")
+        return False
+
+@named_query
+def delete_dataset_watermark(dataset_id):
+    """Forgets a dataset's high-water mark, so its next materialization is a full load."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM dataset_watermarks WHERE dataset_id = %s;", (dataset_id,))
+        return True
+    except Exception as e:
+        print(f"Error deleting watermark of dataset {dataset_id}: {e}")
+        return False
+
+# --- Retention ---
+# References utils.retention must keep. These raise instead of returning an empty
+# result on error, so a failed lookup can never make a table look unreferenced.
+
+@named_query
+def get_project_schemas():
+    """Returns the distinct (catalog, schema) pairs of all projects. Raises on database errors."""
+    rows = _query_rows(
+        "SELECT DISTINCT catalog, schema FROM projects WHERE catalog IS NOT NULL AND schema IS NOT NULL;"
+    )
+    return [(row.catalog, row.schema) for row in rows]
+
+@named_query
+def get_referenced_table_names():
+    """Returns {table name: reason} for every table the metadata database refers to.
+
+    Covers the datasets' current tables and source tables (a materialized
+    table may be another dataset's source or eval table), the stable tables
+    of incremental datasets and the outputs of queued or running
+    materialization jobs. Source tables are qualified with the project's
+    catalog and schema, as utils.materialize.qualify_table_name does.
+    Raises on database errors.
+    """
+    rows = _query_rows("""
+        SELECT training_table_name AS table_name, 'dataset ' || id AS reason FROM datasets
+        UNION ALL SELECT eval_table_name, 'dataset ' || id FROM datasets
+        UNION ALL SELECT CASE array_length(string_to_array(d.source, '.'), 1)
+                WHEN 1 THEN p.catalog || '.' || p.schema || '.' || d.source
+                WHEN 2 THEN p.catalog || '.' || d.source
+                ELSE d.source END,
+            d.reason
+            FROM (
+                SELECT project_id, source_table AS source, 'source of dataset ' || id AS reason FROM datasets
+                UNION ALL SELECT project_id, source_table_eval, 'eval source of dataset ' || id FROM datasets
+            ) d JOIN projects p ON p.id = d.project_id
+            WHERE d.source IS NOT NULL AND d.source <> ''
+        UNION ALL SELECT training_table_name, 'incremental dataset ' || dataset_id FROM dataset_watermarks
+        UNION ALL SELECT eval_table_name, 'incremental dataset ' || dataset_id FROM dataset_watermarks
+        UNION ALL SELECT spec->>'training_table_name', 'materialization job ' || id
+            FROM materialization_jobs WHERE status IN ('queued', 'running')
+        UNION ALL SELECT spec->>'eval_table_name', 'materialization job ' || id
+            FROM materialization_jobs WHERE status IN ('queued', 'running');
+    """)
+    return {row.table_name: row.reason for row in rows if row.table_name}
+
+@named_query
+def get_training_job_ids():
+    """Returns the Databricks job IDs of all training jobs. Raises on database errors."""
+    rows = _query_rows("SELECT DISTINCT job_id FROM training WHERE job_id IS NOT NULL;")
+    return [row.job_id for row in rows]
+
+# --- Table Profiles ---
+# Cache for utils.profiling, keyed by table name and Delta version
+
+@named_query
+def get_cached_table_profile(table_name, delta_version, target_column, sample_percent):
+    """Fetches a cached profile dict, or None if this table version hasn't been profiled."""
+    rows = fetch_rows(
+        "SELECT profile FROM table_profiles "
+        "WHERE table_name = %s AND delta_version = %s AND target_column = %s AND sample_percent = %s;",
+        params=(table_name, delta_version, target_column or '', sample_percent)
+    )
+    return rows[0].profile if rows else None
+
+@named_query
+def save_table_profile(table_name, delta_version, target_column, sample_percent, profile):
+    """Caches a profile (replacing any for the same key). Returns True on success."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO table_profiles (table_name, delta_version, target_column, sample_percent, profile)
+                    VALUES (%s, %s, %s, %s, %s::jsonb)
+                    ON CONFLICT (table_name, delta_version, target_column, sample_percent) DO UPDATE
+                    SET profile = EXCLUDED.profile, computed_at = CURRENT_TIMESTAMP;
+                    """,
+                    (table_name, delta_version, target_column or '', sample_percent, json.dumps(profile))
+                )
+        return True
+    except Exception as e:
+        print(f"Error caching profile of {table_name}@{delta_version}: {e}")
+        return False
+
+@named_query
 def get_dataset_details(dataset_id):
     """Fetches details for a specific dataset."""
-    conn = get_db_connection()
-    if conn:
-        try:
+    try:
+        with db_connection() as conn:
             # Use RealDictCursor to get results as dictionaries
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            # Select both eval_table_name columns, aliasing the second one for clarity
-            cur.execute(
-                "SELECT id, project_id, name, source_type, eol_definition, "
-                "feature_lookup_definition, source_table, timestamp_col, "
-                "evaluation_type, percentage, eval_table_name AS source_table_eval, split_time_column, "
-                "materialized, training_table_name, eval_table_name, target "
-                "FROM datasets WHERE id = %s;",
-                (dataset_id,)
-            )
-            details = cur.fetchone()
-            # --- Rename aliased key back for consistency with other parts of the code --- 
-            # The rest of the code expects the generated name under 'eval_table_name'
-            # The user-provided name (only relevant for eval_type='table') will be under 'source_table_eval'
-            # if details and 'eval_table_name' in details:
-            #     details['generated_eval_table_name'] = details.pop('eval_table_name')
-            # # --- End rename --- #
-            cur.close()
-            conn.close()
-            return details
-        except Exception as e:
-            print(f"Error fetching dataset details: {e}")
-            conn.close()
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Select both eval_table_name columns, aliasing the second one for clarity
+                cur.execute(DATASET_DETAILS_QUERY, (dataset_id,))
+                details = cur.fetchone()
+                # --- Rename aliased key back for consistency with other parts of the code --- 
+                # The rest of the code expects the generated name under 'eval_table_name'
+                # The user-provided name (only relevant for eval_type='table') will be under 'source_table_eval'
+                # if details and 'eval_table_name' in details:
+                #     details['generated_eval_table_name'] = details.pop('eval_table_name')
+                # # --- End rename --- #
+        return details
+    except Exception as e:
+        print(f"Error fetching dataset details: {e}")
     return None
 
+@named_query
 def get_project_git_details(project_id):
     """ Fetches git details for a given project ID.
         - git_url and training_notebook are fetched from the projects table.
         - Other details (provider, branch) use environment variables with fallbacks.
     """
-    conn = None
     project_git_url_from_db = None
     project_training_notebook_from_db = None # Added for training_notebook
 
     try:
-        conn = get_db_connection()
-        if conn:
+        with db_connection() as conn:
             # Use RealDictCursor to get results as dictionaries
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
                 # Fetch both git_url and training_notebook
-                cur.execute("SELECT git_url, training_notebook FROM projects WHERE id = %s", (project_id,))
+                cur.execute(PROJECT_GIT_QUERY, (project_id,))
                 result = cur.fetchone()
                 if result:
                     if result['git_url']:
@@ -437,14 +1068,16 @@ def get_project_git_details(project_id):
                         project_training_notebook_from_db = result['training_notebook']
     except Exception as e:
         print(f"Error fetching git_url/training_notebook for project ID {project_id} from database: {e}")
-    finally:
-        if conn:
-            conn.close()
 
+    return resolve_git_details(project_git_url_from_db, project_training_notebook_from_db)
+
+def resolve_git_details(git_url=None, training_notebook=None):
+    """Combines a project's stored git_url/training_notebook with the
+    environment-configured fallbacks, provider and branch."""
     # Determine the final git_url: use DB value if available, else fallback
-    final_git_url = project_git_url_from_db if project_git_url_from_db else os.getenv("DB_GIT_URL", "https://github.com/BenMacKenzie/db-model-trainer")
+    final_git_url = git_url if git_url else os.getenv("DB_GIT_URL", "https://github.com/BenMacKenzie/db-model-trainer")
     # Determine final notebook_path: use DB value if available, else fallback
-    final_notebook_path = project_training_notebook_from_db if project_training_notebook_from_db else os.getenv("DB_NOTEBOOK_PATH", "notebooks/01_Build_Model")
+    final_notebook_path = training_notebook if training_notebook else os.getenv("DB_NOTEBOOK_PATH", "notebooks/01_Build_Model")
 
     return {
         "git_url": final_git_url,
@@ -454,68 +1087,95 @@ def get_project_git_details(project_id):
         # "training_notebook": os.getenv("DB_TRAINING_NOTEBOOK_PATH", "notebooks/01_Build_Model") # This line can be removed
     }
 
+@named_query
 def get_dataset_name_by_id(dataset_id):
     """Fetch the name of a dataset given its ID."""
-    conn = None
     try:
-        conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT name FROM datasets WHERE id = %s", (dataset_id,))
-            result = cur.fetchone()
-            return result['name'] if result else "Unknown Dataset"
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                cur.execute("SELECT name FROM datasets WHERE id = %s", (dataset_id,))
+                result = cur.fetchone()
+        return result['name'] if result else "Unknown Dataset"
     except Exception as e:
         print(f"Error fetching dataset name for ID {dataset_id}: {e}")
         return "Error Fetching Name"
-    finally:
-        if conn:
-            conn.close()
 
+@named_query
 def get_dataset_name_by_training_table(training_table):
     """Fetch the name of a dataset given its training_table_name."""
-    conn = None
     if not training_table: # Handle cases where the param might be missing
         return "Training Table Param Missing"
     try:
-        conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Use exact match since the materialized name should be unique and stored
-            cur.execute("SELECT name FROM datasets WHERE training_table_name = %s", (training_table,))
-            result = cur.fetchone()
-            return result['name'] if result else "Unknown Dataset (Table Mismatch?)"
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # Use exact match since the materialized name should be unique and stored
+                cur.execute("SELECT name FROM datasets WHERE training_table_name = %s", (training_table,))
+                result = cur.fetchone()
+        return result['name'] if result else "Unknown Dataset (Table Mismatch?)"
     except Exception as e:
         print(f"Error fetching dataset name for training table {training_table}: {e}")
         return "Error Fetching Name"
-    finally:
-        if conn:
-            conn.close()
 
+def _job_id_int(job_id):
+    """A job ID as an int, or None if it isn't one."""
+    try:
+        return int(job_id)
+    except (TypeError, ValueError):
+        return None
+
+@named_query
+def get_datasets_by_job_ids(job_ids):
+    """Resolves any number of Databricks Job IDs to their datasets in one query.
+
+    Args:
+        job_ids (iterable): Job IDs to resolve. Falsy values, values that aren't
+            integers (e.g. a malformed MLflow run tag) and duplicates are ignored.
+
+    Returns:
+        dict: Maps each resolved job_id (int) to {'dataset_id': int, 'name': str}.
+              Job IDs with no training record are absent from the result.
+              Returns None if the lookup failed.
+    """
+    ids = sorted({job_id for job_id in map(_job_id_int, job_ids) if job_id})
+    if not ids:
+        return {}
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_datasets_by_job_ids(ids)
+    try:
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=TimedRealDictCursor) as cur:
+                # A job_id may be linked to several training rows; prefer the most recently updated
+                cur.execute(
+                    """
+                    SELECT DISTINCT ON (t.job_id) t.job_id, d.id AS dataset_id, d.name
+                    FROM training t
+                    JOIN datasets d ON d.id = t.dataset_id
+                    WHERE t.job_id = ANY(%s::bigint[])
+                    ORDER BY t.job_id, t.updated_at DESC NULLS LAST, t.id DESC;
+                    """,
+                    (ids,)
+                )
+                rows = cur.fetchall()
+        return {
+            int(row['job_id']): {'dataset_id': row['dataset_id'], 'name': row['name']}
+            for row in rows
+        }
+    except Exception as e:
+        print(f"Error resolving datasets for {len(ids)} job IDs: {e}")
+        return None
+
+@named_query
 def get_dataset_name_by_job_id(job_id):
     """Fetches the dataset name associated with a given Databricks Job ID 
        by looking up the job_id in the training table."""
-    conn = None
     if not job_id:
         return "Job ID Missing in Run"
-    try:
-        conn = get_db_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Find the distinct dataset_id linked to this job_id
-            cur.execute("SELECT DISTINCT dataset_id FROM training WHERE job_id = %s", (job_id,))
-            training_record = cur.fetchone()
-            
-            if not training_record:
-                return "Job ID Not Found in DB"
-                
-            dataset_id = training_record['dataset_id']
-            
-            # Now fetch the dataset name using the found dataset_id
-            cur.execute("SELECT name FROM datasets WHERE id = %s", (dataset_id,))
-            dataset_record = cur.fetchone()
-            
-            return dataset_record['name'] if dataset_record else "Dataset Not Found"
-
-    except Exception as e:
-        print(f"Error fetching dataset name for job ID {job_id}: {e}")
+    if _job_id_int(job_id) is None:
+        print(f"Error fetching dataset name: job ID {job_id!r} is not an integer")
+        return "Error Fetching Name"
+    resolved = get_datasets_by_job_ids([job_id])
+    if resolved is None:
         return "Error Fetching Name"
-    finally:
-        if conn:
-            conn.close()
+    dataset = resolved.get(_job_id_int(job_id))
+    return dataset['name'] if dataset else "Job ID Not Found in DB"
@@ -0,0 +1,190 @@
+"""Async lookups of the metadata database on psycopg 3.
+
+Runs the independent reads of the training dialog concurrently, with the
+same queries as utils.db (and, while it is live, the same change feed
+snapshot), on a small psycopg_pool.AsyncConnectionPool.
+
+Dash callbacks are synchronous, so the pool lives on a dedicated event-loop
+thread and ``run_sync`` bridges into it:
+
+    training_job, dataset, git = load_training_context(project_id, dataset_id)
+
+utils.db remains the API for everything else, including every write.
+"""
+import asyncio
+import atexit
+import os
+import threading
+from contextlib import suppress
+
+from psycopg import AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from utils.db import (
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_SSLMODE,
+    DB_POOL_TIMEOUT, DB_POOL_MAX_IDLE, DB_POOL_MAX_LIFETIME,
+    TRAINING_JOB_QUERY, DATASET_DETAILS_QUERY, PROJECT_GIT_QUERY,
+    _live_snapshot, resolve_git_details
+)
+from utils.query_metrics import TimedAsyncCursorMixin, named_query
+
+# One connection per concurrent lookup of get_training_context; opened on demand
+DB_ASYNC_POOL_MAX_SIZE = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "3"))
+
+# --- Event Loop and Pool --- #
+
+class TimedAsyncCursor(TimedAsyncCursorMixin, AsyncCursor):
+    """Cursor of the async pool's connections, timed into utils.query_metrics like utils.db's."""
+
+
+_loop = None
+_loop_lock = threading.Lock()
+_pool = None
+_pool_lock = None
+
+
+def _get_loop():
+    """Returns the background event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="db-async-loop", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Runs a coroutine on the background loop and blocks for its result.
+
+    Must not be called from the background loop itself.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+async def _check_connection(conn):
+    """AsyncConnectionPool.check_connection on an untimed cursor, so the check run on
+    every checkout isn't counted as an execute of the lookup that checked out."""
+    await conn.set_autocommit(True)
+    try:
+        async with AsyncCursor(conn) as cur:
+            await cur.execute("")
+    finally:
+        with suppress(Exception):
+            await conn.set_autocommit(False)
+
+
+async def get_pool():
+    """Returns the async connection pool, opening it on first use."""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                pool = AsyncConnectionPool(
+                    make_conninfo(
+                        dbname=DB_NAME,
+                        user=DB_USER,
+                        password=DB_PASSWORD,
+                        host=DB_HOST,
+                        port=DB_PORT,
+                        sslmode=DB_SSLMODE
+                    ),
+                    min_size=0,
+                    max_size=DB_ASYNC_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    kwargs={"cursor_factory": TimedAsyncCursor},
+                    check=_check_connection,
+                    open=False
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def _fetch_one(query, params=None, row_factory=dict_row):
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=row_factory) as cur:
+            await cur.execute(query, params)
+            return await cur.fetchone()
+
+
+def close_pool():
+    """Closes the async pool; registered to run at interpreter exit."""
+    if _pool is not None and _loop is not None and _loop.is_running():
+        try:
+            run_sync(_pool.close(), timeout=5)
+        except Exception as e:
+            print(f"Error closing async database pool: {e}")
+
+
+atexit.register(close_pool)
+
+
+def get_pool_stats():
+    """Returns psycopg_pool statistics for the async pool ({} before first use)."""
+    return dict(_pool.get_stats()) if _pool is not None else {}
+
+# --- Datasets and Projects --- #
+
+@named_query
+async def get_dataset_details(dataset_id):
+    """Fetches details for a specific dataset as a dict, or None."""
+    try:
+        return await _fetch_one(DATASET_DETAILS_QUERY, (dataset_id,))
+    except Exception as e:
+        print(f"Error fetching dataset details: {e}")
+        return None
+
+
+@named_query
+async def get_project_git_details(project_id):
+    """Fetches git details for a project, with the same fallbacks as utils.db."""
+    result = None
+    try:
+        result = await _fetch_one(PROJECT_GIT_QUERY, (project_id,))
+    except Exception as e:
+        print(f"Error fetching git_url/training_notebook for project ID {project_id} from database: {e}")
+    result = result or {}
+    return resolve_git_details(result.get('git_url'), result.get('training_notebook'))
+
+# --- Training Records --- #
+
+@named_query
+async def get_training_job(project_id, dataset_id):
+    """Fetches a training job record by project and dataset ID as a dict, or None."""
+    snapshot = _live_snapshot()
+    if snapshot is not None:
+        return snapshot.get_training_job(project_id, dataset_id)
+    try:
+        return await _fetch_one(TRAINING_JOB_QUERY, (project_id, dataset_id))
+    except Exception as e:
+        print(f"Error fetching training job for project {project_id}, dataset {dataset_id}: {e}")
+        return None
+
+# --- Concurrent Lookups --- #
+
+async def get_training_context(project_id, dataset_id):
+    """Fetches the training record, dataset details and project git details concurrently.
+
+    Returns:
+        tuple: (training_job_or_None, dataset_details_or_None, git_details)
+    """
+    return tuple(await asyncio.gather(
+        get_training_job(project_id, dataset_id),
+        get_dataset_details(dataset_id),
+        get_project_git_details(project_id)
+    ))
+
+
+def load_training_context(project_id, dataset_id):
+    """Synchronous wrapper around get_training_context for Dash callbacks."""
+    return run_sync(get_training_context(project_id, dataset_id))
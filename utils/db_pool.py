@@ -0,0 +1,310 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class _PooledConnection:
+    """Book-keeping for a single connection owned by the pool."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """A small thread-safe pool of psycopg2 connections.
+
+    Connections are created lazily up to ``max_size`` by calling ``connect``.
+    Checkouts block (up to ``timeout`` seconds) when the pool is exhausted.
+    Idle connections older than ``max_idle`` seconds, or connections older than
+    ``max_lifetime`` seconds, are closed and replaced on checkout. Connections
+    that have been idle longer than ``ping_after`` seconds are health checked
+    with ``SELECT 1`` before being handed out.
+
+    Args:
+        connect (callable): Zero-argument factory returning a new DB-API connection.
+        min_size (int): Number of connections kept open even when idle.
+        max_size (int): Upper bound on open connections.
+        timeout (float): Seconds to wait for a free connection before PoolTimeout.
+        max_idle (float): Seconds an idle connection may sit in the pool.
+        max_lifetime (float): Seconds after which a connection is recycled.
+        ping_after (float): Idle seconds after which a checkout runs a health check.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0,
+                 max_idle=300.0, max_lifetime=3600.0, ping_after=30.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # LIFO: most recently used connections are reused first
+        self._in_use = {}     # id(conn) -> _PooledConnection
+        self._size = 0        # open connections plus connections being opened
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+            "connect_failures": 0,
+            "keepalive_pings": 0,
+        }
+
+    # --- Checkout / return --- #
+
+    def getconn(self):
+        """Checks out a healthy connection, blocking while the pool is exhausted."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                while True:
+                    entry = self._pop_reusable_locked()
+                    if entry is not None:
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    entry = _PooledConnection(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._stats["connect_failures"] += 1
+                        self._cond.notify()
+                    raise
+                if entry.conn is None:
+                    with self._cond:
+                        self._size -= 1
+                        self._stats["connect_failures"] += 1
+                        self._cond.notify()
+                    raise ConnectionError("Connection factory returned no connection")
+                with self._cond:
+                    self._stats["connections_created"] += 1
+            elif not self._is_healthy(entry):
+                self._discard(entry, stat="health_check_failures")
+                continue
+
+            entry.last_used = time.monotonic()
+            wait_time = entry.last_used - started
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                self._stats["wait_time_total"] += wait_time
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return entry.conn
+
+    def putconn(self, conn, discard=False):
+        """Returns a connection to the pool, rolling back any open transaction."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            return
+
+        if not discard and not self._is_closed(conn):
+            discard = not self._reset(conn)
+
+        if discard or self._is_closed(conn) or self._closed:
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection.
+
+        The transaction is committed when the block exits cleanly and rolled
+        back if it raises; the connection is returned to the pool either way.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard or self._is_closed(conn))
+
+    # --- Maintenance --- #
+
+    def closeall(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.conn)
+
+    def ping_idle(self, older_than):
+        """Health checks idle connections unused for ``older_than`` seconds.
+
+        Keeps server-side sessions from expiring while the pool is quiet;
+        connections that fail the check are discarded. Returns the number pinged.
+        """
+        now = time.monotonic()
+        with self._cond:
+            due = [entry for entry in self._idle if now - entry.last_used >= older_than]
+            for entry in due:
+                self._idle.remove(entry)  # Not handed out while being pinged
+
+        for entry in due:
+            try:
+                self._ping(entry.conn)
+            except Exception:
+                self._discard(entry, stat="health_check_failures")
+                continue
+            entry.last_used = time.monotonic()
+            with self._cond:
+                self._stats["keepalive_pings"] += 1
+                if not self._closed:
+                    self._idle.append(entry)
+                    self._cond.notify()
+                    continue
+                self._size -= 1
+            self._close_quietly(entry.conn)
+        return len(due)
+
+    def stats(self):
+        """Returns a snapshot of pool utilization and wait-time statistics."""
+        with self._cond:
+            in_use = len(self._in_use)
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "utilization": in_use / self.max_size,
+            })
+        checkouts = snapshot["checkouts"]
+        snapshot["wait_time_avg"] = snapshot["wait_time_total"] / checkouts if checkouts else 0.0
+        return snapshot
+
+    # --- Internals --- #
+
+    def _pop_reusable_locked(self):
+        """Pops the freshest usable idle connection, recycling stale ones.
+
+        Must be called with the condition lock held.
+        """
+        now = time.monotonic()
+        while self._idle:
+            entry = self._idle.pop()
+            expired = (now - entry.created_at) > self.max_lifetime
+            # Keep min_size connections around even if they have been idle a while
+            stale = (now - entry.last_used) > self.max_idle and self._size > self.min_size
+            if self._is_closed(entry.conn) or expired or stale:
+                self._size -= 1
+                self._stats["connections_recycled"] += 1
+                self._close_quietly(entry.conn)
+                continue
+            return entry
+        return None
+
+    def _is_healthy(self, entry):
+        if self._is_closed(entry.conn):
+            return False
+        if time.monotonic() - entry.last_used < self.ping_after:
+            return True
+        try:
+            self._ping(entry.conn)
+            return True
+        except Exception:
+            return False
+
+    # Driver-specific hooks (psycopg2 here; overridden for other DB-API drivers)
+
+    @staticmethod
+    def _is_closed(conn):
+        return conn.closed
+
+    @staticmethod
+    def _reset(conn):
+        """Prepares a returned connection for reuse; False means it must be discarded."""
+        try:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _ping(conn):
+        """Raises if the connection is unusable."""
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        conn.rollback()
+
+    def _discard(self, entry, stat="connections_recycled"):
+        self._close_quietly(entry.conn)
+        with self._cond:
+            self._size -= 1
+            self._stats[stat] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
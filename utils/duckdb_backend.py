@@ -0,0 +1,361 @@
+"""Local DuckDB backend for utils.databricks_connect (SQL_BACKEND=duckdb).
+
+Runs the statements this app generates for Databricks SQL on a DuckDB
+database. Materialization can then be tested and benchmarked offline, e.g. on
+Parquet files, and small single-node deployments can run without a warehouse:
+
+    SQL_BACKEND=duckdb DUCKDB_PARQUET_TABLES=bench.data.orders=/data/orders/*.parquet \\
+        python -m benchmarks.random_split --source bench.data.orders --target-schema bench.scratch
+
+    DUCKDB_PATH            ":memory:" (default), or a directory holding one <catalog>.duckdb file per catalog
+    DUCKDB_PARQUET_TABLES  catalog.schema.table=<path or glob>,... registered as views over read_parquet
+
+Three-part names map to DuckDB databases (attached on first use) and
+schemas; catalogs whose name DuckDB reserves ("main", "temp", "system") get a
+"_catalog" suffix. Statements are rewritten to DuckDB's dialect:
+
+    `identifier`                        "identifier"
+    'it\\'s'                             'it''s'
+    * EXCEPT (...)                      * EXCLUDE (...)
+    xxhash64(seed, ..., *)              hash(seed, ..., *COLUMNS(*))
+    rand(), pmod(a, b)                  random(), a pmod macro
+    approx_percentile(a, p)             approx_quantile(a, p)
+    a RLIKE 'regex'                     regexp_matches(a, 'regex')
+    FROM s INSERT INTO a ... INSERT INTO b ...   one INSERT per table, in a transaction
+    INSERT INTO t REPLACE WHERE p SELECT ...     DELETE FROM t WHERE p, then the INSERT, in a transaction
+    CREATE TABLE t SHALLOW CLONE s      CREATE TABLE t AS SELECT * FROM s (a copy)
+    VERSION AS OF n                     dropped: there is no time travel, current data is read
+    c.information_schema.tables         information_schema.tables rows of database c
+    DESCRIBE HISTORY t                  the version and row count of the last write this backend made
+    SHOW TBLPROPERTIES t                no rows (Delta's defaults apply)
+
+EXPLAIN COST, DESCRIBE DETAIL and Databricks-only aggregates such as
+histogram_numeric are not emulated and fail as they would on an unsupported
+engine, so the cost preview reports unknown costs (set
+MATERIALIZE_CONFIRM_BYTES=0 locally). Hash splits use DuckDB's hash, so a
+seed selects a different, equally deterministic, split than on Databricks.
+"""
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+
+from utils.databricks_connect import SqlBackend
+
+logger = logging.getLogger(__name__)
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", ":memory:")
+DUCKDB_PARQUET_TABLES = os.getenv("DUCKDB_PARQUET_TABLES", "")
+RESERVED_DATABASE_NAMES = {"main", "temp", "system"}
+
+PMOD_MACRO = "CREATE MACRO IF NOT EXISTS pmod(a, b) AS ((a % b) + b) % b"
+
+IDENT = r'(?:[A-Za-z_]\w*|"(?:[^"]|"")+")'
+THREE_PART_NAME = re.compile(rf'(?<![\w."])({IDENT})\.({IDENT})\.({IDENT})(?![\w"])')
+LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'", re.S)
+BACKTICKED = re.compile(r"`((?:[^`]|``)*)`")
+
+DESCRIBE_HISTORY = re.compile(r"^DESCRIBE HISTORY (\S+)(?: LIMIT \d+)?$", re.I)
+SHOW_TBLPROPERTIES = re.compile(r"^SHOW TBLPROPERTIES \S+$", re.I)
+SHALLOW_CLONE = re.compile(r"^CREATE (OR REPLACE )?TABLE (\S+) SHALLOW CLONE (\S+)(?: VERSION AS OF \d+)?$", re.S)
+MULTI_INSERT = re.compile(r"^FROM (?P<source>.+?) (?P<inserts>INSERT INTO .*)$", re.S)
+INSERT_SELECT = re.compile(r"^INSERT INTO (?P<table>\S+) SELECT (?P<columns>.+?)(?: (?P<where>WHERE .*))?$", re.S)
+REPLACE_WHERE = re.compile(r"^INSERT INTO (?P<table>\S+) REPLACE WHERE (?P<predicate>.+?) (?P<query>SELECT .*)$", re.S)
+WRITE_TARGET = re.compile(r"^(?:CREATE (?:OR REPLACE )?TABLE (\S+) AS |INSERT INTO (\S+) )", re.S)
+DROP_TARGET = re.compile(r"^DROP (?:TABLE|VIEW) (?:IF EXISTS )?(\S+)$")
+
+# A statement becomes one or more DuckDB steps; steps with a target are writes
+Step = namedtuple("Step", ["sql", "target"])
+
+
+def unquote(name):
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def table_key(name):
+    """Normalizes a Databricks table name (quoted or not) for the write history."""
+    return name.replace("`", "").replace('"', "").lower()
+
+
+def database_name(catalog):
+    """The DuckDB database a Databricks catalog is attached as."""
+    catalog = unquote(catalog)
+    return f"{catalog}_catalog" if catalog.lower() in RESERVED_DATABASE_NAMES else catalog
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def split_statement(sql):
+    """Splits a Databricks statement into Steps that DuckDB can run one by one."""
+    sql = sql.strip().rstrip(";")
+    match = SHALLOW_CLONE.match(sql)
+    if match:
+        replace, table, source = match.groups()
+        return [Step(f"CREATE {replace or ''}TABLE {table} AS SELECT * FROM {source}", table)]
+    match = MULTI_INSERT.match(sql)
+    if match:
+        steps = []
+        for insert in re.split(r" (?=INSERT INTO )", match.group("inserts")):
+            parts = INSERT_SELECT.match(insert)
+            if not parts:
+                raise ValueError(f"Unsupported multi-insert clause: {insert}")
+            where = f" {parts.group('where')}" if parts.group("where") else ""
+            steps.append(Step(
+                f"INSERT INTO {parts.group('table')} SELECT {parts.group('columns')} FROM {match.group('source')}{where}",
+                parts.group("table")
+            ))
+        return steps
+    match = REPLACE_WHERE.match(sql)
+    if match:
+        table = match.group("table")
+        return [
+            Step(f"DELETE FROM {table} WHERE {match.group('predicate')}", None),
+            Step(f"INSERT INTO {table} {match.group('query')}", table),
+        ]
+    target = WRITE_TARGET.match(sql)
+    return [Step(sql, (target.group(1) or target.group(2)) if target else None)]
+
+
+def translate(sql):
+    """Rewrites one Databricks SQL statement (no multi-table forms) to DuckDB.
+
+    Returns (duckdb sql, {(database, schema)} the statement names).
+    """
+    schemas = set()
+
+    def three_part(match):
+        catalog, schema, name = match.groups()
+        database = database_name(catalog)
+        if unquote(schema).lower() == "information_schema":
+            # DuckDB has one information_schema for all attached databases
+            return (f"(SELECT * FROM information_schema.{name} "
+                    f"WHERE table_catalog = '{database.replace(chr(39), chr(39) * 2)}') AS {name}")
+        schemas.add((database, unquote(schema)))
+        return f"{quote(database)}.{schema}.{name}"
+
+    def code(text):
+        text = BACKTICKED.sub(lambda m: quote(m.group(1).replace("``", "`")), text)
+        text = re.sub(r"(\*\s*)EXCEPT(\s*\()", r"\1EXCLUDE\2", text)
+        text = re.sub(r"\bxxhash64\(((?:\s*-?\d+\s*,)+)\s*\*\s*\)", r"hash(\1 *COLUMNS(*))", text)
+        text = re.sub(r"\bxxhash64\(", "hash(", text)
+        text = re.sub(r"\brand\(\)", "random()", text)
+        text = re.sub(r"\bapprox_percentile\(", "approx_quantile(", text)
+        text = re.sub(r"\s+VERSION AS OF \d+", "", text)
+        return THREE_PART_NAME.sub(three_part, text)
+
+    def literal(text):
+        value = re.sub(r"\\(.)", r"\1", text)  # Databricks escapes with backslashes
+        return "'" + value.replace("'", "''") + "'"
+
+    pieces, position = [], 0
+    for match in LITERAL.finditer(sql):
+        pieces.append(code(sql[position:match.start()]))
+        pieces.append(literal(match.group(1)))
+        position = match.end()
+    pieces.append(code(sql[position:]))
+    duck_sql = "".join(pieces)
+    duck_sql = re.sub(r"""([\w."]+)\s+RLIKE\s+('(?:[^']|'')*')""", r"regexp_matches(\1, \2)", duck_sql)
+    return duck_sql, schemas
+
+
+class Row(tuple):
+    """A result row like databricks.sql's: indexable, with asDict() and attribute access."""
+
+    def __new__(cls, values, fields):
+        row = super().__new__(cls, values)
+        row._fields = fields
+        return row
+
+    def asDict(self):
+        return dict(zip(self._fields, self))
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._fields:
+            raise AttributeError(name)
+        return self[self._fields.index(name)]
+
+
+class DuckDBCursor:
+    """A DuckDB connection (one per cursor, sharing the backend's database) with the databricks.sql cursor API."""
+
+    def __init__(self, backend, cursor):
+        self._backend = backend
+        self._cursor = cursor
+        self._rows = None  # Emulated results (DESCRIBE HISTORY, SHOW TBLPROPERTIES)
+        self._reader = None
+        self._pending = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, operation):
+        self._rows, self._reader, self._pending = None, None, None
+        history = DESCRIBE_HISTORY.match(operation.strip())
+        if history:
+            self._rows = self._backend.history(history.group(1))
+            self.description = [(name,) for name in ("version", "operationMetrics")]
+            return self
+        if SHOW_TBLPROPERTIES.match(operation.strip()):
+            self._rows = []  # No table properties: there is no VACUUM to bound time travel
+            self.description = [(name,) for name in ("key", "value")]
+            return self
+
+        steps = [(step, *translate(step.sql)) for step in split_statement(operation)]
+        for _, _, schemas in steps:
+            for database, schema in schemas:
+                self._backend.ensure_schema(database, schema)
+        atomic = len(steps) > 1
+        writes = []
+        if atomic:
+            self._cursor.execute("BEGIN TRANSACTION")
+        try:
+            for step, duck_sql, _ in steps:
+                self._cursor.execute(duck_sql)
+                if step.target:
+                    result = self._cursor.fetchone()
+                    writes.append((step.target, result[0] if result else None))
+            if atomic:
+                self._cursor.execute("COMMIT")
+        except Exception:
+            if atomic:
+                self._cursor.execute("ROLLBACK")
+            raise
+        for target, rows in writes:
+            self._backend.record_write(target, rows, created=not operation.lstrip().upper().startswith(("INSERT", "FROM")))
+        drop = DROP_TARGET.match(operation.strip())
+        if drop:
+            self._backend.forget(drop.group(1))
+        self.description = self._cursor.description
+        return self
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        fields = tuple(column[0] for column in self._cursor.description or ())
+        return [Row(values, fields) for values in self._cursor.fetchall()]
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    def fetchmany_arrow(self, size):
+        import pyarrow as pa
+
+        if self._reader is None:
+            # to_arrow_reader replaced fetch_record_batch in newer DuckDB releases
+            reader = getattr(self._cursor, "to_arrow_reader", None) or self._cursor.fetch_record_batch
+            self._reader = reader(size)
+        batches, num_rows = [], 0
+        while num_rows < size:
+            if self._pending is None:
+                try:
+                    self._pending = self._reader.read_next_batch()
+                except StopIteration:
+                    break
+            batch = self._pending.slice(0, size - num_rows)
+            rest = self._pending.slice(batch.num_rows)
+            self._pending = rest if rest.num_rows else None
+            batches.append(batch)
+            num_rows += batch.num_rows
+        return pa.Table.from_batches(batches, schema=self._reader.schema)
+
+    def fetchall_arrow(self):
+        return self._cursor.fetch_arrow_table()
+
+    def cancel(self):
+        self._cursor.interrupt()
+
+    def close(self):
+        self._cursor.close()
+
+
+class DuckDBConnection:
+    """A pooled "session": hands out cursors on the backend's shared database."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.open = True
+
+    def cursor(self):
+        return DuckDBCursor(self._backend, self._backend.new_cursor())
+
+    def close(self):
+        self.open = False
+
+
+class DuckDBBackend(SqlBackend):
+    """One DuckDB instance per process; catalogs are attached databases."""
+
+    name = "duckdb"
+
+    def __init__(self, path=DUCKDB_PATH, parquet_tables=DUCKDB_PARQUET_TABLES):
+        import duckdb
+
+        self.path = path
+        self._database = duckdb.connect(":memory:")
+        self._database.execute(PMOD_MACRO)
+        self._lock = threading.Lock()
+        self._schemas = set()
+        self._versions = {}  # table key -> (version, rows written by the last write)
+        for entry in filter(None, (entry.strip() for entry in parquet_tables.split(","))):
+            table, _, location = entry.partition("=")
+            self.register_parquet(table.strip(), location.strip())
+
+    def pool_key(self):
+        return f"duckdb:{self.path}"
+
+    def connect(self):
+        return DuckDBConnection(self)
+
+    def new_cursor(self):
+        return self._database.cursor()
+
+    def ensure_schema(self, database, schema):
+        """Attaches a catalog's database and creates the schema, once."""
+        if (database, schema) in self._schemas:
+            return
+        with self._lock:
+            attached = {row[0] for row in self._database.execute("SELECT database_name FROM duckdb_databases()").fetchall()}
+            if database not in attached:
+                location = ":memory:" if self.path == ":memory:" else os.path.join(self.path, f"{database}.duckdb")
+                self._database.execute(f"ATTACH '{location}' AS {quote(database)}")
+                logger.info(f"Attached DuckDB database {database} ({location})")
+            if schema.lower() != "information_schema":
+                self._database.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(database)}.{quote(schema)}")
+            self._schemas.add((database, schema))
+
+    def register_parquet(self, table, location):
+        """Exposes Parquet files (a path or glob) as the view ``table``."""
+        with self.connect().cursor() as cursor:
+            cursor.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM read_parquet('{location}')")
+        logger.info(f"Registered {location} as {table}")
+
+    def record_write(self, table, rows, created):
+        key = table_key(table)
+        with self._lock:
+            version = self._versions[key][0] + 1 if key in self._versions else (0 if created else 1)
+            self._versions[key] = (version, rows)
+
+    def forget(self, table):
+        with self._lock:
+            self._versions.pop(table_key(table), None)
+
+    def history(self, table):
+        """DESCRIBE HISTORY ... LIMIT 1 rows for a table this backend wrote, else none."""
+        with self._lock:
+            entry = self._versions.get(table_key(table))
+        if entry is None:
+            return []
+        version, rows = entry
+        metrics = {"numOutputRows": str(rows)} if rows is not None else {}
+        return [Row((version, metrics), ("version", "operationMetrics"))]
@@ -0,0 +1,92 @@
+"""Point-in-time feature lookups for feature_lookup datasets.
+
+A feature_lookup dataset is defined by an EOL spine and a list of feature
+tables:
+
+    eol_definition             spine table, then its key columns
+                               e.g. ["main.ml.churn_labels", "customer_id"]
+    feature_lookup_definition  feature tables, each "table@timestamp_column" for
+                               time-varying features or just "table" for static ones
+                               e.g. ["main.fs.customer_daily@snapshot_date", "main.fs.customer_profile"]
+    timestamp_col              the spine's observation time
+
+For every spine row, a time-varying feature table contributes its latest row
+with the same keys and ``timestamp_column <= observation time``, so no
+feature from after the observation leaks into training. Static feature
+tables are joined on the keys alone and must have one row per key. Feature
+columns (all but keys and timestamp) are added to the spine columns and must
+not clash across tables.
+
+The whole lookup is a single query (one CTE per feature table), which
+utils.materialize uses as the source of the usual train/eval split, so the
+joins run in the warehouse as part of the same statements.
+"""
+from collections import namedtuple
+
+from utils.split_engine import quote_identifier
+
+FeatureTable = namedtuple("FeatureTable", ["table", "timestamp_col"])  # timestamp_col is None for static tables
+
+
+def parse_spine(eol_definition):
+    """Returns (spine table, [key columns]) from an eol_definition list. Raises ValueError."""
+    entries = [entry.strip() for entry in eol_definition or [] if entry and entry.strip()]
+    if len(entries) < 2:
+        raise ValueError("EOL definition needs the spine table followed by at least one key column.")
+    return entries[0], entries[1:]
+
+
+def parse_feature_tables(feature_lookup_definition):
+    """Returns [FeatureTable] from a feature_lookup_definition list. Raises ValueError."""
+    tables = []
+    for entry in feature_lookup_definition or []:
+        entry = (entry or "").strip()
+        if not entry:
+            continue
+        table, _, timestamp_col = entry.partition("@")
+        if not table.strip():
+            raise ValueError(f"Invalid feature table entry '{entry}'.")
+        tables.append(FeatureTable(table.strip(), timestamp_col.strip() or None))
+    if not tables:
+        raise ValueError("Feature lookup definition needs at least one feature table.")
+    return tables
+
+
+def point_in_time_query(spine_table, keys, timestamp_col, feature_tables):
+    """Builds the query joining the spine to every feature table as of each observation."""
+    if any(feature.timestamp_col for feature in feature_tables) and not timestamp_col:
+        raise ValueError("Time-varying feature tables need the spine's timestamp column.")
+    key_cols = [quote_identifier(key) for key in keys]
+    spine_ts = quote_identifier(timestamp_col) if timestamp_col else None
+
+    ctes = [f"spine AS (SELECT * FROM {spine_table})"]
+    selects = ["spine.*"]
+    joins = []
+    for index, feature in enumerate(feature_tables):
+        alias = f"f{index}"
+        key_match = " AND ".join(f"spine.{key} = {alias}.{key}" for key in key_cols)
+        if feature.timestamp_col:
+            feature_ts = quote_identifier(feature.timestamp_col)
+            s_keys = ", ".join(f"s.{key}" for key in key_cols)
+            ctes.append(
+                f"{alias} AS ("
+                f"SELECT {s_keys}, s.{spine_ts} AS __as_of, f.* EXCEPT ({', '.join(key_cols)}, {feature_ts}) "
+                f"FROM (SELECT DISTINCT {', '.join(key_cols)}, {spine_ts} FROM spine) s "
+                f"JOIN {feature.table} f ON "
+                + " AND ".join(f"s.{key} = f.{key}" for key in key_cols)
+                + f" AND f.{feature_ts} <= s.{spine_ts} "
+                f"QUALIFY row_number() OVER (PARTITION BY {s_keys}, s.{spine_ts} ORDER BY f.{feature_ts} DESC) = 1)"
+            )
+            selects.append(f"{alias}.* EXCEPT ({', '.join(key_cols)}, __as_of)")
+            joins.append(f"LEFT JOIN {alias} ON {key_match} AND spine.{spine_ts} = {alias}.__as_of")
+        else:
+            ctes.append(f"{alias} AS (SELECT * FROM {feature.table})")
+            selects.append(f"{alias}.* EXCEPT ({', '.join(key_cols)})")
+            joins.append(f"LEFT JOIN {alias} ON {key_match}")
+
+    return f"WITH {', '.join(ctes)} SELECT {', '.join(selects)} FROM spine {' '.join(joins)}"
+
+
+def feature_set_source(spine_table, keys, timestamp_col, feature_tables):
+    """The point-in-time query as a subquery usable wherever a source table is expected."""
+    return f"({point_in_time_query(spine_table, keys, timestamp_col, feature_tables)}) AS feature_set"
@@ -0,0 +1,766 @@
+"""Background materialization of dataset train/eval tables.
+
+The Datasets tab submits a job and returns at once. The job runs on a small
+thread pool (independent statements of a job run concurrently, see
+split_engine.run_stages), and its state is kept in the materialization_jobs
+table (queued, running, succeeded, failed, with per-statement status and
+timings) so that the tab can poll it:
+
+    job_id = submit_materialization(spec)
+    job = get_materialization_job(job_id)   # utils.db
+
+A dataset has at most one queued or running job. A plan whose cost preview
+needs confirmation waits as a 'pending' job (hold_materialization) until
+submit_pending_materialization queues it, so its spec never leaves the server.
+Unfinished jobs hold a lease: their process keeps updated_at fresh, and jobs
+whose lease expired (their process died, or its container was replaced) are
+failed by any running server.
+
+``spec`` is a plain dict (see build_materialization_spec) and is stored with
+the job, so a job row records exactly what was materialized.
+
+Datasets with source_type 'dynamic_table' and a timestamp column are
+materialized incrementally into stable ``<name>_training`` / ``<name>_eval``
+tables. The first run loads every row up to the current high-water mark
+(``max(timestamp_col)``, pinned when the job starts); later runs copy only the
+rows above the stored mark, with the same split predicates, using
+``INSERT ... REPLACE WHERE`` so that re-running a failed job cannot duplicate
+rows. Changing any split setting forces a full reload. The new mark is saved
+with a compare-and-set against the mark the run started from, so a run that
+lost a race never records rows it didn't load.
+
+Before running anything a job fingerprints the dataset definition together
+with the Delta versions of its source tables. If the fingerprint equals the
+one stored on the dataset row (datasets.materialization_fingerprint), the
+existing tables are reused and no statement is run.
+
+For the 'table' evaluation type, both tables are taken as-is from their
+sources, so they can be snapshotted instead of copied
+(``table_snapshot_mode``): "copy" (CREATE TABLE AS SELECT), "shallow_clone"
+(SHALLOW CLONE ... VERSION AS OF) or "view" (a view reading the source
+VERSION AS OF). The versions are pinned when the job starts, so the snapshot
+is created in metadata time. Both still read the source's data files, so
+they stay readable only while the source keeps that version: once the source
+changes, VACUUM may delete its files after delta.deletedFileRetentionDuration
+(7 days by default), and the log entries go after delta.logRetentionDuration.
+A job records the shorter window of its sources (retention_hours); copy
+datasets that must stay reproducible longer.
+
+feature_lookup datasets use the point-in-time join of utils.feature_lookup
+as their source (and, for the 'table' evaluation type, the same join over the
+eval spine), split with the multi-insert plan so the join runs once.
+
+With ``cv_folds`` set, the training table gets a ``__fold`` column assigning
+each row to one of that many cross-validation folds (``fold_strategy``: see
+split_engine.fold_expression), so notebooks select a fold with a plain filter.
+Folds are seeded by the dataset ID and computed while the table is written,
+so every run of the same definition yields the same folds. Only hash folds
+are per-row and can be appended incrementally.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.databricks_connect import databricks_connection, fetch_sql
+from utils.db import (
+    create_materialization_job, get_active_materialization_job, update_materialization_job,
+    renew_materialization_job_leases, fail_expired_materialization_jobs, update_dataset, create_pending_materialization_job,
+    queue_pending_materialization_job, delete_pending_materialization_job, get_materialization_job,
+    get_dataset_watermark, save_dataset_watermark, delete_dataset_watermark,
+    get_dataset_materialization, set_dataset_fingerprint, set_dataset_class_ratios
+)
+from utils.feature_lookup import feature_set_source, parse_feature_tables, parse_spine
+from utils.split_engine import (
+    DEFAULT_SPLIT_STRATEGY, FOLD_COLUMN, FOLD_HASH_COLUMN, MaterializationError, drop_tables, fold_expression, get_class_ratios, get_table_row_count,
+    get_table_version, get_time_travel_retention_hours, random_split_stages, predicate_split_stages, run_stages,
+    split_condition, stratified_split_stages, time_fold_cut_points_query
+)
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZE_MAX_WORKERS = int(os.getenv("MATERIALIZE_MAX_WORKERS", "2"))
+# An unfinished job not updated for this long is failed: the process running it is gone
+MATERIALIZE_LEASE_SECONDS = float(os.getenv("MATERIALIZE_LEASE_SECONDS", "300"))
+# Incremental materialization of dynamic_table datasets; "false" re-copies the source every time
+MATERIALIZE_INCREMENTAL = os.getenv("MATERIALIZE_INCREMENTAL", "true").lower() == "true"
+# How 'table' evaluation datasets are materialized by default (see module docstring)
+TABLE_SNAPSHOT_MODES = ("copy", "shallow_clone", "view")
+DEFAULT_TABLE_SNAPSHOT_MODE = os.getenv("TABLE_SNAPSHOT_MODE", "copy")
+
+# Job statuses; the last two are final
+PENDING, QUEUED, RUNNING, SUCCEEDED, FAILED = "pending", "queued", "running", "succeeded", "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+_executor = ThreadPoolExecutor(max_workers=MATERIALIZE_MAX_WORKERS, thread_name_prefix="materialize")
+# Jobs this process has queued or is running, whose leases the keeper thread renews
+_leased_jobs = set()
+_leases_lock = threading.Lock()
+_lease_keeper = None
+
+
+def worker_id():
+    """Identifies this process in materialization_jobs.worker."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# --- Plans --- #
+
+def qualify_table_name(table, catalog, schema):
+    """Qualifies a one- or two-part table name with the project's catalog and schema."""
+    parts = table.split('.')
+    if len(parts) == 1:
+        return f"{catalog}.{schema}.{parts[0]}"
+    if len(parts) == 2:
+        return f"{catalog}.{parts[0]}.{parts[1]}"
+    return table  # Assume already fully qualified
+
+
+def build_materialization_spec(dataset, project, source_table, source_type, eval_type, percentage,
+                               source_table_eval, split_time_column, timestamp_col, target,
+                               table_snapshot_mode=DEFAULT_TABLE_SNAPSHOT_MODE, cv_folds=None, fold_strategy="hash"):
+    """Collects everything a materialization job needs from the dataset form.
+
+    Generates timestamped training/eval table names in the project's catalog and
+    schema. Raises ValueError if the form is missing something the split needs.
+    """
+    catalog, schema, name = project.get('catalog'), project.get('schema'), dataset.get('text')
+    if source_type == "feature_lookup":
+        source_table = parse_spine(dataset.get('eol_definition'))[0]  # The spine is the source
+    if not all([catalog, schema, source_table, name]):
+        raise ValueError("Catalog, schema, source table and dataset name are required.")
+
+    timestamp_suffix = int(time.time())
+    # Sanitize dataset name for use in table names
+    target_base = f"{catalog}.{schema}.{name.replace(' ', '_')}"
+    spec = {
+        "dataset_id": dataset.get('id'),
+        "name": name,
+        "source_type": source_type,
+        "eol_definition": dataset.get('eol_definition'),
+        "feature_lookup_definition": dataset.get('feature_lookup_definition'),
+        "source_table": source_table,
+        "qualified_source_table": qualify_table_name(source_table, catalog, schema),
+        "evaluation_type": eval_type,
+        "percentage": percentage,
+        "source_table_eval": source_table_eval,
+        "split_time_column": split_time_column,
+        "timestamp_col": timestamp_col,
+        "target": target,
+        "table_snapshot_mode": table_snapshot_mode or "copy",
+        "cv_folds": int(cv_folds) if cv_folds else None,
+        "fold_strategy": fold_strategy or "hash",
+        "training_table_name": f"{target_base}_training_{timestamp_suffix}",
+        "eval_table_name": f"{target_base}_eval_{timestamp_suffix}",
+    }
+    if source_type == "feature_lookup":
+        spec.update(feature_lookup_spec(spec, catalog, schema))
+    if spec["cv_folds"] and eval_type == "table" and spec["table_snapshot_mode"] != "copy":
+        raise ValueError("Cross-validation folds need the copy snapshot mode; a clone or view can't add the fold column.")
+    # Stratification ranks rows within each class of the whole table, as do stratified
+    # folds, and time-series folds are cut at quantiles of it, so they are never incremental
+    table_wide_folds = spec["cv_folds"] and spec["fold_strategy"] != "hash"
+    if (MATERIALIZE_INCREMENTAL and source_type == "dynamic_table" and timestamp_col
+            and eval_type != "stratified" and not table_wide_folds):
+        spec.update(incremental_spec(spec, target_base))
+    build_stages(spec)  # Validate the split settings up front
+    return spec
+
+
+def feature_lookup_spec(spec, catalog, schema):
+    """Spec fields of a feature_lookup dataset: its point-in-time join as the source.
+
+    Raises ValueError if the EOL or feature lookup definition is invalid.
+    """
+    spine, keys = parse_spine(spec["eol_definition"])
+    features = [
+        feature._replace(table=qualify_table_name(feature.table, catalog, schema))
+        for feature in parse_feature_tables(spec["feature_lookup_definition"])
+    ]
+    spine = qualify_table_name(spine, catalog, schema)
+    fields = {
+        "qualified_source_table": feature_set_source(spine, keys, spec["timestamp_col"], features),
+        "source_tables": [spine] + [feature.table for feature in features],
+        "split_strategy": "multi_insert",  # Evaluate the joins once for both outputs
+        "table_snapshot_mode": "copy",  # A join result can't be cloned or pinned
+    }
+    if spec["evaluation_type"] == "table" and spec["source_table_eval"]:
+        # The eval table is the same lookup over a separate eval spine
+        eval_spine = qualify_table_name(spec["source_table_eval"], catalog, schema)
+        fields["eval_source"] = feature_set_source(eval_spine, keys, spec["timestamp_col"], features)
+        fields["source_tables"].append(eval_spine)
+    return fields
+
+
+def split_predicates(spec):
+    """Returns the (training, eval) WHERE predicates of a spec's split; None selects every row.
+
+    For the 'table' evaluation type the eval side comes from source_table_eval.
+    Raises ValueError if the split settings are incomplete.
+    """
+    eval_type = spec["evaluation_type"]
+    if eval_type == "random":
+        percentage = spec["percentage"]
+        if percentage is None or not (0 < percentage < 1):
+            raise ValueError("Random split needs a percentage between 0 and 1.")
+        # Hash split straight from the source (seeded by dataset ID, so it is repeatable)
+        eval_side = split_condition(percentage, seed=spec["dataset_id"])
+        return f"NOT ({eval_side})", eval_side
+    if eval_type == "table":
+        if not spec["source_table_eval"]:
+            raise ValueError("Table split needs a source eval table.")
+        return None, None
+    if eval_type == "timestamp":
+        timestamp_col, split_time = spec["timestamp_col"], spec["split_time_column"]
+        if not timestamp_col or not split_time:
+            raise ValueError("Timestamp split needs a timestamp column and a split time.")
+        return f"{timestamp_col} < '{split_time}'", f"{timestamp_col} >= '{split_time}'"
+    raise ValueError(f"Unknown evaluation type: {eval_type}")
+
+
+def _where(*predicates):
+    predicates = [p for p in predicates if p]
+    return f" WHERE {' AND '.join(predicates)}" if predicates else ""
+
+
+def fold_select(spec, row_hash=None):
+    """Returns the training table's ``__fold`` select item, or None without cv_folds."""
+    if not spec.get("cv_folds"):
+        return None
+    strategy = spec.get("fold_strategy", "hash")
+    return fold_expression(
+        spec["cv_folds"], strategy, seed=spec["dataset_id"], target_column=spec["target"],
+        time_column=spec["timestamp_col"], row_hash=row_hash,
+        cut_points=fold_cut_points(spec) if strategy == "time_series" and spec["timestamp_col"] else None
+    )
+
+
+def fold_cut_points_query(spec):
+    """The query reading a spec's time-series fold cut points from the rows its training table gets."""
+    # A stratified split's training side is rank-based; the whole source stands in for it
+    training_side = split_predicates(spec)[0] if spec["evaluation_type"] != "stratified" else None
+    return time_fold_cut_points_query(
+        spec["qualified_source_table"], spec["timestamp_col"], spec["cv_folds"], training_side
+    )
+
+
+def fold_cut_points(spec):
+    """Time-series fold cut points as SQL values.
+
+    The values in ``spec["fold_cut_points"]`` once the job has read them
+    (pin_fold_cut_points); before that the plan shows scalar subqueries.
+    """
+    if spec.get("fold_cut_points") is not None:
+        return [sql_string(value) for value in spec["fold_cut_points"]]
+    query = fold_cut_points_query(spec)
+    return [f"(SELECT cut_{index} FROM ({query}) AS cut_points)" for index in range(1, spec["cv_folds"])]
+
+
+def pin_fold_cut_points(connection, spec):
+    """Reads and fixes the time-series fold cut points for this run and returns its stages."""
+    rows = fetch_sql(connection, fold_cut_points_query(spec))
+    if not rows or any(value is None for value in rows[0]):
+        raise MaterializationError(f"Could not read time-series fold cut points from {spec['qualified_source_table']}")
+    spec["fold_cut_points"] = [str(value) for value in rows[0]]
+    return build_stages(spec)
+
+
+def build_stages(spec):
+    """Returns the plan that materializes a spec: stages of independent (label, sql) statements.
+
+    Every table a plan writes has a step labelled ``<action>_training`` or
+    ``<action>_eval`` (see written_tables); an incremental plan leaves out the
+    steps of a side with nothing new.
+    """
+    source = spec["qualified_source_table"]
+    training_table, eval_table = spec["training_table_name"], spec["eval_table_name"]
+    if spec["evaluation_type"] == "stratified":
+        percentage, target = spec["percentage"], spec["target"]
+        if percentage is None or not (0 < percentage < 1):
+            raise ValueError("Stratified split needs a percentage between 0 and 1.")
+        if not target:
+            raise ValueError("Stratified split needs a target variable.")
+        return stratified_split_stages(
+            source, training_table, eval_table, percentage, target, seed=spec["dataset_id"],
+            fold=fold_select(spec, row_hash=FOLD_HASH_COLUMN)
+        )
+    training_side, eval_side = split_predicates(spec)
+    fold = fold_select(spec)
+
+    if spec.get("incremental"):
+        return incremental_stages(spec, training_side, eval_side)
+    if spec["evaluation_type"] == "table" and spec.get("table_snapshot_mode", "copy") != "copy":
+        return snapshot_stages(spec)
+    strategy = spec.get("split_strategy", DEFAULT_SPLIT_STRATEGY)
+    if spec["evaluation_type"] == "random":
+        return random_split_stages(
+            source, training_table, eval_table, spec["percentage"], seed=spec["dataset_id"], strategy=strategy, fold=fold
+        )
+    if spec["evaluation_type"] == "timestamp":
+        return predicate_split_stages(source, training_table, eval_table, training_side, eval_side, strategy, fold)
+    eval_source = spec.get("eval_source") or spec["source_table_eval"]
+    training_columns = f"*, {fold}" if fold else "*"
+    return [[
+        ("create_training",
+         f"CREATE TABLE {training_table} AS SELECT {training_columns} FROM {source}{_where(training_side)}"),
+        ("create_eval", f"CREATE TABLE {eval_table} AS SELECT * FROM {eval_source}{_where(eval_side)}"),
+    ]]
+
+
+def snapshot_stages(spec):
+    """Snapshots the training and eval source tables as shallow clones or pinned views.
+
+    Uses the versions in ``spec["pinned_versions"]`` once the job has set them;
+    before that (the plan shown at submit time) the current version is implied.
+    """
+    mode = spec["table_snapshot_mode"]
+    if mode not in TABLE_SNAPSHOT_MODES:
+        raise ValueError(f"Unknown table snapshot mode '{mode}', expected one of {TABLE_SNAPSHOT_MODES}")
+    versions = spec.get("pinned_versions") or {}
+
+    def snapshot(label, target, source):
+        version = versions.get(source)
+        as_of = f" VERSION AS OF {int(version)}" if version is not None else ""
+        if mode == "shallow_clone":
+            return label, f"CREATE TABLE {target} SHALLOW CLONE {source}{as_of}"
+        return label, f"CREATE VIEW {target} AS SELECT * FROM {source}{as_of}"
+
+    return [[
+        snapshot("snapshot_training", spec["training_table_name"], spec["qualified_source_table"]),
+        snapshot("snapshot_eval", spec["eval_table_name"], spec["source_table_eval"]),
+    ]]
+
+
+def pin_snapshot_versions(spec, versions):
+    """Fixes the source versions a snapshot reads and returns its stages."""
+    if spec["table_snapshot_mode"] == "view" and any(version is None for version in versions.values()):
+        # An unpinned view would silently follow later changes to the source
+        raise MaterializationError("Pinned views need Delta sources with a version history")
+    spec["pinned_versions"] = versions
+    return build_stages(spec)
+
+
+def written_tables(spec, stages):
+    """The output tables a plan writes, from its step labels ('<action>_training', '<action>_eval')."""
+    sides = {label.rpartition("_")[2] for stage in stages for label, _ in stage}
+    return {table for side, table in (("training", spec["training_table_name"]), ("eval", spec["eval_table_name"]))
+            if side in sides}
+
+
+def plan_steps(stages):
+    """The per-statement progress entries stored with a job."""
+    return [
+        {"label": label, "sql": statement, "stage": index, "status": "pending", "seconds": None}
+        for index, stage in enumerate(stages)
+        for label, statement in stage
+    ]
+
+# --- Incremental (dynamic tables) --- #
+
+def sql_string(value):
+    """Quotes a value as a Databricks SQL string literal."""
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def incremental_settings(spec):
+    """The settings a stored high-water mark is valid for."""
+    settings = {key: spec[key] for key in (
+        "qualified_source_table", "evaluation_type", "percentage",
+        "source_table_eval", "split_time_column", "timestamp_col"
+    )}
+    if spec.get("cv_folds"):
+        # Only added when set, so marks stored without folds stay resumable
+        settings["folds"] = [spec["cv_folds"], spec["fold_strategy"]]
+    return settings
+
+
+def incremental_spec(spec, target_base):
+    """Spec fields for an incremental run: stable table names and the stored mark to resume from.
+
+    The mark is only resumed if it was recorded for the same tables and split
+    settings; otherwise ``watermark_from`` is None and the run is a full load.
+    """
+    tables = {"training_table_name": f"{target_base}_training", "eval_table_name": f"{target_base}_eval"}
+    return {
+        "incremental": True,
+        **tables,
+        "watermark_from": stored_watermark({**spec, **tables}),
+        "watermark_to": None,  # Pinned by the job when it starts
+    }
+
+
+def stored_watermark(spec):
+    """The stored mark an incremental ``spec`` resumes from, or None for a full load."""
+    watermark = get_dataset_watermark(spec["dataset_id"])
+    resumable = (
+        watermark is not None
+        and watermark["settings"] == incremental_settings(spec)
+        and (watermark["training_table_name"], watermark["eval_table_name"])
+        == (spec["training_table_name"], spec["eval_table_name"])
+    )
+    return watermark["high_water_mark"] if resumable else None
+
+
+def incremental_stages(spec, training_side, eval_side):
+    """Copies the rows between the two watermarks into the stable tables.
+
+    Without ``watermark_from`` the tables are (re)created; otherwise rows above
+    it are written with REPLACE WHERE, which is idempotent. Before the job pins
+    ``watermark_to`` the upper bound is shown as a subquery.
+    """
+    source, timestamp_col = spec["qualified_source_table"], spec["timestamp_col"]
+    low, high = spec.get("watermark_from"), spec.get("watermark_to")
+    upper = sql_string(high) if high is not None else f"(SELECT max({timestamp_col}) FROM {source})"
+    new_rows = [f"{timestamp_col} <= {upper}"]
+    if low is not None:
+        new_rows.append(f"{timestamp_col} > {sql_string(low)}")
+
+    fold = fold_select(spec)
+
+    def write(label, table, side, columns="*"):
+        select = f"SELECT {columns} FROM {source}{_where(*new_rows, side)}"
+        if low is None:
+            return label, f"CREATE OR REPLACE TABLE {table} AS {select}"
+        return label, f"INSERT INTO {table} REPLACE WHERE {timestamp_col} > {sql_string(low)} {select}"
+
+    training_columns = f"*, {fold}" if fold else "*"
+    if low is None:
+        training = write("load_training", spec["training_table_name"], training_side, training_columns)
+    elif spec["evaluation_type"] == "timestamp" and _not_after(spec["split_time_column"], low):
+        training = None  # Every new row is past the split time, so the training side is complete
+    else:
+        training = write("append_training", spec["training_table_name"], training_side, training_columns)
+    if spec["evaluation_type"] == "table":
+        # A separate eval table has no watermark of its own; it is re-copied
+        evaluation = ("load_eval", f"CREATE OR REPLACE TABLE {spec['eval_table_name']} AS SELECT * FROM {spec['source_table_eval']}")
+    else:
+        evaluation = write("append_eval" if low is not None else "load_eval", spec["eval_table_name"], eval_side)
+    return [[statement for statement in (training, evaluation) if statement]]
+
+
+def _not_after(split_time, watermark):
+    """True if split_time <= watermark, when both parse as ISO timestamps."""
+    try:
+        return datetime.fromisoformat(str(split_time)) <= datetime.fromisoformat(str(watermark))
+    except ValueError:
+        return False
+
+
+def fetch_high_water_mark(connection, source_table, timestamp_col):
+    """Returns max(timestamp_col) of the source as a string (None for an empty table)."""
+    rows = fetch_sql(connection, f"SELECT CAST(max({timestamp_col}) AS STRING) AS high_water_mark FROM {source_table}")
+    if rows is None:
+        raise MaterializationError(f"Could not read the high-water mark of {source_table}")
+    return rows[0][0] if rows else None
+
+
+def pin_watermark(connection, spec):
+    """Fixes ``watermark_to`` for this run and returns its stages ([] if nothing is new)."""
+    low = spec["watermark_from"]
+    if low is None:
+        # The stable tables are about to be rewritten; never resume from a mark that no longer matches them
+        delete_dataset_watermark(spec["dataset_id"])
+    high = fetch_high_water_mark(connection, spec["qualified_source_table"], spec["timestamp_col"])
+    if high is None and low is None:
+        raise MaterializationError(f"{spec['qualified_source_table']} has no rows with a {spec['timestamp_col']} value")
+    spec["watermark_to"] = high
+    if high is None or high == low:
+        return []  # No new rows since the last run
+    return build_stages(spec)
+
+# --- Fingerprint Cache --- #
+
+# Spec fields that decide the contents of the materialized tables
+FINGERPRINT_FIELDS = (
+    "source_type", "qualified_source_table", "evaluation_type", "percentage",
+    "source_table_eval", "split_time_column", "timestamp_col", "target", "table_snapshot_mode",
+    "eol_definition", "feature_lookup_definition", "cv_folds", "fold_strategy"
+)
+
+
+def source_tables(spec):
+    """The tables a spec reads."""
+    tables = list(spec.get("source_tables") or [spec["qualified_source_table"]])
+    if spec["evaluation_type"] == "table" and "source_tables" not in spec:
+        tables.append(spec["source_table_eval"])
+    return tables
+
+
+def source_versions(connection, spec):
+    """Returns {table: Delta version} for every table a spec reads."""
+    tables = source_tables(spec)
+    return {table: get_table_version(connection, table) for table in tables}
+
+
+def materialization_fingerprint(spec, versions):
+    """Hashes a spec's definition and its source versions; None if a version is unknown."""
+    if any(version is None for version in versions.values()):
+        return None  # Can't tell whether the source changed
+    payload = {"definition": {key: spec.get(key) for key in FINGERPRINT_FIELDS}, "versions": versions}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def reusable_tables(spec, fingerprint):
+    """Returns the dataset's current (training, eval) tables if they match ``fingerprint``, else None."""
+    current = get_dataset_materialization(spec["dataset_id"])
+    if (fingerprint is None or not current or not current["materialized"]
+            or current["materialization_fingerprint"] != fingerprint):
+        return None
+    return current["training_table_name"], current["eval_table_name"]
+
+# --- Jobs --- #
+
+def submit_materialization(spec):
+    """Records a queued job for ``spec`` and runs it in the background. Returns the job ID, or None.
+
+    A dataset runs one job at a time: if it already has a queued or running
+    job, that job's ID is returned and nothing new is queued.
+    """
+    stages = build_stages(spec)
+    steps = plan_steps(stages)
+    job_id = create_materialization_job(spec["dataset_id"], spec, steps, worker_id())
+    if job_id is None:
+        active = get_active_materialization_job(spec["dataset_id"])
+        if active is not None:
+            logger.info(f"Dataset {spec['dataset_id']} is already being materialized by job {active}")
+        return active
+    _start_job(job_id, spec, stages, steps)
+    return job_id
+
+
+def hold_materialization(spec):
+    """Records ``spec`` as a pending job awaiting the user's confirmation. Returns its ID, or None.
+
+    The spec stays on the server; the page only keeps the job ID.
+    """
+    return create_pending_materialization_job(spec["dataset_id"], spec, plan_steps(build_stages(spec)), worker_id())
+
+
+def submit_pending_materialization(job_id):
+    """Runs a confirmed pending job in the background. Returns the ID of the job to follow, or None.
+
+    If the dataset already has an unfinished job, that job's ID is returned
+    and the pending one stays pending. An incremental job resumes from the
+    mark stored now, not the one read when it was held, as another run may
+    have moved it on in between.
+    """
+    spec = queue_pending_materialization_job(job_id, worker_id())
+    if spec is None:
+        job = get_materialization_job(job_id)
+        if job is None:
+            return None  # Discarded
+        if job["status"] == PENDING:
+            return get_active_materialization_job(job["dataset_id"])
+        return job_id  # Already confirmed
+    if spec.get("incremental"):
+        spec["watermark_from"] = stored_watermark(spec)
+    stages = build_stages(spec)
+    steps = plan_steps(stages)
+    update_materialization_job(job_id, spec=spec, statements=steps)
+    _start_job(job_id, spec, stages, steps)
+    return job_id
+
+
+def discard_pending_materialization(job_id):
+    """Drops a pending job the user cancelled. Returns True on success."""
+    return delete_pending_materialization_job(job_id)
+
+
+def _start_job(job_id, spec, stages, steps):
+    start_lease_keeper()
+    with _leases_lock:
+        _leased_jobs.add(job_id)
+    _executor.submit(_run_job, job_id, spec, stages, steps)
+
+
+def _run_job(job_id, spec, stages, steps):
+    started = time.perf_counter()
+    try:
+        if not update_materialization_job(job_id, status=RUNNING):
+            logger.warning(f"Materialization job {job_id} was not started: it is no longer queued")
+            return
+        with databricks_connection() as conn:
+            _materialize(job_id, conn, spec, stages, steps, started)
+    finally:
+        with _leases_lock:
+            _leased_jobs.discard(job_id)
+
+
+def _materialize(job_id, conn, spec, stages, steps, started):
+    incremental = spec.get("incremental", False)
+    snapshot_mode = spec.get("table_snapshot_mode", "copy") if spec["evaluation_type"] == "table" else "copy"
+    views = snapshot_mode == "view"
+    tables = (spec["training_table_name"], spec["eval_table_name"])
+    try:
+        if conn is None:
+            raise MaterializationError("Could not connect to Databricks")
+
+        versions = source_versions(conn, spec)
+        fingerprint = materialization_fingerprint(spec, versions)
+        reused = reusable_tables(spec, fingerprint)
+        if reused is not None:
+            for step in steps:
+                step["status"] = "skipped"
+            result = {
+                "reused": True,
+                "training_table_name": reused[0],
+                "eval_table_name": reused[1],
+                "elapsed_seconds": time.perf_counter() - started,
+            }
+            if update_materialization_job(job_id, status=SUCCEEDED, statements=steps, result=result):
+                logger.info(f"Materialization job {job_id} reused unchanged tables {reused}")
+            else:
+                logger.warning(f"Materialization job {job_id} finished elsewhere (its lease expired); reuse not recorded")
+            return
+
+        if incremental:
+            set_dataset_fingerprint(spec["dataset_id"], None)  # The stable tables are about to change
+            stages = pin_watermark(conn, spec)
+            steps = plan_steps(stages)
+            update_materialization_job(job_id, statements=steps)
+        elif snapshot_mode != "copy":
+            stages = pin_snapshot_versions(spec, versions)
+            steps = plan_steps(stages)
+            update_materialization_job(job_id, statements=steps)
+        elif spec.get("cv_folds") and spec.get("fold_strategy") == "time_series":
+            stages = pin_fold_cut_points(conn, spec)
+            steps = plan_steps(stages)
+            update_materialization_job(job_id, statements=steps)
+
+        steps_by_label = {step["label"]: step for step in steps}
+        steps_lock = threading.Lock()
+
+        def on_progress(label, status, seconds):
+            # Called from the concurrent statement threads
+            with steps_lock:
+                steps_by_label[label]["status"] = status
+                if seconds is not None:
+                    steps_by_label[label]["seconds"] = seconds
+                update_materialization_job(job_id, statements=steps)
+
+        # Incremental writes are idempotent, so a failed run keeps the stable tables for the retry
+        cleanup = () if incremental or views else tables  # Views are dropped below, with DROP VIEW
+        run_stages(conn, stages, cleanup_tables=cleanup, on_progress=on_progress)
+
+        written = written_tables(spec, stages)
+
+        def rows_written(table):
+            if views:
+                return None  # A view has no history to read a row count from
+            return get_table_row_count(conn, table) if table in written else 0
+
+        # For incremental runs these are the rows written by this run
+        result = {
+            "training_table_name": tables[0],
+            "eval_table_name": tables[1],
+            "training_rows": rows_written(tables[0]),
+            "eval_rows": rows_written(tables[1]),
+            "elapsed_seconds": time.perf_counter() - started,
+        }
+        if snapshot_mode != "copy":
+            retention = [get_time_travel_retention_hours(conn, table) for table in versions]
+            retention_hours = None if None in retention else min(retention)
+            result.update({"snapshot_mode": snapshot_mode, "source_versions": versions, "retention_hours": retention_hours})
+            logger.warning(
+                f"Materialization job {job_id} snapshots {list(versions)}: readable for "
+                f"{'an unknown time' if retention_hours is None else f'at least {retention_hours:g}h'} "
+                "after the sources change, until VACUUM removes the pinned files"
+            )
+        if spec.get("cv_folds"):
+            result["folds"] = {"count": spec["cv_folds"], "strategy": spec["fold_strategy"], "column": FOLD_COLUMN}
+            if spec.get("fold_cut_points"):
+                result["folds"]["cut_points"] = spec["fold_cut_points"]
+        if spec["evaluation_type"] == "stratified":
+            result["class_ratios"] = get_class_ratios(conn, tables[0], tables[1], spec["target"])
+        if incremental:
+            result.update({
+                "incremental": True,
+                "watermark_from": spec["watermark_from"],
+                "watermark": spec["watermark_to"] or spec["watermark_from"],
+            })
+        # The lease sweep fails a job whose lease expired, and another job of the
+        # dataset may have started since; only a job still unfinished publishes its tables
+        if not update_materialization_job(job_id, statements=steps):
+            raise MaterializationError("The job was failed while it ran (its lease expired); its tables were not used")
+        updated = update_dataset(
+            spec["dataset_id"],
+            name=spec["name"],
+            source_type=spec["source_type"],
+            eol_definition=spec["eol_definition"],
+            feature_lookup_definition=spec["feature_lookup_definition"],
+            source_table=spec["source_table"],
+            evaluation_type=spec["evaluation_type"],
+            percentage=spec["percentage"],
+            source_table_eval=spec["source_table_eval"],
+            split_time_column=spec["split_time_column"],
+            timestamp_col=spec["timestamp_col"],
+            materialized=True,
+            training_table_name=spec["training_table_name"],
+            eval_table_name=spec["eval_table_name"],
+            target=spec["target"]
+        )
+        if updated is None:
+            raise MaterializationError("Tables were created but the dataset record could not be updated")
+        # A full load deleted the mark when it started; an append moves it on from watermark_from
+        if incremental and stages and not save_dataset_watermark(
+            spec["dataset_id"], spec["timestamp_col"], spec["watermark_to"], incremental_settings(spec), *tables,
+            previous_high_water_mark=spec["watermark_from"]
+        ):
+            raise MaterializationError(
+                "Tables were written but the high-water mark could not be saved "
+                "(it changed while this job ran, or the database is unreachable); the next run reloads from the stored mark"
+            )
+        set_dataset_fingerprint(spec["dataset_id"], fingerprint)
+        if "class_ratios" in result:
+            set_dataset_class_ratios(spec["dataset_id"], result["class_ratios"])
+        if update_materialization_job(job_id, status=SUCCEEDED, statements=steps, result=result):
+            logger.info(f"Materialization job {job_id} succeeded: {result}")
+        else:
+            logger.warning(f"Materialization job {job_id} wrote {result} but had been failed meanwhile (its lease expired)")
+    except Exception as e:
+        logger.error(f"Materialization job {job_id} failed: {e}")
+        if conn is not None and not incremental:
+            drop_tables(conn, tables, kind="VIEW" if views else "TABLE")
+        update_materialization_job(job_id, status=FAILED, statements=steps, error=str(e))
+
+
+# --- Job Leases --- #
+
+def start_lease_keeper():
+    """Starts this process's lease keeper thread, once; it first fails jobs whose lease expired.
+
+    Every MATERIALIZE_LEASE_SECONDS / 5 the keeper refreshes updated_at of the
+    jobs this process has queued or is running, then fails unfinished jobs of
+    any process whose lease expired (a stopped or replaced container, a crash).
+    """
+    global _lease_keeper
+    with _leases_lock:
+        if _lease_keeper is not None:
+            return
+        _lease_keeper = threading.Thread(target=_keep_leases, name="materialize-leases", daemon=True)
+    _lease_keeper.start()
+
+
+def _keep_leases():
+    while True:
+        with _leases_lock:
+            job_ids = list(_leased_jobs)
+        if job_ids:
+            renew_materialization_job_leases(job_ids)
+        fail_interrupted_jobs()
+        time.sleep(MATERIALIZE_LEASE_SECONDS / 5)
+
+
+def fail_interrupted_jobs():
+    """Marks queued/running jobs whose lease expired as failed. Returns their IDs."""
+    failed = fail_expired_materialization_jobs(
+        MATERIALIZE_LEASE_SECONDS,
+        f"Interrupted: the process running the job stopped updating it for {MATERIALIZE_LEASE_SECONDS:g}s"
+    )
+    for job_id in failed:
+        logger.warning(f"Materialization job {job_id} lost its lease and was marked failed")
+    return failed
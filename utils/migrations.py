@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import os
+import re
+
+from utils.db import get_db_connection
+
+# Ordered SQL migrations live in sql/migrations as <version>_<name>.sql
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Arbitrary constant key so concurrent app instances don't migrate at the same time
+MIGRATION_LOCK_KEY = 727274
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Lists the migration files in a directory, ordered by version.
+
+    Args:
+        directory (str): Folder containing <version>_<name>.sql files.
+
+    Returns:
+        list[dict]: One {'version', 'name', 'path', 'checksum'} dict per migration.
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "path": path,
+            "checksum": checksum,
+        })
+    migrations.sort(key=lambda m: m["version"])
+
+    versions = [m["version"] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}: {versions}")
+    return migrations
+
+
+def ensure_migrations_table(conn):
+    """Creates the schema_migrations bookkeeping table if it doesn't exist."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                checksum VARCHAR(64) NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+    conn.commit()
+
+
+def get_applied_migrations(conn):
+    """Returns {version: checksum} for every migration already applied."""
+    ensure_migrations_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, checksum FROM schema_migrations ORDER BY version;")
+        applied = {version: checksum for version, checksum in cur.fetchall()}
+    conn.commit()
+    return applied
+
+
+def get_current_version(conn):
+    """Returns the highest applied migration version, or 0 for a fresh database."""
+    applied = get_applied_migrations(conn)
+    return max(applied) if applied else 0
+
+
+def apply_migrations(conn, target=None, directory=MIGRATIONS_DIR):
+    """Applies pending migrations in version order, one transaction per migration.
+
+    Already-applied versions are skipped, so running this repeatedly is a no-op.
+    A session-level advisory lock serialises concurrent runners.
+
+    Args:
+        conn: An open psycopg2 connection.
+        target (int, optional): Stop after this version. Defaults to the latest.
+        directory (str): Folder containing the migration files.
+
+    Returns:
+        list[int]: The versions applied by this call.
+    """
+    migrations = discover_migrations(directory)
+    newly_applied = []
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    try:
+        applied = get_applied_migrations(conn)
+        for migration in migrations:
+            version = migration["version"]
+            if target is not None and version > target:
+                break
+            if version in applied:
+                if applied[version] != migration["checksum"]:
+                    print(f"Warning: migration {version}_{migration['name']} has changed since it was applied.")
+                continue
+
+            print(f"Applying migration {version}_{migration['name']}")
+            with open(migration["path"], "r") as f:
+                migration_sql = f.read()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(migration_sql)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s);",
+                        (version, migration["name"], migration["checksum"])
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            newly_applied.append(version)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+
+    return newly_applied
+
+
+def migrate(target=None):
+    """Opens a dedicated connection and brings the database up to date.
+
+    Returns:
+        list[int] | None: The versions applied, or None if the migration failed.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        print("Failed to establish database connection for migrations")
+        return None
+    try:
+        applied = apply_migrations(conn, target=target)
+        print(f"Database schema at version {get_current_version(conn)} ({len(applied)} migration(s) applied)")
+        return applied
+    except Exception as e:
+        print(f"Error applying migrations: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply metadata database migrations.")
+    parser.add_argument("--target", type=int, default=None, help="Migrate up to this version (default: latest).")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations without applying.")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = get_db_connection()
+        if conn is None:
+            raise SystemExit("Failed to establish database connection")
+        try:
+            applied = get_applied_migrations(conn)
+        finally:
+            conn.close()
+        for migration in discover_migrations():
+            state = "applied" if migration["version"] in applied else "pending"
+            print(f"{migration['version']:04d}_{migration['name']}: {state}")
+    else:
+        if migrate(target=args.target) is None:
+            raise SystemExit(1)
@@ -0,0 +1,158 @@
+"""Sampled table profiles for the Datasets tab.
+
+A profile is computed by a single aggregate query over a TABLESAMPLE of the
+table: the sampled row count, plus null rate, min, max and mean per column,
+plus a histogram of the target column. Numeric targets use histogram_numeric
+and other targets use approx_top_k.
+
+Profiles are cached in Postgres (table_profiles), keyed by table name and
+Delta version, so profiling an unchanged table again costs one
+DESCRIBE HISTORY:
+
+    profile, cached = profile_table("main.sales.orders", target="churned")
+"""
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from utils.databricks_connect import databricks_connection, fetch_arrow, fetch_sql
+from utils.db import get_cached_table_profile, save_table_profile
+from utils.split_engine import get_table_version, quote_identifier
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "10"))  # 100 profiles the whole table
+PROFILE_MAX_COLUMNS = int(os.getenv("PROFILE_MAX_COLUMNS", "200"))
+PROFILE_HISTOGRAM_BINS = int(os.getenv("PROFILE_HISTOGRAM_BINS", "20"))
+
+NUMERIC_TYPES = re.compile(r"^(tinyint|smallint|int|integer|bigint|long|float|double|real|decimal|numeric)\b")
+# Types min/max are reported for (as strings); complex types only get a null rate
+ORDERED_TYPES = re.compile(r"^(date|timestamp|timestamp_ntz|string|varchar|char|boolean)\b")
+
+
+class ProfileError(Exception):
+    """Raised when a table can't be described or profiled."""
+
+
+def describe_columns(connection, table):
+    """Returns [(column, data_type)] of a table, from DESCRIBE TABLE."""
+    rows = fetch_sql(connection, f"DESCRIBE TABLE {table}")
+    if rows is None:
+        raise ProfileError(f"Could not describe {table}")
+    columns = []
+    for row in rows:
+        name, data_type = row[0], (row[1] or "").lower()
+        if not name or name.startswith("#"):
+            break  # Partition and metadata sections follow the columns
+        columns.append((name, data_type))
+    return columns
+
+
+def profile_query(table, columns, target=None, sample_percent=PROFILE_SAMPLE_PERCENT, bins=PROFILE_HISTOGRAM_BINS):
+    """Builds the aggregate profiling query; columns are aliased c<index>_<stat>."""
+    selects = ["count(*) AS row_count"]
+    for index, (name, data_type) in enumerate(columns):
+        col = quote_identifier(name)
+        selects.append(f"count_if({col} IS NULL) AS c{index}_nulls")
+        if NUMERIC_TYPES.match(data_type) or ORDERED_TYPES.match(data_type):
+            selects.append(f"CAST(min({col}) AS STRING) AS c{index}_min")
+            selects.append(f"CAST(max({col}) AS STRING) AS c{index}_max")
+        if NUMERIC_TYPES.match(data_type):
+            selects.append(f"avg(CAST({col} AS DOUBLE)) AS c{index}_mean")
+
+    types = dict(columns)
+    if target and target in types:
+        col = quote_identifier(target)
+        if NUMERIC_TYPES.match(types[target]):
+            selects.append(f"histogram_numeric(CAST({col} AS DOUBLE), {int(bins)}) AS target_histogram")
+        else:
+            selects.append(f"approx_top_k(CAST({col} AS STRING), {int(bins)}) AS target_histogram")
+
+    sample = f" TABLESAMPLE ({sample_percent:g} PERCENT)" if sample_percent < 100 else ""
+    return f"SELECT {', '.join(selects)} FROM {table}{sample}"
+
+
+def parse_profile(row, columns, target, types, sample_percent):
+    """Turns the single result row of profile_query into a profile dict."""
+    sampled_rows = row["row_count"] or 0
+    profile = {
+        "sample_percent": sample_percent,
+        "sampled_rows": sampled_rows,
+        "estimated_rows": round(sampled_rows * 100 / sample_percent) if sample_percent else sampled_rows,
+        "columns": [
+            {
+                "name": name,
+                "type": data_type,
+                "null_rate": (row[f"c{index}_nulls"] / sampled_rows) if sampled_rows else None,
+                "min": row.get(f"c{index}_min"),
+                "max": row.get(f"c{index}_max"),
+                "mean": row.get(f"c{index}_mean"),
+            }
+            for index, (name, data_type) in enumerate(columns)
+        ],
+        "target": None,
+    }
+    histogram = row.get("target_histogram")
+    if target and target in types:
+        numeric = bool(NUMERIC_TYPES.match(types[target]))
+        buckets = [
+            {"value": bucket["x"], "count": bucket["y"]} if numeric
+            else {"value": bucket["item"], "count": bucket["count"]}
+            for bucket in histogram or []
+        ]
+        profile["target"] = {
+            "column": target,
+            "kind": "numeric" if numeric else "categorical",
+            "histogram": sorted(buckets, key=lambda b: b["value"]) if numeric else buckets,
+        }
+    return profile
+
+
+def compute_profile(connection, table, target=None, sample_percent=PROFILE_SAMPLE_PERCENT):
+    """Profiles a table with one sampled aggregate query. Raises ProfileError."""
+    columns = describe_columns(connection, table)
+    if not columns:
+        raise ProfileError(f"{table} has no columns")
+    truncated = len(columns) > PROFILE_MAX_COLUMNS
+    columns = columns[:PROFILE_MAX_COLUMNS]
+    types = dict(columns)
+
+    started = time.perf_counter()
+    result = fetch_arrow(connection, profile_query(table, columns, target, sample_percent), max_rows=1)
+    if result is None or result.table.num_rows == 0:
+        raise ProfileError(f"Profiling query on {table} failed")
+    profile = parse_profile(result.table.to_pylist()[0], columns, target, types, sample_percent)
+    profile.update({
+        "table": table,
+        "columns_truncated": truncated,
+        "target_missing": bool(target) and target not in types,
+        "seconds": time.perf_counter() - started,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return profile
+
+
+def profile_table(table, target=None, sample_percent=PROFILE_SAMPLE_PERCENT, refresh=False):
+    """Returns (profile, cached) for a table, computing and caching it if needed.
+
+    The cache key includes the table's Delta version, so a profile is reused
+    until the table changes. Tables without a version (views, non-Delta
+    tables) are profiled every time. Raises ProfileError.
+    """
+    with databricks_connection() as conn:
+        if conn is None:
+            raise ProfileError("Could not connect to Databricks")
+        version = get_table_version(conn, table)
+        if version is not None and not refresh:
+            cached = get_cached_table_profile(table, version, target, sample_percent)
+            if cached is not None:
+                return cached, True
+
+        profile = compute_profile(conn, table, target, sample_percent)
+        profile["version"] = version
+        if version is not None:
+            save_table_profile(table, version, target, sample_percent, profile)
+        logger.info(f"Profiled {table}@{version} in {profile['seconds']:.1f}s")
+        return profile, False
@@ -0,0 +1,375 @@
+"""Latency instrumentation for the metadata database.
+
+Every connect, execute and fetch made through utils.db (and every execute
+and fetch of utils.db_async) is timed into a
+histogram keyed by query name and phase. The query name is that of the
+innermost function decorated with ``@named_query`` (e.g. ``get_projects``),
+falling back to a label derived from the SQL (``SELECT datasets``).
+Executes slower than DB_SLOW_QUERY_MS are logged with their parameters
+redacted and kept in a short in-memory slow-query log.
+
+``register_metrics_endpoint`` serves all of it, plus any gauges the caller
+supplies, at ``/metrics`` on the Flask server behind Dash.
+"""
+import contextvars
+import functools
+import hmac
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_SLOW_QUERY_LOG_SIZE = int(os.getenv("DB_SLOW_QUERY_LOG_SIZE", "100"))
+METRICS_ENDPOINT_ENABLED = os.getenv("METRICS_ENDPOINT_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # If set, /metrics requires "Authorization: Bearer <token>"
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_query_name = contextvars.ContextVar("query_name", default=None)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets (not thread-safe on its own)."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class QueryMetrics:
+    """Thread-safe registry of per-query histograms, error counts and slow queries."""
+
+    def __init__(self, slow_log_size=DB_SLOW_QUERY_LOG_SIZE):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (query name, phase) -> Histogram
+        self._errors = {}      # query name -> count
+        self._slow_counts = {}  # query name -> count
+        self._slow_log = deque(maxlen=slow_log_size)
+
+    def record(self, name, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get((name, phase))
+            if histogram is None:
+                histogram = self._histograms[(name, phase)] = Histogram()
+            histogram.observe(seconds)
+
+    def record_error(self, name):
+        with self._lock:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def record_slow(self, name, query, params, seconds):
+        entry = {
+            "query_name": name,
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": " ".join(str(query).split())[:2000],
+            "params": redact_params(params),
+            "at": time.time(),
+        }
+        with self._lock:
+            self._slow_counts[name] = self._slow_counts.get(name, 0) + 1
+            self._slow_log.append(entry)
+        logger.warning(
+            "Slow query %s took %.1fms: %s params=%s",
+            name, entry["duration_ms"], entry["sql"], entry["params"]
+        )
+
+    def snapshot(self, histograms=False):
+        """Returns {'queries': {name: {phase: summary}}, 'errors', 'slow_queries', 'slow_query_log'}.
+
+        With ``histograms=True`` it also holds copies of the raw histograms, read
+        at the same moment, as 'histograms': {(name, phase): (counts, count, sum)}.
+        """
+        with self._lock:
+            queries = {}
+            for (name, phase), histogram in self._histograms.items():
+                queries.setdefault(name, {})[phase] = histogram.summary()
+            snapshot = {
+                "queries": queries,
+                "errors": dict(self._errors),
+                "slow_queries": dict(self._slow_counts),
+                "slow_query_log": list(self._slow_log),
+            }
+            if histograms:
+                snapshot["histograms"] = {
+                    key: (list(h.counts), h.count, h.total) for key, h in self._histograms.items()
+                }
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+            self._slow_counts.clear()
+            self._slow_log.clear()
+
+
+metrics = QueryMetrics()
+
+# --- Query Naming --- #
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([\w.]+)", re.IGNORECASE)
+
+
+def sql_label(query):
+    """Derives a low-cardinality name like 'SELECT projects' from a SQL statement."""
+    text = query.decode() if isinstance(query, bytes) else str(query)
+    words = text.split(None, 1)
+    if not words:
+        return "unnamed"
+    table = _SQL_TABLE.search(text)
+    return f"{words[0].upper()} {table.group(1)}" if table else words[0].upper()
+
+
+def current_query_name(query=None):
+    """Returns the active @named_query name, or a label derived from ``query``."""
+    name = _query_name.get()
+    if name is not None:
+        return name
+    return sql_label(query) if query is not None else "unnamed"
+
+
+def named_query(func):
+    """Decorator attributing the queries a function (or coroutine function) runs to its name in the metrics."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _query_name.set(func.__name__)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _query_name.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _query_name.set(func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _query_name.reset(token)
+    return wrapper
+
+
+def redact_params(params):
+    """Replaces query parameter values with their type (and length) for logging."""
+    def redact(value):
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes, list, tuple, dict)):
+            return f"<{type(value).__name__} len={len(value)}>"
+        return f"<{type(value).__name__}>"
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact(value) for key, value in params.items()}
+    return [redact(value) for value in params]
+
+# --- Timed Cursors --- #
+
+class TimedCursorMixin:
+    """Times execute and fetch calls on a psycopg2 cursor into ``metrics``."""
+
+    _query_label = "unnamed"
+
+    def execute(self, query, vars=None):
+        name = self._query_label = current_query_name(query)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            metrics.record_error(name)
+            raise
+        finally:
+            _record_execute(name, query, vars, time.perf_counter() - started)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            metrics.record(self._query_label, "fetch", time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class TimedAsyncCursorMixin:
+    """Times execute and fetch calls on a psycopg 3 async cursor (utils.db_async) into ``metrics``."""
+
+    _query_label = "unnamed"
+
+    async def execute(self, query, params=None, **kwargs):
+        name = self._query_label = current_query_name(query)
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        except Exception:
+            metrics.record_error(name)
+            raise
+        finally:
+            _record_execute(name, query, params, time.perf_counter() - started)
+
+    async def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return await fetch(*args)
+        finally:
+            metrics.record(self._query_label, "fetch", time.perf_counter() - started)
+
+    async def fetchone(self):
+        return await self._timed_fetch(super().fetchone)
+
+    async def fetchmany(self, size=0):
+        return await self._timed_fetch(super().fetchmany, size)
+
+    async def fetchall(self):
+        return await self._timed_fetch(super().fetchall)
+
+
+def _record_execute(name, query, params, seconds):
+    metrics.record(name, "execute", seconds)
+    if seconds * 1000 >= DB_SLOW_QUERY_MS:
+        metrics.record_slow(name, query, params, seconds)
+
+
+class TimedCursor(TimedCursorMixin, extensions.cursor):
+    """Default cursor for metadata connections."""
+
+
+class TimedRealDictCursor(TimedCursorMixin, RealDictCursor):
+    """RealDictCursor with timing, for queries that want rows as dicts."""
+
+
+def record_connect(seconds, failed=False):
+    """Records the time taken to open a new database connection."""
+    name = current_query_name()
+    metrics.record(name, "connect", seconds)
+    if failed:
+        metrics.record_error(name)
+
+# --- /metrics Endpoint --- #
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _metric_name(value):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", value)
+
+
+def render_prometheus(snapshot, gauges=None):
+    """Renders query histograms, counters and numeric gauges in Prometheus text format.
+
+    ``snapshot`` is a ``metrics.snapshot(histograms=True)``, so the histograms
+    and the counters are read at the same moment.
+    """
+    lines = [
+        "# HELP metadata_db_query_seconds Metadata database latency by query name and phase.",
+        "# TYPE metadata_db_query_seconds histogram",
+    ]
+    for (name, phase), (counts, count, total) in sorted(snapshot["histograms"].items()):
+        labels = f'query="{_label_value(name)}",phase="{phase}"'
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'metadata_db_query_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'metadata_db_query_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"metadata_db_query_seconds_sum{{{labels}}} {total}")
+        lines.append(f"metadata_db_query_seconds_count{{{labels}}} {count}")
+
+    for metric, key in (("metadata_db_query_errors_total", "errors"), ("metadata_db_slow_queries_total", "slow_queries")):
+        lines.append(f"# TYPE {metric} counter")
+        for name, value in sorted(snapshot[key].items()):
+            lines.append(f'{metric}{{query="{_label_value(name)}"}} {value}')
+
+    for group, values in (gauges or {}).items():
+        for key, value in sorted((values or {}).items()):
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"{_metric_name(group)}_{_metric_name(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics_endpoint(server, collect_gauges=None, path="/metrics"):
+    """Adds ``path`` to a Flask server, serving Prometheus text (or JSON with ?format=json).
+
+    Args:
+        server: The Flask app, i.e. ``app.server`` for Dash.
+        collect_gauges (callable): Returns {group: {name: number}} of extra stats,
+            e.g. connection pool and cache counters.
+    """
+    if not METRICS_ENDPOINT_ENABLED:
+        return
+    from flask import Response, request
+
+    def metrics_endpoint():
+        if METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+                return Response("Forbidden\n", status=403, mimetype="text/plain")
+        snapshot = metrics.snapshot(histograms=True)
+        gauges = collect_gauges() if collect_gauges else {}
+        if request.args.get("format") == "json":
+            summaries = {key: value for key, value in snapshot.items() if key != "histograms"}
+            body = json.dumps(dict(summaries, **gauges), default=str)
+            return Response(body, mimetype="application/json")
+        return Response(render_prometheus(snapshot, gauges), mimetype="text/plain; version=0.0.4")
+
+    server.add_url_rule(path, "metrics", metrics_endpoint)
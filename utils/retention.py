@@ -0,0 +1,219 @@
+"""Garbage collection of stale materialized tables.
+
+Every materialization writes new ``<dataset>_training_<epoch>`` and
+``<dataset>_eval_<epoch>`` tables, and the legacy random split could leave a
+``<dataset>_temp_split_<epoch>`` table behind when it failed. This module
+lists those tables in every project's catalog.schema and drops the ones
+nothing refers to any more.
+
+A table is kept if it is
+
+    - a dataset's current training/eval table, or an incremental dataset's stable table,
+    - another dataset's source or eval source table,
+    - an output of a queued or running materialization job,
+    - read by a training job (its tables are fixed in the job's notebook parameters,
+      so every model trained and registered from the job depends on them),
+    - younger than RETENTION_MIN_AGE_HOURS (by the epoch in its name), or
+    - one of the RETENTION_KEEP_LAST newest training/eval generations of its dataset.
+
+Everything else is dropped, in parallel on pooled connections. If any
+reference can't be read, nothing is dropped.
+
+    python -m utils.retention           # dry run: report what would be dropped
+    python -m utils.retention --apply
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.databricks_connect import databricks_connection, execute_sql, fetch_sql
+from utils.db import get_project_schemas, get_referenced_table_names, get_training_job_ids
+from utils.materialize import sql_string
+from utils.split_engine import quote_identifier
+
+logger = logging.getLogger(__name__)
+
+RETENTION_MIN_AGE_HOURS = float(os.getenv("RETENTION_MIN_AGE_HOURS", "24"))
+RETENTION_KEEP_LAST = int(os.getenv("RETENTION_KEEP_LAST", "0"))
+RETENTION_DROP_CONCURRENCY = int(os.getenv("RETENTION_DROP_CONCURRENCY", "8"))
+
+# <dataset>_<kind>_<epoch seconds>, as named by utils.materialize and the legacy split
+STALE_TABLE_PATTERN = re.compile(r"^(?P<base>.+)_(?P<kind>training|eval|temp_split)_(?P<epoch>\d{9,})$")
+
+
+class RetentionError(Exception):
+    """Raised when the tables to keep can't be determined."""
+
+
+def referenced_tables(workspace_client=None):
+    """Returns {lowercased table name: reason} for every table that must be kept.
+
+    Raises RetentionError if the metadata database or a training job can't be read.
+    """
+    from utils.training import get_training_job_tables  # Imports the Databricks SDK
+
+    try:
+        references = {table.lower(): reason for table, reason in get_referenced_table_names().items()}
+        job_ids = get_training_job_ids()
+    except Exception as e:
+        raise RetentionError(f"Could not read table references: {e}") from e
+    for job_id in job_ids:
+        try:
+            tables = get_training_job_tables(job_id, workspace_client)
+        except Exception as e:
+            raise RetentionError(f"Could not read the tables of training job {job_id}: {e}") from e
+        for table in tables:
+            references.setdefault(table.lower(), f"training job {job_id}")
+    return references
+
+
+def list_materialized_tables(connection, catalog, schema):
+    """Lists the tables and views of a schema named like materialization outputs.
+
+    Returns:
+        list[dict]: table (fully qualified), kind ('training', 'eval' or 'temp_split'),
+        base (table name without the suffix), epoch and is_view. Raises RetentionError.
+    """
+    rows = fetch_sql(connection, (
+        f"SELECT table_name, table_type FROM {quote_identifier(catalog)}.information_schema.tables "
+        f"WHERE lower(table_schema) = {sql_string(schema.lower())} "
+        f"AND table_name RLIKE '_(training|eval|temp_split)_[0-9]{{9,}}$'"
+    ))
+    if rows is None:
+        raise RetentionError(f"Could not list the tables of {catalog}.{schema}")
+    tables = []
+    for name, table_type in rows:
+        match = STALE_TABLE_PATTERN.match(name)
+        if not match:
+            continue
+        tables.append({
+            "table": f"{catalog}.{schema}.{name}",
+            "kind": match.group("kind"),
+            "base": f"{catalog}.{schema}.{match.group('base')}",
+            "epoch": int(match.group("epoch")),
+            "is_view": (table_type or "").upper() == "VIEW",
+        })
+    return tables
+
+
+def plan_retention(tables, references, keep_last=RETENTION_KEEP_LAST,
+                   min_age_hours=RETENTION_MIN_AGE_HOURS, now=None):
+    """Decides which tables to keep; returns (keep, drop) lists of tables with a 'reason'.
+
+    Names match case-insensitively: Unity Catalog lists them in lower case.
+    """
+    now = now if now is not None else time.time()
+    references = {name.lower(): reason for name, reason in references.items()}
+    # The newest keep_last generations (epochs) of each dataset's training/eval tables
+    generations = {}
+    for table in tables:
+        if table["kind"] != "temp_split":
+            generations.setdefault(table["base"], set()).add(table["epoch"])
+    recent = {base: sorted(epochs, reverse=True)[:keep_last] for base, epochs in generations.items()}
+
+    keep, drop = [], []
+    for table in sorted(tables, key=lambda t: (t["base"], t["epoch"], t["kind"])):
+        age_hours = (now - table["epoch"]) / 3600
+        if table["table"].lower() in references:
+            keep.append({**table, "reason": f"referenced by {references[table['table'].lower()]}"})
+        elif age_hours < min_age_hours:
+            keep.append({**table, "reason": f"younger than {min_age_hours:g}h"})
+        elif table["epoch"] in recent.get(table["base"], ()):
+            keep.append({**table, "reason": f"among the {keep_last} newest generations"})
+        else:
+            drop.append({**table, "reason": f"unreferenced, {age_hours / 24:.1f} days old"})
+    return keep, drop
+
+
+def drop_stale_tables(tables, concurrency=RETENTION_DROP_CONCURRENCY):
+    """Drops tables concurrently, each on its own pooled connection.
+
+    A failed drop doesn't stop the others. Returns the tables that couldn't be dropped.
+    """
+    def drop(table):
+        name = ".".join(quote_identifier(part) for part in table["table"].split("."))
+        with databricks_connection() as conn:
+            return execute_sql(conn, f"DROP {'VIEW' if table['is_view'] else 'TABLE'} IF EXISTS {name}")
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="retention") as executor:
+        results = list(executor.map(drop, tables))
+    return [table for table, ok in zip(tables, results) if not ok]
+
+
+def collect_garbage(apply=False, keep_last=RETENTION_KEEP_LAST, min_age_hours=RETENTION_MIN_AGE_HOURS,
+                    concurrency=RETENTION_DROP_CONCURRENCY, workspace_client=None):
+    """Finds stale materialized tables in every project schema and, with apply=True, drops them.
+
+    Returns:
+        dict: applied, keep and drop (lists of tables with a reason), failed (tables
+        whose drop failed) and elapsed_seconds. Raises RetentionError.
+    """
+    started = time.perf_counter()
+    references = referenced_tables(workspace_client)
+    try:
+        schemas = get_project_schemas()
+    except Exception as e:
+        raise RetentionError(f"Could not read the project schemas: {e}") from e
+
+    tables = []
+    with databricks_connection() as conn:
+        if conn is None:
+            raise RetentionError("Could not connect to Databricks")
+        for catalog, schema in schemas:
+            tables += list_materialized_tables(conn, catalog, schema)
+
+    keep, drop = plan_retention(tables, references, keep_last, min_age_hours)
+    failed = drop_stale_tables(drop, concurrency) if apply and drop else []
+    report = {
+        "applied": apply,
+        "keep": keep,
+        "drop": drop,
+        "failed": failed,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+    logger.info(
+        f"Retention {'run' if apply else 'dry run'}: {len(tables)} materialized tables in {len(schemas)} schemas, "
+        f"{len(keep)} kept, {len(drop) - len(failed)} {'dropped' if apply else 'to drop'}, {len(failed)} failed"
+    )
+    return report
+
+
+def format_report(report):
+    """Renders a collect_garbage report as text, one table per line."""
+    verb = "dropped" if report["applied"] else "would drop"
+    failed = {table["table"] for table in report["failed"]}
+    lines = [f"keep        {t['table']}  ({t['reason']})" for t in report["keep"]]
+    lines += [
+        f"{'FAILED' if t['table'] in failed else verb:<11} {t['table']}  ({t['reason']})"
+        for t in report["drop"]
+    ]
+    lines.append(
+        f"\n{len(report['keep'])} kept, {len(report['drop']) - len(failed)} {verb}, "
+        f"{len(failed)} failed in {report['elapsed_seconds']:.1f}s"
+    )
+    if not report["applied"] and report["drop"]:
+        lines.append("Dry run: nothing was dropped. Re-run with --apply to drop these tables.")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop materialized tables no dataset, job or model refers to.")
+    parser.add_argument("--apply", action="store_true", help="Drop the tables (default: dry run, report only).")
+    parser.add_argument("--keep-last", type=int, default=RETENTION_KEEP_LAST,
+                        help="Also keep the newest N training/eval generations of each dataset.")
+    parser.add_argument("--min-age-hours", type=float, default=RETENTION_MIN_AGE_HOURS,
+                        help="Never drop tables younger than this.")
+    parser.add_argument("--concurrency", type=int, default=RETENTION_DROP_CONCURRENCY,
+                        help="Tables dropped at the same time.")
+    args = parser.parse_args()
+
+    try:
+        result = collect_garbage(args.apply, args.keep_last, args.min_age_hours, args.concurrency)
+    except RetentionError as e:
+        raise SystemExit(f"Retention aborted, nothing was dropped: {e}")
+    print(format_report(result))
+    if result["failed"]:
+        raise SystemExit(1)
@@ -0,0 +1,398 @@
+"""Random train/eval splits on Databricks SQL without a temporary copy of the source.
+
+The legacy plan wrote the whole source plus a ``rand()`` column to a temp
+table, scanned it twice and dropped it. Here each row is assigned to a side
+by a deterministic hash instead:
+
+    pmod(xxhash64(<seed>, <key columns or every column>), 1000000) < percentage * 1000000
+
+so both outputs are filtered straight from the source, with no extra write,
+and re-materializing the same data with the same seed gives the same split.
+
+Two plans are available:
+
+    "ctas"          two independent hash-filtered CREATE TABLE ... AS SELECT statements
+    "multi_insert"  empty tables followed by one ``FROM source INSERT ... INSERT ...``
+                    statement, so the source is referenced by a single query
+
+A stratified variant ranks rows by the same hash within each target class and
+sends the first ``round(class_rows * percentage)`` of every class to eval, so
+each class (even a rare one) is split in the requested proportion. It runs as
+one multi-insert over a single scan of the source.
+
+Plans can also give the training table a ``__fold`` column assigning every
+row to a cross-validation fold (fold_expression): by a second hash, round-robin
+within each target class ("stratified") or by time quantile ("time_series",
+fold 0 earliest, cut at approximate percentiles read beforehand with
+time_fold_cut_points_query so no global sort is needed), so repeated training
+runs see identical folds.
+
+Plans are lists of stages: the statements of a stage are independent and run
+concurrently on separate pooled connections; stages run in order.
+"""
+import logging
+import os
+import re
+import time
+
+from utils.databricks_connect import execute_sql, execute_sql_concurrently, fetch_sql
+
+logger = logging.getLogger(__name__)
+
+# Granularity of the split: percentages are honoured to 1e-6
+SPLIT_BUCKETS = 1000000
+SPLIT_STRATEGIES = ("ctas", "multi_insert")
+DEFAULT_SPLIT_STRATEGY = os.getenv("SPLIT_STRATEGY", "ctas")
+
+FOLD_COLUMN = "__fold"
+FOLD_STRATEGIES = ("hash", "stratified", "time_series")
+# Mixed into the fold hash so folds don't line up with the train/eval split hash
+FOLD_HASH_SALT = 1
+# The fold hash of the source columns, carried by the ranked rows of a stratified split
+FOLD_HASH_COLUMN = "__fold_hash"
+
+# Delta table properties bounding how long a superseded version stays readable, with their defaults
+TIME_TRAVEL_RETENTION_DEFAULTS = {
+    "delta.deletedFileRetentionDuration": "interval 7 days",  # VACUUM removes older unreferenced files
+    "delta.logRetentionDuration": "interval 30 days",  # Older log entries are cleaned up
+}
+INTERVAL_HOURS = {"second": 1 / 3600, "minute": 1 / 60, "hour": 1, "day": 24, "week": 24 * 7}
+INTERVAL = re.compile(r"^\s*(?:interval\s+)?(?P<amount>\d+(?:\.\d+)?)\s+(?P<unit>second|minute|hour|day|week)s?\s*$", re.I)
+
+
+class MaterializationError(Exception):
+    """Raised when a statement of a materialization plan fails."""
+
+
+def quote_identifier(name):
+    """Backtick-quotes a column name for Databricks SQL."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def split_condition(percentage, key_columns=None, seed=0):
+    """Returns the SQL predicate selecting the eval side of a hash split.
+
+    Args:
+        percentage (float): Fraction of rows that go to the eval table (0 < percentage < 1).
+        key_columns (list): Columns identifying a row. When omitted every column is hashed,
+            so identical rows always land on the same side.
+        seed (int): Mixed into the hash; a different seed gives a different split.
+    """
+    if percentage is None or not (0 < percentage < 1):
+        raise ValueError(f"percentage must be between 0 and 1, got {percentage}")
+    hashed = ", ".join(quote_identifier(col) for col in key_columns) if key_columns else "*"
+    threshold = int(round(percentage * SPLIT_BUCKETS))
+    return f"pmod(xxhash64({int(seed)}, {hashed}), {SPLIT_BUCKETS}) < {threshold}"
+
+
+def fold_row_hash(seed=0):
+    """The hash of a row's columns that hash and stratified folds are drawn from."""
+    return f"xxhash64({int(seed)}, {FOLD_HASH_SALT}, *)"
+
+
+def time_fold_cut_points_query(source_table, time_column, folds, where=None):
+    """Returns a one-row query of the folds - 1 time values cutting a table into equal-sized time slices.
+
+    approx_percentile aggregates in one distributed pass; the cut points come
+    back as strings, ready to be used as literals by fold_expression.
+    """
+    column = quote_identifier(time_column)
+    cuts = ", ".join(
+        f"CAST(approx_percentile({column}, {index / folds!r}) AS STRING) AS cut_{index}" for index in range(1, folds)
+    )
+    return f"SELECT {cuts} FROM {source_table}" + (f" WHERE {where}" if where else "")
+
+
+def fold_expression(folds, strategy="hash", seed=0, target_column=None, time_column=None,
+                    cut_points=None, row_hash=None):
+    """Returns the select item assigning each training row a fold in [0, folds) as ``__fold``.
+
+    Args:
+        cut_points (list[str]): For "time_series", the folds - 1 ascending SQL values
+            (literals or scalar subqueries) where each fold ends.
+        row_hash (str): The row hash to draw folds from; defaults to fold_row_hash(seed)
+            over every column of the statement's FROM.
+
+    Stratified folds number the rows of the statement that writes the training
+    table, so they must be computed over all of its rows at once.
+    """
+    if not isinstance(folds, int) or folds < 2:
+        raise ValueError(f"folds must be an integer of at least 2, got {folds}")
+    row_hash = row_hash or fold_row_hash(seed)
+    if strategy == "hash":
+        fold = f"pmod({row_hash}, {folds})"
+    elif strategy == "stratified":
+        if not target_column:
+            raise ValueError("Stratified folds need a target column")
+        # Deal each class's rows out to the folds in hash order
+        fold = f"pmod(row_number() OVER (PARTITION BY {quote_identifier(target_column)} ORDER BY {row_hash}) - 1, {folds})"
+    elif strategy == "time_series":
+        if not time_column:
+            raise ValueError("Time-series folds need a timestamp column")
+        if not cut_points or len(cut_points) != folds - 1:
+            raise ValueError(f"Time-series folds need {folds - 1} cut points")
+        column = quote_identifier(time_column)
+        # Rows at a cut point start the next fold; rows without a timestamp go to the first
+        cases = " ".join(f"WHEN {column} < {cut} THEN {index}" for index, cut in enumerate(cut_points))
+        fold = f"CASE WHEN {column} IS NULL THEN 0 {cases} ELSE {folds - 1} END"
+    else:
+        raise ValueError(f"Unknown fold strategy '{strategy}', expected one of {FOLD_STRATEGIES}")
+    return f"{fold} AS {FOLD_COLUMN}"
+
+
+def predicate_split_stages(source_table, training_table, eval_table, training_side, eval_side,
+                           strategy=DEFAULT_SPLIT_STRATEGY, fold=None):
+    """Builds stages writing the rows of one source that match each side's predicate.
+
+    ``source_table`` may also be an aliased subquery. A predicate of None
+    selects every row. ``fold`` (from fold_expression) is added to the
+    training table's columns.
+    """
+    def where(predicate):
+        return f" WHERE {predicate}" if predicate else ""
+
+    training_columns = f"*, {fold}" if fold else "*"
+    if strategy == "ctas":
+        return [[
+            ("create_training",
+             f"CREATE TABLE {training_table} AS SELECT {training_columns} FROM {source_table}{where(training_side)}"),
+            ("create_eval", f"CREATE TABLE {eval_table} AS SELECT * FROM {source_table}{where(eval_side)}"),
+        ]]
+    if strategy == "multi_insert":
+        return [
+            [
+                ("create_training", f"CREATE TABLE {training_table} AS SELECT {training_columns} FROM {source_table} LIMIT 0"),
+                ("create_eval", f"CREATE TABLE {eval_table} AS SELECT * FROM {source_table} LIMIT 0"),
+            ],
+            [
+                ("split_insert",
+                 f"FROM {source_table} "
+                 f"INSERT INTO {training_table} SELECT {training_columns}{where(training_side)} "
+                 f"INSERT INTO {eval_table} SELECT *{where(eval_side)}"),
+            ],
+        ]
+    raise ValueError(f"Unknown split strategy '{strategy}', expected one of {SPLIT_STRATEGIES}")
+
+
+def random_split_stages(source_table, training_table, eval_table, percentage,
+                        key_columns=None, seed=0, strategy=DEFAULT_SPLIT_STRATEGY, fold=None):
+    """Builds a hash split as a list of stages, each a list of (label, sql) tuples."""
+    eval_side = split_condition(percentage, key_columns, seed)
+    return predicate_split_stages(
+        source_table, training_table, eval_table, f"NOT ({eval_side})", eval_side, strategy, fold
+    )
+
+
+def stratified_split_stages(source_table, training_table, eval_table, percentage, target_column, seed=0, fold=None):
+    """Builds a stratified hash split as stages: empty tables, then one multi-insert.
+
+    Every class with at least two rows gets at least one row on each side; a
+    single-row class goes to training. The ranked rows carry extra columns, so
+    a hash or stratified ``fold`` must be built with row_hash=FOLD_HASH_COLUMN,
+    the fold hash of the source columns alone.
+    """
+    if percentage is None or not (0 < percentage < 1):
+        raise ValueError(f"percentage must be between 0 and 1, got {percentage}")
+    if not target_column:
+        raise ValueError("A stratified split needs a target column")
+    target = quote_identifier(target_column)
+    fold_hash = f", {fold_row_hash(seed)} AS {FOLD_HASH_COLUMN}" if fold else ""
+    ranked = (
+        f"(SELECT *, row_number() OVER (PARTITION BY {target} ORDER BY xxhash64({int(seed)}, *)) AS __split_rank, "
+        f"count(*) OVER (PARTITION BY {target}) AS __class_rows{fold_hash} FROM {source_table}) AS ranked"
+    )
+    eval_side = f"__split_rank <= least(__class_rows - 1, greatest(1, round(__class_rows * {float(percentage)})))"
+    helpers = "__split_rank, __class_rows" + (f", {FOLD_HASH_COLUMN}" if fold else "")
+    columns = f"* EXCEPT ({helpers})"
+    extra = f", {fold}" if fold else ""
+    return [
+        [
+            ("create_training", f"CREATE TABLE {training_table} AS SELECT {columns}{extra} FROM {ranked} LIMIT 0"),
+            ("create_eval", f"CREATE TABLE {eval_table} AS SELECT * FROM {source_table} LIMIT 0"),
+        ],
+        [
+            ("stratified_insert",
+             f"FROM {ranked} "
+             f"INSERT INTO {training_table} SELECT {columns}{extra} WHERE NOT ({eval_side}) "
+             f"INSERT INTO {eval_table} SELECT {columns} WHERE {eval_side}"),
+        ],
+    ]
+
+
+def get_class_ratios(connection, training_table, eval_table, target_column, max_classes=100):
+    """Counts the rows of each target class on both sides of a split.
+
+    Returns {"target", "classes": [{"class", "training_rows", "eval_rows", "eval_ratio"}]}
+    for the ``max_classes`` largest classes, or None if the counts can't be read.
+    """
+    target = quote_identifier(target_column)
+    rows = fetch_sql(connection, (
+        f"SELECT 'training' AS side, CAST({target} AS STRING) AS class, count(*) AS n FROM {training_table} GROUP BY 2 "
+        f"UNION ALL "
+        f"SELECT 'eval' AS side, CAST({target} AS STRING) AS class, count(*) AS n FROM {eval_table} GROUP BY 2"
+    ))
+    if rows is None:
+        return None
+    counts = {}
+    for side, value, n in rows:
+        counts.setdefault(value, {"training_rows": 0, "eval_rows": 0})[f"{side}_rows"] = n
+    classes = [
+        {"class": value, **sides, "eval_ratio": sides["eval_rows"] / (sides["training_rows"] + sides["eval_rows"])}
+        for value, sides in counts.items()
+    ]
+    classes.sort(key=lambda c: c["training_rows"] + c["eval_rows"], reverse=True)
+    return {"target": target_column, "classes": classes[:max_classes]}
+
+
+def random_split_statements(*args, **kwargs):
+    """The statements of random_split_stages in execution order, as one flat list."""
+    return [statement for stage in random_split_stages(*args, **kwargs) for statement in stage]
+
+
+def legacy_random_split_statements(source_table, training_table, eval_table, percentage, temp_table):
+    """The former temp-table plan, kept for benchmarks/random_split.py."""
+    return [
+        ("create_temp", f"CREATE TABLE {temp_table} AS SELECT *, rand() as __rand_split FROM {source_table}"),
+        ("create_training", f"CREATE TABLE {training_table} AS SELECT * EXCEPT (__rand_split) FROM {temp_table} WHERE __rand_split >= {percentage}"),
+        ("create_eval", f"CREATE TABLE {eval_table} AS SELECT * EXCEPT (__rand_split) FROM {temp_table} WHERE __rand_split < {percentage}"),
+        ("drop_temp", f"DROP TABLE IF EXISTS {temp_table}"),
+    ]
+
+
+def _latest_history(connection, table):
+    rows = fetch_sql(connection, f"DESCRIBE HISTORY {table} LIMIT 1")
+    return rows[0].asDict() if rows else None
+
+
+def get_table_version(connection, table):
+    """Returns the current Delta version of a table, or None if unknown (e.g. a view)."""
+    history = _latest_history(connection, table)
+    return int(history["version"]) if history and history.get("version") is not None else None
+
+
+def get_time_travel_retention_hours(connection, table):
+    """Returns how many hours a superseded version of a Delta table is guaranteed to stay readable.
+
+    That is the shorter of delta.deletedFileRetentionDuration and
+    delta.logRetentionDuration (Delta's defaults where unset). Pinned views
+    and shallow clones of the version break once it is VACUUMed past this.
+    Returns None if a property can't be read or parsed.
+    """
+    rows = fetch_sql(connection, f"SHOW TBLPROPERTIES {table}")
+    if rows is None:
+        return None
+    properties = {**TIME_TRAVEL_RETENTION_DEFAULTS, **{row[0]: row[1] for row in rows}}
+    hours = []
+    for key in TIME_TRAVEL_RETENTION_DEFAULTS:
+        match = INTERVAL.match(str(properties[key]))
+        if not match:
+            return None
+        hours.append(float(match.group("amount")) * INTERVAL_HOURS[match.group("unit").lower()])
+    return min(hours)
+
+
+def get_table_row_count(connection, table):
+    """Returns the rows written by the latest operation on a Delta table, from DESCRIBE HISTORY.
+
+    For a table that was just created by CTAS or INSERT this is its row count,
+    read from the Delta log instead of scanning the data. Returns None if unknown.
+    """
+    history = _latest_history(connection, table)
+    if not history:
+        return None
+    metrics = history.get("operationMetrics") or {}
+    value = metrics.get("numOutputRows")
+    return int(value) if value is not None else None
+
+
+def run_statements(connection, statements):
+    """Runs (label, sql) statements in order and returns {label: seconds}.
+
+    Raises MaterializationError on the first failure.
+    """
+    timings = {}
+    for label, statement in statements:
+        started = time.perf_counter()
+        if not execute_sql(connection, statement):
+            raise MaterializationError(f"Statement '{label}' failed")
+        timings[label] = time.perf_counter() - started
+    return timings
+
+
+def run_stages(connection, stages, cleanup_tables=(), on_progress=None):
+    """Runs a staged plan and returns {label: seconds}.
+
+    Single-statement stages run on ``connection``; larger stages run their
+    statements concurrently (the first on ``connection``, the others on pooled
+    connections) and fail fast. On any
+    failure ``cleanup_tables`` are dropped and MaterializationError is raised.
+
+    Args:
+        on_progress (callable): on_progress(label, status, seconds), as for
+            databricks_connect.execute_sql_concurrently.
+    """
+    timings = {}
+    failed = []
+
+    def progress(label, status, seconds=None):
+        if status == "succeeded":
+            timings[label] = seconds
+        elif status == "failed":
+            failed.append(label)
+        if on_progress:
+            on_progress(label, status, seconds)
+
+    for stage in stages:
+        if len(stage) == 1:
+            label, statement = stage[0]
+            progress(label, "running")
+            started = time.perf_counter()
+            ok = execute_sql(connection, statement)
+            progress(label, "succeeded" if ok else "failed", time.perf_counter() - started)
+            if not ok:
+                drop_tables(connection, cleanup_tables)
+        else:
+            ok = execute_sql_concurrently(
+                stage, cleanup_tables=cleanup_tables, on_progress=progress, connection=connection
+            )
+        if not ok:
+            raise MaterializationError(f"Statement '{failed[0] if failed else stage[0][0]}' failed")
+    return timings
+
+
+def drop_tables(connection, tables, kind="TABLE"):
+    """Drops the given tables (or with kind="VIEW", views) if they exist, ignoring failures."""
+    for table in tables:
+        execute_sql(connection, f"DROP {kind} IF EXISTS {table}")
+
+
+def materialize_random_split(connection, source_table, training_table, eval_table, percentage,
+                             key_columns=None, seed=0, strategy=DEFAULT_SPLIT_STRATEGY):
+    """Materializes a hash split of ``source_table`` into the training and eval tables.
+
+    Independent statements run concurrently. If any statement fails, both output
+    tables are dropped and MaterializationError is raised.
+
+    Returns:
+        dict: strategy, training_rows, eval_rows (None if DESCRIBE HISTORY had no count),
+        elapsed_seconds and statement_timings ({label: seconds}).
+    """
+    stages = random_split_stages(
+        source_table, training_table, eval_table, percentage, key_columns, seed, strategy
+    )
+    started = time.perf_counter()
+    timings = run_stages(connection, stages, cleanup_tables=(training_table, eval_table))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "strategy": strategy,
+        "training_rows": get_table_row_count(connection, training_table),
+        "eval_rows": get_table_row_count(connection, eval_table),
+        "elapsed_seconds": elapsed,
+        "statement_timings": timings,
+    }
+    logger.info(
+        f"Random split of {source_table} ({strategy}): {result['training_rows']} training / "
+        f"{result['eval_rows']} eval rows in {elapsed:.1f}s"
+    )
+    return result
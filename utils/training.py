@@ -1,5 +1,14 @@
 from databricks.sdk import WorkspaceClient
+from databricks.sdk.errors import NotFound
 from databricks.sdk.service.jobs import NotebookTask, Task, GitSource, GitProvider
+from datetime import datetime, timezone
+
+# Statuses after which a run's history row no longer changes
+TERMINAL_RUN_STATUSES = {
+    "SUCCESS", "SUCCESS_WITH_FAILURES", "FAILED", "TIMEDOUT", "CANCELED", "DISABLED", "EXCLUDED",
+    "UPSTREAM_FAILED", "UPSTREAM_CANCELED", "MAXIMUM_CONCURRENT_RUNS_REACHED",
+    "TERMINATED", "SKIPPED", "INTERNAL_ERROR"
+}
 
 def create_training_job(job_name, experiment_name, target, training_table_name, eval_table_name, git_url, git_provider, git_branch, notebook_path):
     
@@ -49,3 +58,44 @@ def run_training_job(job_id):
     print(f"Job run started with run ID: {run.run_id}")
     return run
 
+
+def get_training_run_status(run_id, workspace_client=None):
+    """Looks up a job run's state for the training history.
+
+    Returns:
+        dict: status (the result state once the run has terminated, otherwise its
+        life cycle state), finished_at (datetime or None) and duration_seconds.
+    """
+    workspace_client = workspace_client or WorkspaceClient()
+    run = workspace_client.jobs.get_run(run_id)
+    state = run.state
+    life_cycle = state.life_cycle_state.value if state and state.life_cycle_state else None
+    result = state.result_state.value if state and state.result_state else None
+    finished_at = None
+    if run.end_time:
+        finished_at = datetime.fromtimestamp(run.end_time / 1000, tz=timezone.utc)
+    duration_ms = run.run_duration or ((run.end_time - run.start_time) if run.end_time and run.start_time else None)
+    return {
+        "status": result or life_cycle or "UNKNOWN",
+        "finished_at": finished_at,
+        "duration_seconds": duration_ms / 1000 if duration_ms else None
+    }
+
+
+def get_training_job_tables(job_id, workspace_client=None):
+    """Returns the training/eval tables a training job's notebook task reads.
+
+    The tables are fixed in the job's base parameters when it is created, so
+    every run (and every model registered from one) depends on them. Returns
+    an empty list if the job no longer exists; other API errors are raised.
+    """
+    workspace_client = workspace_client or WorkspaceClient()
+    try:
+        job = workspace_client.jobs.get(job_id)
+    except NotFound:
+        return []
+    tables = []
+    for task in (job.settings.tasks if job.settings else None) or []:
+        parameters = (task.notebook_task.base_parameters if task.notebook_task else None) or {}
+        tables += [parameters[key] for key in ("training_table_name", "eval_table_name") if parameters.get(key)]
+    return tables